@@ -2,8 +2,8 @@ from typing import Any
 
 from django.http import HttpRequest
 
-from .services import Cart
+from .services import get_cart
 
 
 def cart(request: HttpRequest) -> dict[str, Any]:
-    return {"cart": Cart(request)}
+    return {"cart": get_cart(request)}
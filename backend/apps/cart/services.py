@@ -22,10 +22,14 @@ class Cart:
 
     def __init__(self, request: HttpRequest):
         self.session = request.session
-        cart = self.session.get(self.SESSION_KEY)
-        if not cart:
-            cart = self.session[self.SESSION_KEY] = {}
-        self.cart: dict[str, dict[str, Any]] = cart
+        # Read-only until the first mutation: an untouched cart never writes
+        # to the session, so anonymous browsing creates no session row/cookie.
+        self.cart: dict[str, dict[str, Any]] = self.session.get(self.SESSION_KEY) or {}
+
+        # Hydrated lines / aggregates, computed at most once between mutations.
+        self._lines: list[dict[str, Any]] | None = None
+        self._len: int | None = None
+        self._total: Decimal | None = None
 
     def add(
         self, product: Product, quantity: int = 1, override: bool = False
@@ -82,28 +86,68 @@ class Cart:
             self.save()
 
     def clear(self) -> None:
-        self.session[self.SESSION_KEY] = {}
-        self.save()
+        self.cart = {}
+        if self.SESSION_KEY in self.session:
+            self.save()
 
     def save(self) -> None:
+        # (Re)attach: the dict may not be in the session yet (lazy cart).
+        self.session[self.SESSION_KEY] = self.cart
         self.session.modified = True
+        self._lines = None
+        self._len = None
+        self._total = None
 
-    def __iter__(self) -> Iterator[dict[str, Any]]:
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids, is_active=True)
+    def lines(self) -> list[dict[str, Any]]:
+        """
+        Cart lines joined with their (active) products.
+        One Product query per cart state, however often it is iterated.
+        Lines are copies: the session dict stays JSON-serializable.
+        """
+        if self._lines is None:
+            products = (
+                Product.objects.active().for_listing().filter(id__in=self.cart.keys())
+            )
+            lines: list[dict[str, Any]] = []
+            for product in products:
+                data = self.cart[str(product.id)]
+                price = Decimal(data["price"])
+                lines.append(
+                    {
+                        **data,
+                        "product": product,
+                        "price": price,
+                        "total_price": price * data["qty"],
+                        # UI hint (still validate server-side)
+                        "max_qty": int(product.stock),
+                    }
+                )
+            self._lines = lines
+        return self._lines
 
-        for product in products:
-            item = self.cart[str(product.id)]
-            item["product"] = product
-            item["price"] = Decimal(item["price"])
-            item["total_price"] = item["price"] * item["qty"]
-            item["max_qty"] = int(product.stock)  # UI hint (still validate server-side)
-            yield item
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return iter(self.lines())
 
     def __len__(self) -> int:
-        return sum(item["qty"] for item in self.cart.values())
+        if self._len is None:
+            self._len = sum(int(item["qty"]) for item in self.cart.values())
+        return self._len
 
     def get_total_price(self) -> Decimal:
-        return Decimal(
-            sum(Decimal(item["price"]) * item["qty"] for item in self.cart.values())
-        )
+        if self._total is None:
+            self._total = Decimal(
+                sum(Decimal(item["price"]) * item["qty"] for item in self.cart.values())
+            )
+        return self._total
+
+
+def get_cart(request: HttpRequest) -> Cart:
+    """
+    The request's Cart, created on first use and shared by views, the
+    context processor and services for the rest of the request.
+    """
+    cart: Cart | None = getattr(request, "_cart", None)
+    if cart is None:
+        cart = Cart(request)
+        request._cart = cart  # type: ignore[attr-defined]
+    return cart
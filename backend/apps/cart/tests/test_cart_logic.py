@@ -116,6 +116,7 @@ class TestCartLogic:
         p2.is_active = False
         p2.save()
 
-        items = list(cart)
+        # Hydration is cached per cart state; the next request sees the change.
+        items = list(Cart(request))
         assert len(items) == 1
         assert items[0]["product"] == p1
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from backend.apps.cart.services import Cart, get_cart
+from backend.apps.products.models import Category, Product
+
+
+@pytest.fixture
+def request_with_session():
+    request = RequestFactory().get("/")
+    SessionMiddleware(lambda r: HttpResponse()).process_request(request)
+    return request
+
+
+@pytest.fixture
+def products():
+    cat = Category.objects.create(name="Prints", slug="prints")
+    return [
+        Product.objects.create(
+            category=cat, name=f"P{i}", slug=f"p{i}", price=10, stock=5
+        )
+        for i in range(3)
+    ]
+
+
+@pytest.mark.django_db
+class TestCartHydration:
+    def test_get_cart_is_request_scoped(self, request_with_session):
+        assert get_cart(request_with_session) is get_cart(request_with_session)
+
+    def test_products_loaded_once_per_cart_state(self, request_with_session, products):
+        cart = Cart(request_with_session)
+        for p in products:
+            cart.add(p)
+
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(3):
+                assert len(list(cart)) == 3
+                assert len(cart) == 3
+                assert cart.get_total_price() == 30
+                # category is joined, not lazily fetched per line
+                assert {line["product"].category.name for line in cart} == {"Prints"}
+
+        assert len(ctx.captured_queries) == 1
+
+    def test_mutation_rehydrates(self, request_with_session, products):
+        cart = Cart(request_with_session)
+        cart.add(products[0])
+        assert len(list(cart)) == 1
+
+        cart.add(products[1])
+        assert len(list(cart)) == 2
+        assert cart.get_total_price() == 20
+
+        cart.clear()
+        assert len(cart) == 0
+        assert list(cart) == []
+
+    def test_session_stays_json_serializable(self, request_with_session, products):
+        cart = Cart(request_with_session)
+        cart.add(products[0])
+        list(cart)
+
+        json.dumps(request_with_session.session["cart"])
+
+    def test_cart_page_hydrates_once(self, client, products):
+        for p in products:
+            client.post(reverse("cart_add", args=[p.id]), {"qty": 1})
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(reverse("cart_detail"))
+
+        assert response.status_code == 200
+        product_queries = [
+            q for q in ctx.captured_queries if 'FROM "products_product"' in q["sql"]
+        ]
+        assert len(product_queries) == 1
+
+
+@pytest.mark.django_db
+class TestLazySession:
+    def test_reading_empty_cart_does_not_touch_session(self, request_with_session):
+        cart = Cart(request_with_session)
+
+        assert len(cart) == 0
+        assert list(cart) == []
+        cart.clear()
+
+        assert request_with_session.session.modified is False
+        assert "cart" not in request_with_session.session
+
+    def test_first_mutation_writes_session(self, request_with_session, products):
+        cart = Cart(request_with_session)
+        cart.add(products[0])
+
+        assert request_with_session.session.modified is True
+        assert request_with_session.session["cart"][str(products[0].id)]["qty"] == 1
+
+    @pytest.mark.parametrize(
+        "url_name", ["core:home", "products:product_list", "cart_detail"]
+    )
+    def test_anonymous_browsing_is_session_free(self, client, url_name):
+        response = client.get(reverse(url_name))
+
+        assert response.status_code == 200
+        assert "sessionid" not in response.cookies
+        assert Session.objects.count() == 0
@@ -3,19 +3,24 @@ from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_POST
 
+from backend.apps.orders.idempotency import new_key as new_idempotency_key
 from backend.apps.products.models import Product
 
-from .services import Cart
+from .services import get_cart
 
 
 def cart_detail(request: HttpRequest) -> HttpResponse:
-    cart = Cart(request)
-    return render(request, "cart/cart_detail.html", {"cart": cart})
+    cart = get_cart(request)
+    return render(
+        request,
+        "cart/cart_detail.html",
+        {"cart": cart, "idempotency_key": new_idempotency_key()},
+    )
 
 
 @require_POST
 def cart_add(request: HttpRequest, product_id: int) -> HttpResponse:
-    cart = Cart(request)
+    cart = get_cart(request)
     product = get_object_or_404(Product, id=product_id, is_active=True)
 
     try:
@@ -40,7 +45,7 @@ def cart_add(request: HttpRequest, product_id: int) -> HttpResponse:
 
 @require_POST
 def cart_update(request: HttpRequest, product_id: int) -> HttpResponse:
-    cart = Cart(request)
+    cart = get_cart(request)
     product = get_object_or_404(Product, id=product_id, is_active=True)
 
     try:
@@ -65,7 +70,7 @@ def cart_update(request: HttpRequest, product_id: int) -> HttpResponse:
 
 @require_POST
 def cart_remove(request: HttpRequest, product_id: int) -> HttpResponse:
-    cart = Cart(request)
+    cart = get_cart(request)
     product = get_object_or_404(Product, id=product_id, is_active=True)
     cart.remove(product)
     messages.success(request, f"Removed '{product.name}' from cart.")
@@ -5,3 +5,6 @@ class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "backend.apps.core"
     verbose_name = "Website Pages"
+
+    def ready(self) -> None:
+        from . import checks  # noqa: F401
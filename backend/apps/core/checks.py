@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Cache backends whose data lives inside one worker process.
+_PER_PROCESS_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def cache_is_shared(alias: str = "default") -> bool:
+    """True if every worker process sees the same `alias` cache."""
+    backend = settings.CACHES.get(alias, {}).get("BACKEND", "")
+    return backend not in _PER_PROCESS_CACHES
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(**kwargs: Any) -> list[Warning]:
+    if cache_is_shared():
+        return []
+    return [
+        Warning(
+            "The default cache is per-process.",
+            hint=(
+                "Set CACHE_URL to a Redis server so listing cache stats, the "
+                "payment circuit breaker and the PayPal token lock are shared "
+                "by all workers."
+            ),
+            id="core.W001",
+        )
+    ]
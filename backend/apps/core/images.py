@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from cloudinary.utils import cloudinary_url
+from django.conf import settings
+from django.core.cache import cache
+
+# Cloudinary URLs are a pure function of (public_id, options): memoize them.
+URL_CACHE_SIZE = 4096
+SHARED_CACHE_PREFIX = "cloudinary:url"
+SHARED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Widths offered in product srcsets.
+SRCSET_WIDTHS: tuple[int, ...] = (200, 400, 800, 1200)
+
+_Frozen = tuple[tuple[str, Any], ...]
+
+
+def _freeze(options: dict[str, Any]) -> _Frozen:
+    """Hashable, order-independent form of an options dict (scalars/dicts)."""
+    return tuple(
+        sorted(
+            (key, _freeze(value) if isinstance(value, dict) else value)
+            for key, value in options.items()
+        )
+    )
+
+
+def _thaw(frozen: _Frozen) -> dict[str, Any]:
+    return {
+        key: _thaw(value) if isinstance(value, tuple) else value
+        for key, value in frozen
+    }
+
+
+def _use_shared_cache() -> bool:
+    return bool(getattr(settings, "CLOUDINARY_URL_SHARED_CACHE", False))
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def _cached_url(public_id: str, frozen: _Frozen) -> str:
+    shared_key = ""
+    if _use_shared_cache():
+        digest = hashlib.sha1(repr(frozen).encode()).hexdigest()
+        shared_key = f"{SHARED_CACHE_PREFIX}:{public_id}:{digest}"
+        hit = cache.get(shared_key)
+        if hit is not None:
+            return str(hit)
+
+    url, _ = cloudinary_url(public_id, **_thaw(frozen))
+    url = str(url)
+
+    if shared_key:
+        cache.set(shared_key, url, SHARED_CACHE_TIMEOUT)
+    return url
+
+
+def build_image_url(public_id: str, **options: Any) -> str:
+    """Memoized `cloudinary_url(public_id, **options)[0]`."""
+    if not public_id:
+        return ""
+    return _cached_url(str(public_id), _freeze(options))
+
+
+def clear_image_url_cache() -> None:
+    _cached_url.cache_clear()
+
+
+def fill_transformation(
+    *, width: int | None = None, height: int | None = None
+) -> dict[str, object]:
+    """Auto format/quality, cropped to fill the given box (if any)."""
+    t: dict[str, object] = {
+        "fetch_format": "auto",
+        "quality": "auto",
+    }
+
+    if width and height:
+        t.update({"width": width, "height": height, "crop": "fill", "gravity": "auto"})
+    elif width:
+        t.update({"width": width, "crop": "fill", "gravity": "auto"})
+    elif height:
+        t.update({"height": height, "crop": "fill", "gravity": "auto"})
+
+    return t
+
+
+@dataclass(frozen=True)
+class ImageSet:
+    """Every URL a template needs for one image, built in one call."""
+
+    auto: str
+    widths: dict[int, str]
+
+    @property
+    def srcset(self) -> str:
+        return ", ".join(f"{url} {w}w" for w, url in sorted(self.widths.items()))
+
+
+def build_image_set(
+    public_id: str, *, widths: tuple[int, ...] = SRCSET_WIDTHS
+) -> ImageSet:
+    if not public_id:
+        return ImageSet(auto="", widths={})
+    return ImageSet(
+        auto=build_image_url(public_id, transformation=fill_transformation()),
+        widths={
+            w: build_image_url(public_id, transformation=fill_transformation(width=w))
+            for w in widths
+        },
+    )
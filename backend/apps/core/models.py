@@ -1,6 +1,8 @@
 from cloudinary.models import CloudinaryField
 from django.db import models
 
+from backend.apps.core.images import build_image_url
+
 
 class HeroSlide(models.Model):
     title = models.CharField(
@@ -34,7 +36,12 @@ class HeroSlide(models.Model):
         if not self.image:
             return ""
 
-        url = self.image.build_url(
+        # Same options CloudinaryResource.build_url() would combine, memoized.
+        return build_image_url(
+            self.image.public_id,
+            type=self.image.type,
+            resource_type=self.image.resource_type or "image",
+            version=self.image.version,
             width=1200,
             height=1500,  # Aspect ratio 4:5
             crop="fill",
@@ -42,4 +49,3 @@ class HeroSlide(models.Model):
             format="auto",
             gravity="auto",  # Focuses on the most interesting part of image
         )
-        return str(url)
@@ -0,0 +1,22 @@
+from backend.apps.core.checks import cache_is_shared, check_shared_cache
+
+
+class TestSharedCacheCheck:
+    def test_locmem_cache_is_flagged(self, settings):
+        settings.CACHES = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+
+        assert not cache_is_shared()
+        assert [w.id for w in check_shared_cache()] == ["core.W001"]
+
+    def test_redis_cache_passes(self, settings):
+        settings.CACHES = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": "redis://127.0.0.1:6379/0",
+            }
+        }
+
+        assert cache_is_shared()
+        assert check_shared_cache() == []
@@ -1,10 +1,58 @@
+from collections.abc import Callable
 from typing import Any
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db.models import QuerySet
 from django.http import HttpRequest
 from unfold.admin import ModelAdmin  # type: ignore
 
 from .models import Order, OrderItem, OrderTracking, OrderTrackingEvent
+from .tracking_services import bulk_update_tracking_status
+
+_Action = Callable[[ModelAdmin, HttpRequest, QuerySet[Any]], None]
+
+
+def _advance_tracking_actions(order_id_field: str) -> list[_Action]:
+    """'Mark as packed/shipped/delivered' for a changelist of orders or tracking."""
+    actions: list[_Action] = []
+    for status in (
+        OrderTracking.FulfillmentStatus.PACKED,
+        OrderTracking.FulfillmentStatus.SHIPPED,
+        OrderTracking.FulfillmentStatus.DELIVERED,
+    ):
+
+        def action(
+            modeladmin: ModelAdmin,
+            request: HttpRequest,
+            queryset: QuerySet[Any],
+            status: str = status,
+        ) -> None:
+            result = bulk_update_tracking_status(
+                order_ids=queryset.values_list(order_id_field, flat=True),
+                new_status=status,
+                actor=request.user,
+            )
+            label = OrderTracking.FulfillmentStatus(status).label
+            if result.updated:
+                modeladmin.message_user(
+                    request,
+                    f"{len(result.updated)} order(s) marked as {label}.",
+                    messages.SUCCESS,
+                )
+            if result.skipped:
+                examples = "; ".join(
+                    f"#{pk}: {issue.message}"
+                    for pk, issue in list(result.skipped.items())[:5]
+                )
+                modeladmin.message_user(
+                    request,
+                    f"{len(result.skipped)} order(s) skipped ({examples}).",
+                    messages.WARNING,
+                )
+
+        action.__name__ = f"mark_{status}"
+        actions.append(admin.action(description=f"Mark as {status.label}")(action))
+    return actions
 
 
 class OrderItemInline(admin.TabularInline):
@@ -59,9 +107,10 @@ class OrderAdmin(ModelAdmin):
         "email",
         "subtotal",
         "currency",
+        "refund_due",
         "created_at",
     )
-    list_filter = ("status", "payment_provider", "created_at")
+    list_filter = ("status", "refund_due", "payment_provider", "created_at")
     search_fields = (
         "id",
         "email",
@@ -73,10 +122,12 @@ class OrderAdmin(ModelAdmin):
         "payment_provider",
         "provider_order_id",
         "provider_capture_id",
+        "reserved_until",
         "created_at",
         "updated_at",
     )
     inlines = [OrderTrackingInline, OrderItemInline]
+    actions = _advance_tracking_actions("pk")
 
 
 @admin.register(OrderTracking)
@@ -86,6 +137,7 @@ class OrderTrackingAdmin(ModelAdmin):
     search_fields = ("order__id", "order__email", "carrier", "tracking_number")
     ordering = ("-updated_at",)
     inlines = [OrderTrackingEventInline]
+    actions = _advance_tracking_actions("order_id")
     readonly_fields = (
         "processing_at",
         "packed_at",
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import math
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.http import HttpRequest
+from django.utils import timezone
+
+from .models import CheckoutSlot, CheckoutTicket
+
+# Admission control for checkout: at most CHECKOUT_MAX_CONCURRENT checkouts
+# are inside the stock-locking transaction + provider call at once. Each
+# holds a CheckoutSlot row, claimed with a conditional UPDATE (atomic on
+# every backend, and shared by all workers) and released when the checkout
+# finishes. When every place is taken, newcomers get a CheckoutTicket and
+# wait on an HTMX-polled queue page; tickets are served in id order.
+
+SESSION_KEY = "checkout_admission"
+_REQUEST_ATTR = "_checkout_slot"
+
+POLL_SECONDS = 3
+# A place is released as soon as its checkout finishes; the lease only
+# frees places whose worker died, or that a queued shopper never used.
+SLOT_LEASE = timedelta(minutes=2)
+# Waiting tickets that missed a few polls (tab closed) no longer count.
+TICKET_ABANDONED = timedelta(seconds=POLL_SECONDS * 4)
+# Rough time a place is held, for the waiting room's estimate.
+TYPICAL_CHECKOUT_SECONDS = 5
+
+
+@dataclass(frozen=True)
+class QueueStatus:
+    admitted: bool
+    position: int = 0
+    eta_seconds: int = 0
+
+
+def _limit() -> int:
+    return int(getattr(settings, "CHECKOUT_MAX_CONCURRENT", 0))
+
+
+def _free(now: datetime) -> Q:
+    return Q(held_until__isnull=True) | Q(held_until__lt=now)
+
+
+def _claim_slot(limit: int) -> tuple[int, str] | None:
+    """Takes a free place: (slot id, holder), or None if all are held."""
+    holder = uuid.uuid4().hex
+    for _ in range(2):
+        now = timezone.now()
+        free = list(
+            CheckoutSlot.objects.filter(_free(now), number__lt=limit)
+            .order_by("number")
+            .values_list("pk", flat=True)[:limit]
+        )
+        for pk in free:
+            # Only one of several racing workers matches the free condition.
+            claimed = CheckoutSlot.objects.filter(_free(now), pk=pk).update(
+                holder=holder, held_until=now + SLOT_LEASE
+            )
+            if claimed:
+                return pk, holder
+        if free or CheckoutSlot.objects.filter(number__lt=limit).count() >= limit:
+            return None
+        # First use, or the limit was raised: create the missing places.
+        CheckoutSlot.objects.bulk_create(
+            [CheckoutSlot(number=n) for n in range(limit)], ignore_conflicts=True
+        )
+    return None
+
+
+def _renew_slot(pk: int, holder: str) -> bool:
+    now = timezone.now()
+    return bool(
+        CheckoutSlot.objects.filter(pk=pk, holder=holder, held_until__gte=now).update(
+            held_until=now + SLOT_LEASE
+        )
+    )
+
+
+def _free_places(limit: int, now: datetime) -> int:
+    held = CheckoutSlot.objects.filter(number__lt=limit, held_until__gte=now).count()
+    return max(limit - held, 0)
+
+
+def _live_tickets(now: datetime) -> QuerySet[CheckoutTicket]:
+    return CheckoutTicket.objects.filter(last_seen_at__gte=now - TICKET_ABANDONED)
+
+
+def _state(request: HttpRequest) -> dict[str, Any]:
+    return dict(request.session.get(SESSION_KEY) or {})
+
+
+def admitted_email(request: HttpRequest) -> str:
+    """Guest email stored with a queue ticket/place (so it isn't asked twice)."""
+    return str(_state(request).get("email") or "")
+
+
+def in_queue(request: HttpRequest) -> bool:
+    return "ticket" in _state(request)
+
+
+def admit(request: HttpRequest, *, email: str = "") -> bool:
+    """
+    True if this checkout may proceed now; it then holds a place until
+    finish(request). Otherwise the session is given (or keeps) a ticket.
+    """
+    limit = _limit()
+    if limit <= 0:
+        return True
+
+    state = _state(request)
+    if "slot" in state:
+        # A place granted in the waiting room, if it wasn't left to expire.
+        del request.session[SESSION_KEY]
+        if _renew_slot(state["slot"], state["holder"]):
+            setattr(request, _REQUEST_ATTR, (state["slot"], state["holder"]))
+            return True
+        state = {}
+
+    now = timezone.now()
+    if "ticket" not in state:
+        if not _live_tickets(now).exists():
+            held = _claim_slot(limit)
+            if held is not None:
+                request.session.pop(SESSION_KEY, None)
+                setattr(request, _REQUEST_ATTR, held)
+                return True
+        ticket = CheckoutTicket.objects.create(last_seen_at=now)
+        state = {"ticket": ticket.pk, "email": email}
+    elif email:
+        state["email"] = email
+
+    request.session[SESSION_KEY] = state
+    return False
+
+
+def finish(request: HttpRequest) -> None:
+    """Releases the place admit() took for this request, if any."""
+    held = getattr(request, _REQUEST_ATTR, None)
+    if held is None:
+        return
+    delattr(request, _REQUEST_ATTR)
+    pk, holder = held
+    CheckoutSlot.objects.filter(pk=pk, holder=holder).update(holder="", held_until=None)
+
+
+def poll(request: HttpRequest) -> QueueStatus:
+    """Called by the waiting room; gives the ticket a place when its turn comes."""
+    limit = _limit()
+    state = _state(request)
+    if limit <= 0 or "slot" in state:
+        return QueueStatus(admitted=True)
+
+    now = timezone.now()
+    ticket_id = int(state.get("ticket", 0))
+    CheckoutTicket.objects.filter(last_seen_at__lt=now - TICKET_ABANDONED).exclude(
+        pk=ticket_id
+    ).delete()
+    if not CheckoutTicket.objects.filter(pk=ticket_id).update(last_seen_at=now):
+        # Purged while the shopper was away: back of the line.
+        ticket_id = CheckoutTicket.objects.create(last_seen_at=now).pk
+        state["ticket"] = ticket_id
+        request.session[SESSION_KEY] = state
+
+    position = _live_tickets(now).filter(pk__lt=ticket_id).count() + 1
+    if position <= _free_places(limit, now):
+        held = _claim_slot(limit)
+        if held is not None:
+            CheckoutTicket.objects.filter(pk=ticket_id).delete()
+            request.session[SESSION_KEY] = {
+                "slot": held[0],
+                "holder": held[1],
+                "email": str(state.get("email") or ""),
+            }
+            return QueueStatus(admitted=True)
+
+    return QueueStatus(
+        admitted=False,
+        position=position,
+        eta_seconds=math.ceil(position / limit) * TYPICAL_CHECKOUT_SECONDS,
+    )
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import hashlib
+import uuid
+from datetime import timedelta
+
+from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+
+from .models import CheckoutRequest
+
+# Idempotency for form posts that start expensive work (checkout): the form
+# carries a one-off key, stored as a CheckoutRequest row in the same
+# transaction as the order it created. A duplicate submit - on any worker -
+# finds the row and replays the first request's redirect instead of redoing
+# the work; the unique key settles two submits that race each other.
+
+FIELD_NAME = "idempotency_key"
+# A request that hasn't stored its redirect by then died before answering
+# (provider calls time out well before this).
+IN_PROGRESS_TIMEOUT = timedelta(minutes=1)
+
+
+class DuplicateCheckoutError(Exception):
+    """Another request already created the order for this key."""
+
+
+def new_key() -> str:
+    return uuid.uuid4().hex
+
+
+def request_key(request: HttpRequest, token: str | None = None) -> str:
+    """
+    Stored key for the posted idempotency key, or for `token` when given
+    (the pending page passes it back); '' if there is none.
+    """
+    if token is None:
+        token = request.POST.get(FIELD_NAME) or ""
+    token = token.strip()
+    if not token or len(token) > 64:
+        return ""
+    # Scoped to the session, so a leaked key can't replay someone else's.
+    session_key = getattr(request, "session", None) and request.session.session_key
+    return hashlib.sha256(f"{session_key or ''}:{token}".encode()).hexdigest()
+
+
+def replay(key: str) -> str | None:
+    """
+    None if no order was created under `key` (or the request that did gave
+    up without answering). Otherwise the redirect URL of that request, or
+    '' while it is still running (a double-click: the browser only shows
+    the second response).
+    """
+    stored = (
+        CheckoutRequest.objects.filter(key=key)
+        .values_list("redirect_url", "created_at")
+        .first()
+    )
+    if stored is None:
+        return None
+    redirect_url, created_at = stored
+    if not redirect_url and created_at < timezone.now() - IN_PROGRESS_TIMEOUT:
+        return None
+    return str(redirect_url)
+
+
+def store(key: str, response: HttpResponse) -> None:
+    """Keeps a redirect for replay; anything else releases the key."""
+    location = response.get("Location") if 300 <= response.status_code < 400 else ""
+    if location:
+        CheckoutRequest.objects.filter(key=key).update(redirect_url=location)
+    else:
+        release(key)
+
+
+def release(key: str) -> None:
+    CheckoutRequest.objects.filter(key=key).delete()
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import logging
+import random
+import time
+from collections.abc import Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, OperationalError, connection
+
+from backend.apps.products.models import Product
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_WAIT = "wait"  # block, but at most CHECKOUT_LOCK_TIMEOUT_MS
+STRATEGY_NOWAIT = "nowait"  # FOR UPDATE NOWAIT, retried with jitter
+STRATEGY_FAIL_FAST = "fail_fast"  # FOR UPDATE NOWAIT, no retry
+
+# Postgres SQLSTATEs worth retrying the whole transaction for.
+_DEADLOCK = "40P01"
+_SERIALIZATION_FAILURE = "40001"
+_LOCK_NOT_AVAILABLE = "55P03"
+# MySQL's equivalent of 55P03 (ER_LOCK_NOWAIT), reported as an error number.
+_MYSQL_LOCK_NOWAIT = 3572
+
+LOCK_WAIT_COUNT_KEY = "orders:lock_wait:{product_id}:count"
+LOCK_WAIT_TOTAL_KEY = "orders:lock_wait:{product_id}:total_ms"
+
+
+class CheckoutBusyError(Exception):
+    """Product rows are contended; the shopper should try again shortly."""
+
+
+def _strategy() -> str:
+    return str(getattr(settings, "CHECKOUT_LOCK_STRATEGY", STRATEGY_WAIT))
+
+
+def _sqlstate(exc: BaseException) -> str:
+    cause = exc.__cause__
+    return str(getattr(cause, "sqlstate", None) or getattr(cause, "pgcode", "") or "")
+
+
+def _lock_not_available(exc: BaseException) -> bool:
+    if _sqlstate(exc) == _LOCK_NOT_AVAILABLE:
+        return True
+    args = getattr(exc.__cause__, "args", None) or exc.args
+    return bool(args) and args[0] == _MYSQL_LOCK_NOWAIT
+
+
+def _incr(key: str, delta: int) -> None:
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def _record_lock_wait(product_ids: list[int], waited_ms: float) -> None:
+    # One statement locked the whole batch: split its wait across the rows
+    # rather than charging every product the full time.
+    if not product_ids:
+        return
+    share_ms = round(waited_ms / len(product_ids))
+    for pid in product_ids:
+        _incr(LOCK_WAIT_COUNT_KEY.format(product_id=pid), 1)
+        _incr(LOCK_WAIT_TOTAL_KEY.format(product_id=pid), share_ms)
+
+
+def get_lock_wait_stats(product_id: int) -> dict[str, int]:
+    """Row-lock acquisitions at checkout and this product's share (ms) of the wait."""
+    return {
+        "count": int(cache.get(LOCK_WAIT_COUNT_KEY.format(product_id=product_id)) or 0),
+        "total_ms": int(
+            cache.get(LOCK_WAIT_TOTAL_KEY.format(product_id=product_id)) or 0
+        ),
+    }
+
+
+def lock_products(product_ids: list[int]) -> dict[int, Product]:
+    """
+    SELECT ... FOR UPDATE the given products (sorted, to avoid deadlocks)
+    using the configured strategy. Must run inside a transaction.
+    High-demand products are skipped: their stock lives in slots.
+    Raises CheckoutBusyError when the locks cannot be had in time.
+    """
+    strategy = _strategy()
+    nowait = strategy in (STRATEGY_NOWAIT, STRATEGY_FAIL_FAST)
+
+    if strategy == STRATEGY_WAIT and connection.vendor == "postgresql":
+        timeout_ms = int(getattr(settings, "CHECKOUT_LOCK_TIMEOUT_MS", 3000))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('lock_timeout', %s, true)", [f"{timeout_ms}ms"]
+            )
+
+    started = time.monotonic()
+    try:
+        products = list(
+            Product.objects.select_for_update(nowait=nowait)
+            .filter(id__in=product_ids, stock_slot_count=0)
+            .order_by("id")
+        )
+    except DatabaseError as exc:
+        # Only a lock that couldn't be had is "busy"; deadlocks go to
+        # run_with_lock_retry, anything else is a real failure.
+        if _lock_not_available(exc):
+            raise CheckoutBusyError(str(exc)) from exc
+        raise
+    finally:
+        _record_lock_wait(product_ids, (time.monotonic() - started) * 1000)
+
+    return {p.id: p for p in products}
+
+
+def run_with_lock_retry[T](fn: Callable[[], T]) -> T:
+    """
+    Runs `fn` (which opens its own transaction), retrying with jittered
+    exponential backoff on deadlocks, serialization failures and - for the
+    "nowait" strategy - busy rows. Gives up with CheckoutBusyError.
+    """
+    retries = int(getattr(settings, "CHECKOUT_LOCK_RETRIES", 3))
+    base_delay = float(getattr(settings, "CHECKOUT_LOCK_RETRY_BASE_DELAY", 0.05))
+    strategy = _strategy()
+
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except CheckoutBusyError:
+            if strategy != STRATEGY_NOWAIT or attempt >= retries:
+                logger.info("Checkout busy after %s attempt(s)", attempt + 1)
+                raise
+        except OperationalError as exc:
+            if _sqlstate(exc) not in (_DEADLOCK, _SERIALIZATION_FAILURE):
+                raise
+            if attempt >= retries:
+                raise CheckoutBusyError(str(exc)) from exc
+            logger.warning("Retrying checkout after %s", _sqlstate(exc))
+
+        attempt += 1
+        time.sleep(random.uniform(0, base_delay * (2**attempt)))
@@ -0,0 +1,52 @@
+from datetime import timedelta
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from backend.apps.orders.reconciliation import (
+    RECONCILE_BATCH_SIZE,
+    RECONCILE_MIN_AGE,
+    RECONCILE_WORKERS,
+    reconcile_pending_payments,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Check pending orders against their payment provider: mark paid the "
+        "ones that completed, capture approved ones, cancel voided ones."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=RECONCILE_BATCH_SIZE,
+            help="Orders read (and written back) per batch.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=RECONCILE_WORKERS,
+            help="Concurrent provider lookups.",
+        )
+        parser.add_argument(
+            "--min-age-minutes",
+            type=int,
+            default=int(RECONCILE_MIN_AGE.total_seconds() // 60),
+            help="Skip orders younger than this.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        report = reconcile_pending_payments(
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            min_age=timedelta(minutes=options["min_age_minutes"]),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {report.checked} pending order(s): {report.paid} paid, "
+                f"{report.canceled} canceled, {report.unchanged} unchanged, "
+                f"{report.errors} error(s), {report.skipped} skipped."
+            )
+        )
@@ -0,0 +1,29 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from backend.apps.orders.reservations import (
+    SWEEP_BATCH_SIZE,
+    release_expired_reservations,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancel pending orders whose stock reservation has expired and "
+        "return their stock. Safe to run from several workers at once."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=SWEEP_BATCH_SIZE,
+            help="Orders released per transaction.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        released = release_expired_reservations(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Released {released} expired reservation(s).")
+        )
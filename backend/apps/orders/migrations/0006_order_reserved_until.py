@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-17 23:03
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_reserved_until(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    ttl = timedelta(minutes=getattr(settings, "ORDER_RESERVATION_TTL_MINUTES", 30))
+    Order.objects.filter(status="pending", reserved_until__isnull=True).update(
+        reserved_until=models.F("created_at") + ttl
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0005_rename_paypal_capture_id_order_provider_order_id_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="reserved_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["reserved_until"],
+                name="order_pending_reserved_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_reserved_until, migrations.RunPython.noop),
+    ]
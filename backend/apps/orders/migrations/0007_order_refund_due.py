@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_reserved_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='refund_due',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from decimal import Decimal
+from typing import ClassVar
 
 from django.conf import settings
 from django.db import models
@@ -38,13 +39,48 @@ class Order(models.Model):
     provider_order_id = models.CharField(max_length=255, blank=True, unique=True)
     provider_capture_id = models.CharField(max_length=255, blank=True, default="")
 
+    # Stock held by a PENDING order is released by the sweeper after this.
+    reserved_until = models.DateTimeField(null=True, blank=True)
+
+    # A capture landed after the order was canceled (e.g. the reservation
+    # expired while the shopper was at the provider): the money must go back.
+    refund_due = models.BooleanField(default=False, db_index=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["reserved_until"],
+                condition=models.Q(status="pending"),
+                name="order_pending_reserved_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"Order #{self.id} ({self.status})"
 
 
+class CheckoutRequest(models.Model):
+    """
+    The idempotency key a checkout submit created `order` under; written in
+    the same transaction as the order, so a duplicate submit on any worker
+    finds it (see idempotency.py).
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    order = models.OneToOneField(
+        Order, on_delete=models.CASCADE, related_name="checkout_request"
+    )
+    # Where the first submit sent the shopper; empty while it is running.
+    redirect_url = models.CharField(max_length=2048, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"Checkout request for Order #{self.order_id}"
+
+
 # ── OrderItem, OrderTracking, OrderTrackingEvent stay identical ──
 
 
@@ -91,15 +127,17 @@ class OrderTracking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # status -> the timestamp field recording when it was reached
+    MILESTONE_FIELDS: ClassVar[dict[str, str]] = {
+        FulfillmentStatus.PROCESSING.value: "processing_at",
+        FulfillmentStatus.PACKED.value: "packed_at",
+        FulfillmentStatus.SHIPPED.value: "shipped_at",
+        FulfillmentStatus.DELIVERED.value: "delivered_at",
+    }
+
     def set_milestone_timestamp(self) -> None:
         now = timezone.now()
-        field_map: dict[str, str] = {
-            self.FulfillmentStatus.PROCESSING.value: "processing_at",
-            self.FulfillmentStatus.PACKED.value: "packed_at",
-            self.FulfillmentStatus.SHIPPED.value: "shipped_at",
-            self.FulfillmentStatus.DELIVERED.value: "delivered_at",
-        }
-        field = field_map.get(self.status)
+        field = self.MILESTONE_FIELDS.get(self.status)
         if field and not getattr(self, field):
             setattr(self, field, now)
 
@@ -133,3 +171,30 @@ class OrderTrackingEvent(models.Model):
         return (
             f"{self.from_status} -> {self.to_status} (Order #{self.tracking.order_id})"
         )
+
+
+# ── Checkout admission (admission.py) ──
+
+
+class CheckoutSlot(models.Model):
+    """One of CHECKOUT_MAX_CONCURRENT places for an in-flight checkout."""
+
+    number = models.PositiveIntegerField(unique=True)
+    # Who holds the place and until when; the lease only runs out if the
+    # worker died before releasing it.
+    holder = models.CharField(max_length=32, blank=True)
+    held_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"Checkout slot {self.number}"
+
+
+class CheckoutTicket(models.Model):
+    """A shopper waiting for a checkout place; FIFO by id."""
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Refreshed by each waiting-room poll; stale tickets were abandoned.
+    last_seen_at = models.DateTimeField(db_index=True)
+
+    def __str__(self) -> str:
+        return f"Checkout ticket {self.pk}"
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from django.utils import timezone
+
+from backend.apps.payments import breaker
+from backend.apps.payments.base import CaptureResult, PaymentStatus
+from backend.apps.payments.services import (
+    UnknownPaymentProviderError,
+    get_payment_provider,
+)
+
+from .models import Order
+from .reservations import release_orders
+from .services import hold_orders_for_capture, mark_orders_paid
+
+logger = logging.getLogger(__name__)
+
+# Finds PENDING orders whose payment was settled at the provider without us
+# hearing about it (tab closed before the return page, lost webhook). Orders
+# are read in id-ordered batches; provider lookups (and captures of approved
+# payments) run concurrently in a bounded thread pool that only does HTTP.
+# The database writes stay in this thread, one bulk statement per outcome.
+
+RECONCILE_BATCH_SIZE = 100
+RECONCILE_WORKERS = 8
+# Younger orders may still have a shopper on the provider's page.
+RECONCILE_MIN_AGE = timedelta(minutes=15)
+
+# order id -> (provider slug, provider order id)
+_Batch = dict[int, tuple[str, str]]
+
+
+@dataclass
+class ReconcileReport:
+    checked: int = 0
+    paid: int = 0
+    canceled: int = 0
+    errors: int = 0
+    # Orders of providers that can't look payments up (not checked).
+    skipped: int = 0
+
+    @property
+    def unchanged(self) -> int:
+        return self.checked - self.paid - self.canceled - self.errors
+
+
+def _can_look_up(slug: str) -> bool:
+    try:
+        return get_payment_provider(slug).supports_status_lookup()
+    except UnknownPaymentProviderError:
+        return True  # the lookup fails and is counted as an error
+
+
+def _lookup(slug: str, provider_order_id: str) -> PaymentStatus:
+    provider = get_payment_provider(slug)
+    with breaker.guard(provider.slug, "get_payment_status"):
+        return provider.get_payment_status(provider_order_id=provider_order_id)
+
+
+def _capture(slug: str, provider_order_id: str) -> CaptureResult:
+    provider = get_payment_provider(slug)
+    with breaker.guard(provider.slug, "capture_payment"):
+        return provider.capture_payment(provider_order_id=provider_order_id)
+
+
+def _map(
+    pool: Executor, fn: Callable[[str, str], Any], batch: _Batch
+) -> tuple[dict[int, Any], int]:
+    """Runs `fn` for every order concurrently: (results by order id, failures)."""
+    futures = {pool.submit(fn, *args): order_id for order_id, args in batch.items()}
+    results: dict[int, Any] = {}
+    failed = 0
+    for future in as_completed(futures):
+        order_id = futures[future]
+        try:
+            results[order_id] = future.result()
+        except Exception:
+            logger.exception("Reconciling order %s failed", order_id)
+            failed += 1
+    return results, failed
+
+
+def _reconcile_batch(pool: Executor, batch: _Batch, report: ReconcileReport) -> None:
+    unsupported = {slug for slug, _ in batch.values() if not _can_look_up(slug)}
+    if unsupported:
+        logger.warning(
+            "Skipping reconciliation for providers without status lookup: %s",
+            ", ".join(sorted(unsupported)),
+        )
+        supported = {
+            pk: args for pk, args in batch.items() if args[0] not in unsupported
+        }
+        report.skipped += len(batch) - len(supported)
+        batch = supported
+        if not batch:
+            return
+
+    statuses, failed = _map(pool, _lookup, batch)
+    report.checked += len(batch)
+    report.errors += failed
+
+    by_state: dict[str, list[int]] = {}
+    for order_id, status in statuses.items():
+        by_state.setdefault(status.state, []).append(order_id)
+
+    captures = {
+        order_id: statuses[order_id].capture_id
+        for order_id in by_state.get(PaymentStatus.COMPLETED, [])
+    }
+
+    approved = by_state.get(PaymentStatus.APPROVED, [])
+    if approved:
+        # The payer approved but never came back: capture it for them.
+        held = hold_orders_for_capture(approved)
+        results, failed = _map(pool, _capture, {pk: batch[pk] for pk in held})
+        report.errors += failed
+        captures.update({pk: result.capture_id for pk, result in results.items()})
+
+    if captures:
+        report.paid += len(mark_orders_paid(captures))
+
+    voided = by_state.get(PaymentStatus.VOIDED, [])
+    if voided:
+        report.canceled += len(release_orders(voided))
+
+
+def reconcile_pending_payments(
+    *,
+    batch_size: int = RECONCILE_BATCH_SIZE,
+    workers: int = RECONCILE_WORKERS,
+    min_age: timedelta = RECONCILE_MIN_AGE,
+    now: datetime | None = None,
+) -> ReconcileReport:
+    """
+    Checks every PENDING order that has a provider order id and is older
+    than `min_age` with its provider: completed payments mark the order
+    paid, approved ones are captured, voided/expired ones are canceled and
+    their stock returned.
+    """
+    cutoff = (now or timezone.now()) - min_age
+    report = ReconcileReport()
+    last_id = 0
+
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="reconcile"
+    ) as pool:
+        while True:
+            rows = (
+                Order.objects.filter(
+                    status=Order.Status.PENDING, created_at__lt=cutoff, pk__gt=last_id
+                )
+                .exclude(provider_order_id="")
+                .order_by("pk")
+                .values_list("pk", "payment_provider", "provider_order_id")[:batch_size]
+            )
+            batch = {
+                pk: (slug, provider_order_id) for pk, slug, provider_order_id in rows
+            }
+            if not batch:
+                return report
+            last_id = max(batch)
+            _reconcile_batch(pool, batch, report)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from backend.apps.products.models import Product
+
+from .models import Order, OrderItem
+from .services import restore_stock
+
+SWEEP_BATCH_SIZE = 100
+
+
+def _release(order_ids: list[int]) -> None:
+    """
+    Cancels the given (locked, PENDING) orders and returns their stock.
+    Must run inside a transaction.
+    """
+    lines = dict(
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .order_by()
+        .values("product_id")
+        .annotate(total=Sum("qty"))
+        .values_list("product_id", "total")
+    )
+
+    # Same lock order as checkout (ascending id) so the two never deadlock.
+    # High-demand products are not row-locked (their stock is in slots).
+    list(
+        Product.objects.select_for_update()
+        .filter(pk__in=lines, stock_slot_count=0)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    restore_stock(lines)
+
+    Order.objects.filter(id__in=order_ids).update(
+        status=Order.Status.CANCELED,
+        reserved_until=None,
+        updated_at=timezone.now(),
+    )
+
+
+@transaction.atomic
+def _release_batch(*, now: datetime, batch_size: int) -> int:
+    # SKIP LOCKED: orders being captured (or swept by another worker) right
+    # now are left for a later run instead of blocking this one.
+    order_ids = list(
+        Order.objects.select_for_update(skip_locked=True)
+        .filter(status=Order.Status.PENDING, reserved_until__lt=now)
+        .order_by("reserved_until")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    if order_ids:
+        _release(order_ids)
+    return len(order_ids)
+
+
+def release_expired_reservations(
+    *, batch_size: int = SWEEP_BATCH_SIZE, now: datetime | None = None
+) -> int:
+    """
+    Cancels PENDING orders whose reservation has expired and restores their
+    stock, one transaction per batch. Returns the number of orders released.
+    """
+    now = now or timezone.now()
+    released = 0
+    while True:
+        count = _release_batch(now=now, batch_size=batch_size)
+        released += count
+        if count < batch_size:
+            return released
+
+
+@transaction.atomic
+def release_order_reservation(order: Order) -> bool:
+    """
+    Immediately cancels a PENDING order (e.g. the shopper cancelled at the
+    provider) and restores its stock. Returns False if it was not pending.
+    """
+    locked = (
+        Order.objects.select_for_update()
+        .filter(pk=order.pk, status=Order.Status.PENDING)
+        .values_list("id", flat=True)
+        .first()
+    )
+    if locked is None:
+        return False
+
+    _release([locked])
+    order.status = Order.Status.CANCELED
+    order.reserved_until = None
+    return True
+
+
+@transaction.atomic
+def release_orders(order_ids: list[int]) -> list[int]:
+    """
+    Cancels whichever of the given orders are still PENDING (and not locked
+    by a capture in progress) and restores their stock. Returns their ids.
+    """
+    locked = list(
+        Order.objects.select_for_update(skip_locked=True)
+        .filter(pk__in=order_ids, status=Order.Status.PENDING)
+        .order_by("pk")
+        .values_list("id", flat=True)
+    )
+    if locked:
+        _release(locked)
+    return locked
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from django.db.models import QuerySet
+
+from .models import Order, OrderTracking, OrderTrackingEvent
+
+
+def get_tracking_orders() -> QuerySet[Order]:
+    """Orders joined to their tracking row: one read, no locks, no writes."""
+    return Order.objects.select_related("tracking")
+
+
+def get_order_tracking(order: Order) -> OrderTracking | None:
+    try:
+        return order.tracking
+    except OrderTracking.DoesNotExist:
+        return None
+
+
+def get_tracking_events(tracking: OrderTracking) -> QuerySet[OrderTrackingEvent]:
+    return tracking.events.all()
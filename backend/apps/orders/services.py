@@ -1,14 +1,41 @@
+import logging
 from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
 from typing import Any
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import transaction
-from django.db.models import F
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case,
+    CharField,
+    F,
+    PositiveIntegerField,
+    Q,
+    Value,
+    When,
+)
+from django.utils import timezone
 
 from backend.apps.cart.services import Cart
+from backend.apps.payments import breaker
+from backend.apps.payments.services import get_payment_provider
 from backend.apps.products.models import Product
+from backend.apps.products.stock import (
+    available_stock,
+    return_stock,
+    sharded_product_ids,
+    take_stock,
+)
 
-from .models import Order, OrderItem
+from .idempotency import DuplicateCheckoutError
+from .locking import lock_products, run_with_lock_retry
+from .models import CheckoutRequest, Order, OrderItem, OrderTracking
+from .tracking_services import get_or_create_tracking
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
@@ -19,34 +46,33 @@ class StockIssue:
     available: int
 
 
+def reservation_deadline() -> datetime:
+    """When stock held for a PENDING order created now should be released."""
+    ttl = int(getattr(settings, "ORDER_RESERVATION_TTL_MINUTES", 30))
+    return timezone.now() + timedelta(minutes=ttl)
+
+
 @transaction.atomic
-def reserve_stock_and_create_pending_order(
+def _reserve_stock_and_create_pending_order(
     cart: Cart,
     *,
     user: Any = None,
     email: str = "",
+    idempotency_key: str = "",
 ) -> tuple[Order | None, list[StockIssue]]:
-    """
-    Authoritative "checkout begin":
-    - locks products (deterministic order)
-    - re-checks stock under lock
-    - decrements stock (atomic guard + is_active check)
-    - creates Order + OrderItems
-
-    Returns (order, issues).
-    Raises ValidationError on integrity failure to trigger rollback.
-    """
     if len(cart) == 0:
         return None, []
 
     # 1. Deduplicate & Sort IDs (Deterministic locking prevents deadlocks)
     product_ids = sorted({int(pid) for pid in cart.cart})
 
-    # 2. Lock rows
-    products = (
-        Product.objects.select_for_update().filter(id__in=product_ids).order_by("id")
-    )
-    product_map = {p.id: p for p in products}
+    # 2. Lock rows. High-demand products keep their stock in slots (see
+    #    products.stock), so their product row is read, never locked.
+    product_map = lock_products(product_ids)
+    unlocked = [pid for pid in product_ids if pid not in product_map]
+    if unlocked:
+        product_map.update(Product.objects.in_bulk(unlocked))
+    sharded = {pid for pid, p in product_map.items() if p.stock_slot_count}
 
     issues: list[StockIssue] = []
 
@@ -81,7 +107,17 @@ def reserve_stock_and_create_pending_order(
     if issues:
         return None, issues
 
-    # 4. Create Order
+    lines = {int(pid): int(data["qty"]) for pid, data in cart.cart.items()}
+
+    # 4. High-demand products: take from their slots; a shortfall (the
+    #    unlocked stock read above was stale) aborts before any write sticks.
+    issues = _take_sharded_stock(
+        {pid: qty for pid, qty in lines.items() if pid in sharded}, product_map
+    )
+    if issues:
+        return None, issues
+
+    # 5. Create Order
     order = Order.objects.create(
         user=user if getattr(user, "is_authenticated", False) else None,
         email=email
@@ -93,41 +129,299 @@ def reserve_stock_and_create_pending_order(
         status=Order.Status.PENDING,
         currency="EUR",
         subtotal=cart.get_total_price(),
+        reserved_until=reservation_deadline(),
     )
+    if idempotency_key:
+        CheckoutRequest.objects.create(key=idempotency_key, order=order)
 
-    # 5. Decrement Phase (Atomic Update)
-    for item in cart:
-        pid = int(item["product"].id)
-        qty = int(item["qty"])
-        unit_price = item["price"]
-        line_total = item["total_price"]
+    # 6. Decrement Phase (one guarded multi-row UPDATE)
+    decrement_stock({pid: qty for pid, qty in lines.items() if pid not in sharded})
 
-        locked_product = product_map.get(pid)
+    # 7. Order lines, from the session prices + rows already locked above
+    OrderItem.objects.bulk_create(
+        [
+            OrderItem(
+                order=order,
+                product=product_map[int(pid)],
+                qty=int(data["qty"]),
+                unit_price=Decimal(data["price"]),
+                line_total=Decimal(data["price"]) * int(data["qty"]),
+            )
+            for pid, data in cart.cart.items()
+        ]
+    )
+
+    return order, []
 
-        if not locked_product or not locked_product.is_active:
-            raise ValidationError(
-                f"Integrity error: Product {pid} missing or inactive under lock."
+
+def reserve_stock_and_create_pending_order(
+    cart: Cart,
+    *,
+    user: Any = None,
+    email: str = "",
+    idempotency_key: str = "",
+) -> tuple[Order | None, list[StockIssue]]:
+    """
+    Authoritative "checkout begin":
+    - locks products (deterministic order, configured lock strategy)
+    - re-checks stock under lock
+    - decrements stock (one guarded UPDATE for all lines)
+    - creates Order + OrderItems (bulk insert), reserved until the TTL
+
+    The transaction is retried on deadlocks/serialization failures.
+
+    Returns (order, issues).
+    Raises ValidationError on integrity failure to trigger rollback.
+    Raises CheckoutBusyError if the product rows stay contended.
+    Raises DuplicateCheckoutError if `idempotency_key` already has an order.
+    """
+    try:
+        return run_with_lock_retry(
+            lambda: _reserve_stock_and_create_pending_order(
+                cart, user=user, email=email, idempotency_key=idempotency_key
             )
+        )
+    except IntegrityError:
+        # A concurrent duplicate committed the key first; ours rolled back.
+        if (
+            idempotency_key
+            and CheckoutRequest.objects.filter(key=idempotency_key).exists()
+        ):
+            raise DuplicateCheckoutError(idempotency_key) from None
+        raise
+
+
+def _take_sharded_stock(
+    lines: dict[int, int], product_map: dict[int, Product]
+) -> list[StockIssue]:
+    if not lines:
+        return []
+
+    with transaction.atomic():
+        for pid, qty in sorted(lines.items()):
+            if not take_stock(pid, qty):
+                issue = StockIssue(
+                    product_id=pid,
+                    product_name=product_map[pid].name,
+                    requested=qty,
+                    available=available_stock(pid),
+                )
+                # Roll the savepoint back: slots already taken are restored.
+                transaction.set_rollback(True)
+                return [issue]
+    return []
+
 
-        updated_count = Product.objects.filter(
-            pk=locked_product.pk,
-            is_active=True,
-            stock__gte=qty,
-        ).update(stock=F("stock") - qty)
-
-        if updated_count == 0:
-            raise ValidationError(
-                "Critical integrity error: Could not decrement stock "
-                f"for product {pid}. "
-                "Stock changed unexpectedly."
+def decrement_stock(lines: dict[int, int]) -> None:
+    """
+    Decrements stock for {product_id: qty} in a single UPDATE.
+
+    Each row is guarded (active + enough stock); if fewer rows than
+    requested are affected, raises ValidationError so the surrounding
+    transaction rolls back. Callers should hold the row locks.
+    """
+    if not lines:
+        return
+
+    guard = Q()
+    for pid, qty in lines.items():
+        guard |= Q(pk=pid, stock__gte=qty)
+
+    updated_count = (
+        Product.objects.filter(is_active=True)
+        .filter(guard)
+        .update(
+            stock=Case(
+                *[When(pk=pid, then=F("stock") - qty) for pid, qty in lines.items()],
+                default=F("stock"),
+                output_field=PositiveIntegerField(),
             )
+        )
+    )
 
-        OrderItem.objects.create(
-            order=order,
-            product=locked_product,
-            qty=qty,
-            unit_price=unit_price,
-            line_total=line_total,
+    if updated_count != len(lines):
+        raise ValidationError(
+            "Critical integrity error: Could not decrement stock "
+            f"for products {sorted(lines)}. "
+            "Stock changed unexpectedly."
         )
 
-    return order, []
+
+def restore_stock(lines: dict[int, int]) -> None:
+    """Adds {product_id: qty} back to stock (one UPDATE for regular products)."""
+    if not lines:
+        return
+
+    sharded = sharded_product_ids(lines)
+    for pid in sorted(sharded):
+        return_stock(pid, lines[pid])
+
+    Product.objects.filter(pk__in=lines).exclude(pk__in=sharded).update(
+        stock=Case(
+            *[When(pk=pid, then=F("stock") + qty) for pid, qty in lines.items()],
+            default=F("stock"),
+            output_field=PositiveIntegerField(),
+        )
+    )
+
+
+def _mark_paid(order: Order, *, capture_id: str) -> None:
+    order.status = Order.Status.PAID
+    order.provider_capture_id = capture_id
+    order.reserved_until = None
+    order.save(update_fields=["status", "provider_capture_id", "reserved_until"])
+    get_or_create_tracking(order)
+
+
+@transaction.atomic
+def capture_order_payment(order_id: int) -> Order:
+    """
+    Captures a PENDING order with the provider that created it.
+
+    The row lock makes concurrent callers (return page, webhook worker,
+    refreshes) queue; only the first one calls the provider, the rest see
+    the new state. Non-pending orders are returned unchanged.
+    Provider errors propagate (and roll back).
+    """
+    order = Order.objects.select_for_update().get(pk=order_id)
+    if order.status != Order.Status.PENDING:
+        return order
+
+    provider = get_payment_provider(order.payment_provider)
+    with breaker.guard(provider.slug, "capture_payment"):
+        capture = provider.capture_payment(provider_order_id=order.provider_order_id)
+    _mark_paid(order, capture_id=capture.capture_id)
+    return order
+
+
+def _flag_refund_due(order_ids: list[int], captures: dict[int, str]) -> None:
+    """
+    Records captures that landed on CANCELED orders (their stock is already
+    back on sale) so staff can refund them. Must run inside a transaction.
+    """
+    for pk in order_ids:
+        logger.error(
+            "Payment %s captured for canceled order #%s: refund due",
+            captures[pk],
+            pk,
+        )
+    Order.objects.filter(pk__in=order_ids).update(
+        refund_due=True,
+        provider_capture_id=Case(
+            *(When(pk=pk, then=Value(captures[pk])) for pk in order_ids),
+            output_field=CharField(),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+@transaction.atomic
+def confirm_order_paid(order_id: int, *, capture_id: str) -> Order:
+    """
+    Records a capture the provider reports as completed (no provider call).
+    A capture for an order that was canceled meanwhile flags it refund_due.
+    """
+    order = Order.objects.select_for_update().get(pk=order_id)
+    if order.status == Order.Status.PENDING:
+        _mark_paid(order, capture_id=capture_id)
+    elif order.status == Order.Status.CANCELED and not order.refund_due:
+        _flag_refund_due([order.pk], {order.pk: capture_id})
+        order.refresh_from_db()
+    return order
+
+
+# How long an order being captured by acapture_order_payment is kept from
+# expiring; the async path can't hold the row lock across the provider call.
+CAPTURE_HOLD = timedelta(minutes=5)
+
+
+@transaction.atomic
+def _hold_for_capture(order_id: int) -> Order:
+    order = Order.objects.select_for_update().get(pk=order_id)
+    hold_until = timezone.now() + CAPTURE_HOLD
+    if (
+        order.status == Order.Status.PENDING
+        and order.reserved_until is not None
+        and order.reserved_until < hold_until
+    ):
+        order.reserved_until = hold_until
+        order.save(update_fields=["reserved_until"])
+    return order
+
+
+async def acapture_order_payment(order_id: int) -> Order:
+    """
+    capture_order_payment for async views: the provider call is awaited
+    outside any transaction. Concurrent captures of one order are safe
+    because providers dedupe them by their idempotency key; the first
+    result to land marks the order paid.
+    """
+    order = await sync_to_async(_hold_for_capture)(order_id)
+    if order.status != Order.Status.PENDING:
+        return order
+
+    provider = get_payment_provider(order.payment_provider)
+    async with breaker.aguard(provider.slug, "capture_payment"):
+        capture = await provider.acapture_payment(
+            provider_order_id=order.provider_order_id
+        )
+    return await sync_to_async(confirm_order_paid)(
+        order_id, capture_id=capture.capture_id
+    )
+
+
+@transaction.atomic
+def hold_orders_for_capture(order_ids: list[int]) -> list[int]:
+    """Bulk _hold_for_capture; returns the ids that are still PENDING."""
+    pending = list(
+        Order.objects.select_for_update()
+        .filter(pk__in=order_ids, status=Order.Status.PENDING)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    hold_until = timezone.now() + CAPTURE_HOLD
+    Order.objects.filter(pk__in=pending, reserved_until__lt=hold_until).update(
+        reserved_until=hold_until
+    )
+    return pending
+
+
+@transaction.atomic
+def mark_orders_paid(captures: dict[int, str]) -> list[int]:
+    """
+    Bulk _mark_paid for `captures` (order id -> capture id): one UPDATE for
+    the orders that are still PENDING, and their tracking rows in one
+    INSERT. Returns the ids that were marked paid; canceled ones are
+    flagged refund_due instead.
+    """
+    locked = list(
+        Order.objects.select_for_update()
+        .filter(pk__in=captures)
+        .exclude(status=Order.Status.PAID)
+        .filter(refund_due=False)
+        .order_by("pk")
+        .values_list("pk", "status")
+    )
+    canceled = [pk for pk, status in locked if status == Order.Status.CANCELED]
+    if canceled:
+        _flag_refund_due(canceled, captures)
+
+    order_ids = [pk for pk, status in locked if status == Order.Status.PENDING]
+    if not order_ids:
+        return []
+
+    now = timezone.now()
+    Order.objects.filter(pk__in=order_ids).update(
+        status=Order.Status.PAID,
+        provider_capture_id=Case(
+            *(When(pk=pk, then=Value(captures[pk])) for pk in order_ids),
+            output_field=CharField(),
+        ),
+        reserved_until=None,
+        updated_at=now,
+    )
+    OrderTracking.objects.bulk_create(
+        [OrderTracking(order_id=pk, processing_at=now) for pk in order_ids],
+        ignore_conflicts=True,
+    )
+    return order_ids
@@ -0,0 +1,149 @@
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from backend.apps.orders import admission
+from backend.apps.orders.models import CheckoutSlot, CheckoutTicket, Order
+from backend.apps.payments.base import PaymentResult
+
+
+@pytest.fixture
+def provider():
+    mock_provider = MagicMock()
+    mock_provider.slug = "test"
+    mock_provider.create_payment.return_value = PaymentResult(
+        provider_order_id="PROVIDER-Q",
+        redirect_url="http://provider.com/approve",
+        approved=True,
+    )
+    with patch(
+        "backend.apps.orders.views.get_payment_provider", return_value=mock_provider
+    ):
+        yield mock_provider
+
+
+def _hold_all(limit):
+    """Every place taken by checkouts running on other workers."""
+    until = timezone.now() + timedelta(minutes=1)
+    CheckoutSlot.objects.bulk_create(
+        [
+            CheckoutSlot(number=n, holder=f"other-{n}", held_until=until)
+            for n in range(limit)
+        ]
+    )
+
+
+def _free_one():
+    CheckoutSlot.objects.filter(number=0).update(holder="", held_until=None)
+
+
+@pytest.mark.django_db
+class TestCheckoutAdmission:
+    def test_unlimited_by_default(self, client, product, provider):
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+
+        response = client.post(reverse("checkout_start"), {"email": "a@test.com"})
+
+        assert response.url == "http://provider.com/approve"
+        assert not CheckoutSlot.objects.exists()
+
+    def test_place_is_held_during_checkout_then_released(
+        self, client, product, provider, settings
+    ):
+        settings.CHECKOUT_MAX_CONCURRENT = 2
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+
+        def create_payment(**kwargs):
+            held = CheckoutSlot.objects.filter(held_until__isnull=False).count()
+            assert held == 1  # this checkout, while the provider is called
+            return provider.create_payment.return_value
+
+        provider.create_payment.side_effect = create_payment
+        response = client.post(reverse("checkout_start"), {"email": "a@test.com"})
+
+        assert response.url == "http://provider.com/approve"
+        assert not CheckoutSlot.objects.filter(held_until__isnull=False).exists()
+
+    def test_place_is_released_when_checkout_fails(
+        self, client, product, provider, settings
+    ):
+        settings.CHECKOUT_MAX_CONCURRENT = 1
+        provider.create_payment.side_effect = RuntimeError("provider down")
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+
+        client.post(reverse("checkout_start"), {"email": "a@test.com"})
+
+        assert CheckoutSlot.objects.get().held_until is None
+
+    def test_overflow_waits_then_continues(self, client, product, provider, settings):
+        settings.CHECKOUT_MAX_CONCURRENT = 1
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+        _hold_all(1)
+
+        response = client.post(reverse("checkout_start"), {"email": "q@test.com"})
+
+        assert response.url == reverse("checkout_queue")
+        assert not Order.objects.exists()
+        assert CheckoutTicket.objects.count() == 1
+
+        # Still full: keep waiting.
+        page = client.get(reverse("checkout_queue"))
+        assert page.status_code == 200
+        assert page.context["status"].position == 1
+        assert b'hx-trigger="every 3s"' in page.content
+
+        # The other checkout finished: the poll takes its place.
+        _free_one()
+        poll = client.get(reverse("checkout_queue"), headers={"HX-Request": "true"})
+        assert poll["HX-Redirect"] == reverse("checkout_start")
+        assert not CheckoutTicket.objects.exists()
+
+        # The email given before queueing is reused; the place is released.
+        response = client.get(reverse("checkout_start"))
+        assert response.url == "http://provider.com/approve"
+        assert Order.objects.get().email == "q@test.com"
+        assert admission.SESSION_KEY not in client.session
+        assert CheckoutSlot.objects.get().held_until is None
+
+    def test_queue_order_and_estimate(self, client, product, settings):
+        settings.CHECKOUT_MAX_CONCURRENT = 2
+        _hold_all(2)
+        now = timezone.now()
+        CheckoutTicket.objects.bulk_create(
+            [CheckoutTicket(last_seen_at=now) for _ in range(4)]
+        )
+        # Abandoned: no longer polled, so not ahead of anyone.
+        CheckoutTicket.objects.create(last_seen_at=now - timedelta(minutes=5))
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+
+        client.post(reverse("checkout_start"), {"email": "late@test.com"})
+        page = client.get(reverse("checkout_queue"))
+
+        status = page.context["status"]
+        assert status.admitted is False
+        assert status.position == 5
+        assert status.eta_seconds == 3 * admission.TYPICAL_CHECKOUT_SECONDS
+
+    def test_newcomers_do_not_jump_the_queue(self, client, product, settings):
+        settings.CHECKOUT_MAX_CONCURRENT = 1
+        CheckoutTicket.objects.create(last_seen_at=timezone.now())
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+
+        response = client.post(reverse("checkout_start"), {"email": "new@test.com"})
+
+        assert response.url == reverse("checkout_queue")
+
+    def test_expired_lease_frees_the_place(self, settings):
+        _hold_all(1)
+        CheckoutSlot.objects.update(held_until=timezone.now() - timedelta(seconds=1))
+
+        assert admission._claim_slot(1) is not None
+        assert admission._claim_slot(1) is None
+
+    def test_queue_page_without_ticket_goes_to_checkout(self, client):
+        response = client.get(reverse("checkout_queue"))
+
+        assert response.url == reverse("checkout_start")
@@ -0,0 +1,130 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.urls import path, reverse
+
+from backend.apps.orders import views
+from backend.apps.orders.models import Order
+from backend.apps.payments.base import CaptureResult, PaymentResult
+from backend.config.urls import urlpatterns as project_urlpatterns
+
+# The project's URLs with checkout served by the async views, as with
+# CHECKOUT_ASYNC_VIEWS=True.
+urlpatterns = [
+    path("orders/checkout/", views.acheckout_start, name="checkout_start"),
+    path("orders/payment/return/", views.apayment_return, name="payment_return"),
+    *project_urlpatterns,
+]
+
+pytestmark = [pytest.mark.django_db, pytest.mark.urls(__name__)]
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def provider():
+    mock_provider = MagicMock()
+    mock_provider.slug = "test"
+    mock_provider.acreate_payment = AsyncMock(
+        return_value=PaymentResult(
+            approved=True,
+            provider_order_id="PROVIDER-ASYNC",
+            redirect_url="http://provider.com/approve",
+        )
+    )
+    mock_provider.acapture_payment = AsyncMock(
+        return_value=CaptureResult(approved=True, capture_id="CAP-ASYNC")
+    )
+    with (
+        patch(
+            "backend.apps.orders.views.get_payment_provider",
+            return_value=mock_provider,
+        ),
+        patch(
+            "backend.apps.orders.services.get_payment_provider",
+            return_value=mock_provider,
+        ),
+    ):
+        yield mock_provider
+
+
+class TestAsyncCheckout:
+    def test_checkout_awaits_provider(self, client, product, provider):
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+
+        response = client.post(reverse("checkout_start"), {"email": "a@test.com"})
+
+        assert response.url == "http://provider.com/approve"
+        provider.acreate_payment.assert_awaited_once()
+        provider.create_payment.assert_not_called()
+        order = Order.objects.get()
+        assert order.provider_order_id == "PROVIDER-ASYNC"
+        assert order.payment_provider == "test"
+        product.refresh_from_db()
+        assert product.stock == 9
+
+    def test_double_submit_replays(self, client, product, provider):
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+        data = {"email": "twice@test.com", "idempotency_key": "async-1"}
+
+        first = client.post(reverse("checkout_start"), data)
+        second = client.post(reverse("checkout_start"), data)
+
+        assert first.url == second.url == "http://provider.com/approve"
+        assert provider.acreate_payment.await_count == 1
+
+    def test_provider_failure(self, client, product, provider):
+        provider.acreate_payment.side_effect = RuntimeError("API down!")
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+
+        response = client.post(reverse("checkout_start"), {"email": "a@test.com"})
+
+        assert response.url == reverse("cart_detail")
+        msgs = [str(m) for m in get_messages(response.wsgi_request)]
+        assert any("Error connecting" in m for m in msgs)
+
+
+class TestAsyncPaymentReturn:
+    def test_return_captures_and_confirms(self, client, product, provider):
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+        client.post(reverse("checkout_start"), {"email": "paid@test.com"})
+        url = reverse("payment_return") + "?token=PROVIDER-ASYNC"
+
+        first = client.get(url)
+        second = client.get(url)
+
+        assert first.url == second.url
+        assert "/order/receipt/" in first.url
+        provider.acapture_payment.assert_awaited_once_with(
+            provider_order_id="PROVIDER-ASYNC"
+        )
+        order = Order.objects.get()
+        assert order.status == Order.Status.PAID
+        assert order.provider_capture_id == "CAP-ASYNC"
+        assert order.reserved_until is None
+
+    def test_capture_failure_keeps_order_pending(self, client, provider):
+        Order.objects.create(
+            email="fail@test.com",
+            provider_order_id="PROVIDER-ASYNC",
+            payment_provider="test",
+        )
+        provider.acapture_payment.side_effect = RuntimeError("declined")
+
+        response = client.get(reverse("payment_return") + "?token=PROVIDER-ASYNC")
+
+        assert response.url == reverse("cart_detail")
+        assert Order.objects.get().status == Order.Status.PENDING
+
+    def test_unknown_token(self, client, provider):
+        response = client.get(reverse("payment_return") + "?token=NOPE")
+
+        assert response.url == reverse("cart_detail")
+        provider.acapture_payment.assert_not_awaited()
@@ -0,0 +1,161 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.contrib.messages import get_messages
+from django.urls import reverse
+from django.utils import timezone
+
+from backend.apps.orders import idempotency
+from backend.apps.orders.models import CheckoutRequest, Order
+from backend.apps.orders.services import reserve_stock_and_create_pending_order
+from backend.apps.payments.base import CaptureResult, PaymentResult
+
+
+@pytest.fixture
+def provider():
+    mock_provider = MagicMock()
+    mock_provider.slug = "test"
+    mock_provider.create_payment.return_value = PaymentResult(
+        approved=True,
+        provider_order_id="PROVIDER-IDEM",
+        redirect_url="http://provider.com/approve",
+    )
+    mock_provider.capture_payment.return_value = CaptureResult(
+        approved=True, capture_id="CAP-IDEM"
+    )
+    with (
+        patch(
+            "backend.apps.orders.views.get_payment_provider",
+            return_value=mock_provider,
+        ),
+        patch(
+            "backend.apps.orders.services.get_payment_provider",
+            return_value=mock_provider,
+        ),
+    ):
+        yield mock_provider
+
+
+@pytest.mark.django_db
+class TestCheckoutIdempotency:
+    def test_forms_carry_a_fresh_key(self, client, product):
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+
+        first = client.get(reverse("cart_detail"))
+        second = client.get(reverse("cart_detail"))
+
+        assert b'name="idempotency_key"' in first.content
+        assert first.context["idempotency_key"] != second.context["idempotency_key"]
+
+    def test_double_submit_replays_first_response(self, client, product, provider):
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+        data = {"email": "twice@test.com", "idempotency_key": "k1"}
+
+        first = client.post(reverse("checkout_start"), data)
+        second = client.post(reverse("checkout_start"), data)
+
+        assert first.url == second.url == "http://provider.com/approve"
+        assert Order.objects.count() == 1
+        assert provider.create_payment.call_count == 1
+        product.refresh_from_db()
+        assert product.stock == 9
+
+    def test_duplicate_waits_for_the_first_redirect(self, client, product, provider):
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+        data = {"email": "slow@test.com", "idempotency_key": "k2"}
+        client.post(reverse("checkout_start"), data)
+        # As if the first request were still waiting on the provider.
+        CheckoutRequest.objects.update(redirect_url="")
+
+        response = client.post(reverse("checkout_start"), data)
+
+        pending_url = reverse("checkout_pending") + "?idempotency_key=k2"
+        assert response.url == pending_url
+        page = client.get(pending_url)
+        assert page.status_code == 200
+        assert b'hx-trigger="every 1s"' in page.content
+
+        # The first request answered: the poll forwards to its redirect.
+        CheckoutRequest.objects.update(redirect_url="http://provider.com/approve")
+        poll = client.get(pending_url, headers={"HX-Request": "true"})
+        assert poll["HX-Redirect"] == "http://provider.com/approve"
+        assert Order.objects.count() == 1
+        assert provider.create_payment.call_count == 1
+
+    def test_pending_page_gives_up_on_a_dead_request(self, client, product, provider):
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+        client.post(
+            reverse("checkout_start"),
+            {"email": "dead@test.com", "idempotency_key": "k4"},
+        )
+        CheckoutRequest.objects.update(
+            redirect_url="",
+            created_at=timezone.now() - idempotency.IN_PROGRESS_TIMEOUT * 2,
+        )
+
+        response = client.get(reverse("checkout_pending") + "?idempotency_key=k4")
+
+        assert response.url == reverse("cart_detail")
+        msgs = [str(m) for m in get_messages(response.wsgi_request)]
+        assert any("couldn't be started" in m for m in msgs)
+
+    def test_pending_page_is_scoped_to_the_session(self, client, product, provider):
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+        client.post(
+            reverse("checkout_start"),
+            {"email": "mine@test.com", "idempotency_key": "k5"},
+        )
+        client.cookies.clear()
+
+        response = client.get(reverse("checkout_pending") + "?idempotency_key=k5")
+
+        assert response.url == reverse("cart_detail")
+
+    def test_racing_duplicate_rolls_back(self, cart_with_item, product):
+        key = "a" * 64
+        order, _ = reserve_stock_and_create_pending_order(
+            cart_with_item, email="race@test.com", idempotency_key=key
+        )
+
+        with pytest.raises(idempotency.DuplicateCheckoutError):
+            reserve_stock_and_create_pending_order(
+                cart_with_item, email="race@test.com", idempotency_key=key
+            )
+
+        assert list(Order.objects.all()) == [order]
+        assert CheckoutRequest.objects.get().order == order
+        product.refresh_from_db()
+        assert product.stock == 9
+
+    def test_failed_request_releases_key(self, client, product, provider):
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+        data = {"email": "retry@test.com", "idempotency_key": "k3"}
+
+        with (
+            patch(
+                "backend.apps.orders.views.reserve_stock_and_create_pending_order",
+                side_effect=RuntimeError("boom"),
+            ),
+            pytest.raises(RuntimeError),
+        ):
+            client.post(reverse("checkout_start"), data)
+
+        response = client.post(reverse("checkout_start"), data)
+        assert response.url == "http://provider.com/approve"
+
+
+@pytest.mark.django_db
+class TestPaymentReturnIdempotency:
+    def test_refreshed_return_captures_once(self, client, product, provider):
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+        client.post(reverse("checkout_start"), {"email": "paid@test.com"})
+        url = reverse("payment_return") + "?token=PROVIDER-IDEM"
+
+        first = client.get(url)
+        second = client.get(url)
+
+        assert provider.capture_payment.call_count == 1
+        assert first.url == second.url
+        order = Order.objects.get()
+        assert order.status == Order.Status.PAID
+        assert order.provider_capture_id == "CAP-IDEM"
@@ -0,0 +1,171 @@
+from unittest.mock import patch
+
+import pytest
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import OperationalError
+from django.urls import reverse
+
+from backend.apps.orders import locking
+from backend.apps.orders.locking import (
+    CheckoutBusyError,
+    get_lock_wait_stats,
+    lock_products,
+    run_with_lock_retry,
+)
+from backend.apps.orders.models import Order
+from backend.apps.orders.services import reserve_stock_and_create_pending_order
+
+
+class _PgError(Exception):
+    def __init__(self, sqlstate):
+        super().__init__(sqlstate)
+        self.sqlstate = sqlstate
+
+
+def _db_error(sqlstate):
+    """OperationalError shaped like Django's wrapper around a psycopg error."""
+    exc = OperationalError(sqlstate)
+    exc.__cause__ = _PgError(sqlstate)
+    return exc
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def no_sleep():
+    with patch.object(locking.time, "sleep") as sleep:
+        yield sleep
+
+
+class TestRunWithLockRetry:
+    def test_retries_deadlock_then_succeeds(self, no_sleep):
+        calls = []
+
+        def fn():
+            calls.append(1)
+            if len(calls) < 3:
+                raise _db_error("40P01")
+            return "ok"
+
+        assert run_with_lock_retry(fn) == "ok"
+        assert len(calls) == 3
+        assert no_sleep.call_count == 2
+
+    def test_gives_up_with_checkout_busy(self, no_sleep, settings):
+        settings.CHECKOUT_LOCK_RETRIES = 2
+
+        def fn():
+            raise _db_error("40001")
+
+        with pytest.raises(CheckoutBusyError):
+            run_with_lock_retry(fn)
+        assert no_sleep.call_count == 2
+
+    def test_other_errors_are_not_retried(self, no_sleep):
+        def fn():
+            raise _db_error("23505")
+
+        with pytest.raises(OperationalError):
+            run_with_lock_retry(fn)
+        no_sleep.assert_not_called()
+
+    def test_busy_retried_only_for_nowait(self, no_sleep, settings):
+        def fn():
+            raise CheckoutBusyError("busy")
+
+        settings.CHECKOUT_LOCK_STRATEGY = "fail_fast"
+        with pytest.raises(CheckoutBusyError):
+            run_with_lock_retry(fn)
+        no_sleep.assert_not_called()
+
+        settings.CHECKOUT_LOCK_STRATEGY = "nowait"
+        settings.CHECKOUT_LOCK_RETRIES = 3
+        with pytest.raises(CheckoutBusyError):
+            run_with_lock_retry(fn)
+        assert no_sleep.call_count == 3
+
+
+@pytest.mark.django_db
+class TestLockProducts:
+    def test_returns_locked_products_and_records_wait(self, product):
+        locked = lock_products([product.id])
+
+        assert locked == {product.id: product}
+        stats = get_lock_wait_stats(product.id)
+        assert stats["count"] == 1
+        assert stats["total_ms"] >= 0
+
+    def test_lock_not_available_raises_busy(self, product, settings):
+        settings.CHECKOUT_LOCK_STRATEGY = "fail_fast"
+        with patch.object(
+            locking.Product.objects, "select_for_update"
+        ) as select_for_update:
+            select_for_update.side_effect = _db_error("55P03")
+            with pytest.raises(CheckoutBusyError):
+                lock_products([product.id])
+
+        select_for_update.assert_called_once_with(nowait=True)
+        assert get_lock_wait_stats(product.id)["count"] == 1
+
+    def test_other_database_errors_are_not_busy(self, product, settings):
+        settings.CHECKOUT_LOCK_STRATEGY = "nowait"
+        with patch.object(
+            locking.Product.objects, "select_for_update"
+        ) as select_for_update:
+            select_for_update.side_effect = _db_error("08006")  # connection lost
+            with pytest.raises(OperationalError):
+                lock_products([product.id])
+
+    def test_batch_wait_is_split_across_products(self):
+        locking._record_lock_wait([1, 2, 3, 4], 400)
+
+        assert get_lock_wait_stats(1) == {"count": 1, "total_ms": 100}
+        assert get_lock_wait_stats(4) == {"count": 1, "total_ms": 100}
+
+
+@pytest.mark.django_db
+class TestContendedCheckout:
+    def test_reserve_retries_after_deadlock(self, cart_with_item, product, no_sleep):
+        real_lock = locking.lock_products
+        calls = []
+
+        def flaky_lock(product_ids):
+            calls.append(1)
+            if len(calls) == 1:
+                raise _db_error("40P01")
+            return real_lock(product_ids)
+
+        with patch("backend.apps.orders.services.lock_products", flaky_lock):
+            order, issues = reserve_stock_and_create_pending_order(
+                cart_with_item, email="retry@example.com"
+            )
+
+        assert order is not None
+        assert issues == []
+        assert len(calls) == 2
+        product.refresh_from_db()
+        assert product.stock == 9
+
+    def test_busy_checkout_shows_high_demand_message(self, client, product):
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+
+        with patch(
+            "backend.apps.orders.services.lock_products",
+            side_effect=CheckoutBusyError("busy"),
+        ):
+            response = client.post(
+                reverse("checkout_start"), {"email": "busy@example.com"}
+            )
+
+        assert response.url == reverse("cart_detail")
+        msgs = [str(m) for m in get_messages(response.wsgi_request)]
+        assert any("high demand" in m for m in msgs)
+        assert not Order.objects.exists()
+        product.refresh_from_db()
+        assert product.stock == 10
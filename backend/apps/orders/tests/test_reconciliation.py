@@ -0,0 +1,149 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from backend.apps.cart.services import Cart
+from backend.apps.orders.models import Order, OrderTracking
+from backend.apps.orders.reconciliation import reconcile_pending_payments
+from backend.apps.orders.services import reserve_stock_and_create_pending_order
+from backend.apps.payments.base import PaymentProvider, PaymentStatus
+from backend.apps.payments.providers.stub import StubProvider
+from backend.apps.payments.services import get_payment_provider
+
+STUB = "backend.apps.payments.providers.stub.StubProvider"
+
+
+@pytest.fixture(autouse=True)
+def stub_provider(settings):
+    settings.PAYMENT_PROVIDERS = [STUB]
+    cache.clear()
+    yield get_payment_provider("stub")
+    cache.clear()
+
+
+@pytest.fixture
+def make_order(request_with_session, product):
+    def _make(token, qty=1):
+        cart = Cart(request_with_session)
+        cart.clear()
+        cart.add(product, quantity=qty)
+        order, issues = reserve_stock_and_create_pending_order(cart, email="r@x.com")
+        assert order is not None and not issues
+        Order.objects.filter(pk=order.pk).update(
+            payment_provider="stub", provider_order_id=token
+        )
+        return order
+
+    return _make
+
+
+def _reconcile(**kwargs):
+    return reconcile_pending_payments(
+        min_age=timedelta(0), now=timezone.now() + timedelta(seconds=1), **kwargs
+    )
+
+
+@pytest.mark.django_db
+class TestReconciliation:
+    def test_completed_payment_marks_order_paid(self, make_order, stub_provider):
+        order = make_order("STUB-A")
+        stub_provider.statuses["STUB-A"] = PaymentStatus(
+            PaymentStatus.COMPLETED, capture_id="CAP-A"
+        )
+
+        report = _reconcile()
+
+        order.refresh_from_db()
+        assert order.status == Order.Status.PAID
+        assert order.provider_capture_id == "CAP-A"
+        assert order.reserved_until is None
+        assert OrderTracking.objects.get(order=order).processing_at is not None
+        assert (report.checked, report.paid, report.unchanged) == (1, 1, 0)
+
+    def test_approved_payment_is_captured(self, make_order):
+        order = make_order("STUB-B")  # the stub reports approved by default
+
+        report = _reconcile()
+
+        order.refresh_from_db()
+        assert order.status == Order.Status.PAID
+        assert order.provider_capture_id == "STUB-CAP-STUB-B"
+        assert report.paid == 1
+
+    def test_voided_payment_cancels_and_restocks(
+        self, make_order, product, stub_provider
+    ):
+        order = make_order("STUB-C", qty=3)
+        stub_provider.statuses["STUB-C"] = PaymentStatus(PaymentStatus.VOIDED)
+
+        report = _reconcile()
+
+        order.refresh_from_db()
+        product.refresh_from_db()
+        assert order.status == Order.Status.CANCELED
+        assert product.stock == 10
+        assert report.canceled == 1
+
+    def test_waiting_payment_is_left_alone(self, make_order, stub_provider):
+        order = make_order("STUB-D")
+        stub_provider.statuses["STUB-D"] = PaymentStatus(PaymentStatus.PENDING)
+
+        report = _reconcile()
+
+        order.refresh_from_db()
+        assert order.status == Order.Status.PENDING
+        assert report.unchanged == 1
+
+    def test_young_and_tokenless_orders_are_skipped(self, make_order):
+        make_order("STUB-E")
+        tokenless = make_order("STUB-F")
+        Order.objects.filter(pk=tokenless.pk).update(provider_order_id="")
+
+        assert reconcile_pending_payments().checked == 0
+        assert _reconcile().checked == 1
+
+    def test_batches_and_lookup_failures(self, make_order, stub_provider):
+        for i in range(5):
+            make_order(f"STUB-G{i}")
+
+        def flaky(self, *, provider_order_id):
+            if provider_order_id == "STUB-G3":
+                raise RuntimeError("provider timeout")
+            return PaymentStatus(PaymentStatus.COMPLETED, capture_id="CAP")
+
+        with patch.object(StubProvider, "get_payment_status", flaky):
+            report = _reconcile(batch_size=2, workers=3)
+
+        assert (report.checked, report.paid, report.errors) == (5, 4, 1)
+        assert Order.objects.filter(status=Order.Status.PENDING).count() == 1
+
+    def test_providers_without_lookup_are_skipped(self, make_order, caplog):
+        order = make_order("STUB-I")
+
+        unsupported = PaymentProvider.get_payment_status
+        with patch.object(StubProvider, "get_payment_status", unsupported):
+            report = _reconcile()
+
+        order.refresh_from_db()
+        assert order.status == Order.Status.PENDING
+        assert (report.checked, report.skipped, report.errors) == (0, 1, 0)
+        assert "without status lookup: stub" in caplog.text
+
+    def test_stub_statuses_are_per_instance(self, stub_provider):
+        stub_provider.capture_payment(provider_order_id="STUB-J")
+
+        other = StubProvider().get_payment_status(provider_order_id="STUB-J")
+        assert other.state == PaymentStatus.APPROVED
+
+    def test_command(self, make_order):
+        make_order("STUB-H")
+        out = StringIO()
+
+        call_command("reconcile_payments", "--min-age-minutes=0", stdout=out)
+
+        assert "Checked" in out.getvalue()
@@ -0,0 +1,170 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.contrib.messages import get_messages
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from backend.apps.cart.services import Cart
+from backend.apps.orders.models import Order
+from backend.apps.orders.reservations import (
+    release_expired_reservations,
+    release_order_reservation,
+)
+from backend.apps.orders.services import (
+    confirm_order_paid,
+    mark_orders_paid,
+    reserve_stock_and_create_pending_order,
+)
+from backend.apps.orders.views import CHECKOUT_ORDERS_SESSION_KEY
+
+
+@pytest.fixture
+def pending_order(cart_with_item):
+    order, issues = reserve_stock_and_create_pending_order(
+        cart_with_item, email="pending@example.com"
+    )
+    assert order is not None and not issues
+    return order
+
+
+def _expire(order):
+    Order.objects.filter(pk=order.pk).update(
+        reserved_until=timezone.now() - timedelta(minutes=1)
+    )
+
+
+@pytest.mark.django_db
+class TestReservationSweeper:
+    def test_pending_order_gets_reservation_deadline(self, pending_order, settings):
+        ttl = timedelta(minutes=settings.ORDER_RESERVATION_TTL_MINUTES)
+        assert pending_order.reserved_until is not None
+        assert pending_order.reserved_until <= timezone.now() + ttl
+
+    def test_expired_order_is_cancelled_and_stock_restored(
+        self, pending_order, product
+    ):
+        product.refresh_from_db()
+        assert product.stock == 9
+
+        _expire(pending_order)
+        assert release_expired_reservations() == 1
+
+        pending_order.refresh_from_db()
+        product.refresh_from_db()
+        assert pending_order.status == Order.Status.CANCELED
+        assert pending_order.reserved_until is None
+        assert product.stock == 10
+
+    def test_live_and_paid_orders_are_left_alone(self, pending_order, product):
+        assert release_expired_reservations() == 0
+
+        _expire(pending_order)
+        Order.objects.filter(pk=pending_order.pk).update(status=Order.Status.PAID)
+        assert release_expired_reservations() == 0
+
+        product.refresh_from_db()
+        assert product.stock == 9
+
+    def test_sweeps_in_batches(self, request_with_session, product):
+        for i in range(3):
+            cart = Cart(request_with_session)
+            cart.clear()
+            cart.add(product, quantity=2)
+            order, _ = reserve_stock_and_create_pending_order(cart, email="b@x.com")
+            Order.objects.filter(pk=order.pk).update(provider_order_id=f"TOK-B{i}")
+            _expire(order)
+
+        product.refresh_from_db()
+        assert product.stock == 4
+
+        assert release_expired_reservations(batch_size=2) == 3
+
+        product.refresh_from_db()
+        assert product.stock == 10
+        assert not Order.objects.filter(status=Order.Status.PENDING).exists()
+
+    def test_management_command(self, pending_order, product):
+        _expire(pending_order)
+        out = StringIO()
+
+        call_command("release_expired_reservations", "--batch-size=10", stdout=out)
+
+        assert "Released 1 expired reservation(s)." in out.getvalue()
+        product.refresh_from_db()
+        assert product.stock == 10
+
+    def test_release_is_idempotent(self, pending_order, product):
+        assert release_order_reservation(pending_order) is True
+        assert release_order_reservation(pending_order) is False
+
+        product.refresh_from_db()
+        assert product.stock == 10
+
+
+@pytest.mark.django_db
+class TestReservationViews:
+    def _own(self, client, order):
+        session = client.session
+        session[CHECKOUT_ORDERS_SESSION_KEY] = [order.pk]
+        session.save()
+
+    def test_payment_cancel_releases_stock(self, client, pending_order, product):
+        Order.objects.filter(pk=pending_order.pk).update(provider_order_id="TOK-1")
+        self._own(client, pending_order)
+
+        page = client.get(reverse("payment_cancel") + "?token=TOK-1")
+        pending_order.refresh_from_db()
+        assert page.status_code == 200
+        assert pending_order.status == Order.Status.PENDING
+
+        response = client.post(reverse("payment_cancel"), {"token": "TOK-1"})
+
+        assert response.url == reverse("cart_detail")
+        pending_order.refresh_from_db()
+        product.refresh_from_db()
+        assert pending_order.status == Order.Status.CANCELED
+        assert product.stock == 10
+
+    def test_payment_cancel_needs_the_owning_session(
+        self, client, pending_order, product
+    ):
+        Order.objects.filter(pk=pending_order.pk).update(provider_order_id="TOK-3")
+
+        get = client.get(reverse("payment_cancel") + "?token=TOK-3")
+        post = client.post(reverse("payment_cancel"), {"token": "TOK-3"})
+
+        assert get.url == post.url == reverse("cart_detail")
+        pending_order.refresh_from_db()
+        product.refresh_from_db()
+        assert pending_order.status == Order.Status.PENDING
+        assert product.stock == 9
+
+    def test_capture_after_expiry_is_flagged_for_refund(self, pending_order):
+        _expire(pending_order)
+        release_expired_reservations()
+
+        order = confirm_order_paid(pending_order.pk, capture_id="CAP-LATE")
+
+        assert order.status == Order.Status.CANCELED
+        assert order.refund_due is True
+        assert order.provider_capture_id == "CAP-LATE"
+        assert mark_orders_paid({pending_order.pk: "CAP-LATE"}) == []
+
+    def test_expired_order_is_not_captured(self, client, pending_order):
+        Order.objects.filter(pk=pending_order.pk).update(provider_order_id="TOK-2")
+        _expire(pending_order)
+        release_expired_reservations()
+
+        with patch(
+            "backend.apps.orders.services.get_payment_provider"
+        ) as get_payment_provider:
+            response = client.get(reverse("payment_return") + "?token=TOK-2")
+
+        get_payment_provider.assert_not_called()
+        assert response.url == reverse("cart_detail")
+        msgs = [str(m) for m in get_messages(response.wsgi_request)]
+        assert any("reservation expired" in m for m in msgs)
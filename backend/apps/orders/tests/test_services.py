@@ -1,7 +1,17 @@
 import pytest
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
+from backend.apps.cart.services import Cart
 from backend.apps.orders.models import Order
-from backend.apps.orders.services import reserve_stock_and_create_pending_order
+from backend.apps.orders.reservations import release_order_reservation
+from backend.apps.orders.services import (
+    decrement_stock,
+    reserve_stock_and_create_pending_order,
+)
+from backend.apps.products.models import Product, StockSlot
+from backend.apps.products.stock import available_stock, distribute_stock
 
 
 @pytest.mark.django_db
@@ -77,3 +87,87 @@ class TestOrderServices:
         assert item.qty == 1
         assert item.unit_price == 100.00
         assert item.line_total == 100.00
+
+    def test_query_count_independent_of_line_count(
+        self, request_with_session, category
+    ):
+        cart = Cart(request_with_session)
+        products = [
+            Product.objects.create(
+                category=category, name=f"P{i}", slug=f"p{i}", price=5, stock=3
+            )
+            for i in range(20)
+        ]
+        for p in products:
+            cart.add(p, quantity=2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            order, issues = reserve_stock_and_create_pending_order(
+                cart, email="bulk@example.com"
+            )
+
+        assert issues == []
+        assert order is not None
+        assert order.items.count() == 20
+        assert order.subtotal == 200
+        assert set(
+            Product.objects.filter(pk__in=[p.pk for p in products]).values_list(
+                "stock", flat=True
+            )
+        ) == {1}
+        # lock + order insert + stock update + items insert (+ savepoint noise)
+        assert len(ctx.captured_queries) <= 6
+
+    def test_decrement_stock_rejects_partial_update(self, product):
+        with pytest.raises(ValidationError):
+            decrement_stock({product.id: product.stock + 1})
+
+        product.refresh_from_db()
+        assert product.stock == 10
+
+
+@pytest.mark.django_db
+class TestHighDemandCheckout:
+    @pytest.fixture
+    def sharded(self, product):
+        product.stock_slot_count = 3
+        product.save()
+        distribute_stock(product)
+        return product
+
+    def test_reserves_from_slots_without_row_lock(
+        self, cart_with_item, sharded, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            order, issues = reserve_stock_and_create_pending_order(
+                cart_with_item, email="drop@example.com"
+            )
+
+        assert issues == []
+        assert order is not None
+        assert order.items.get().product_id == sharded.id
+        assert available_stock(sharded.id) == 9
+        sharded.refresh_from_db()
+        assert sharded.stock == 9
+
+    def test_slot_shortfall_is_a_stock_issue(self, cart_with_item, sharded):
+        # The displayed stock still says 10, the slots are empty.
+        StockSlot.objects.filter(product=sharded).update(quantity=0)
+
+        order, issues = reserve_stock_and_create_pending_order(
+            cart_with_item, email="late@example.com"
+        )
+
+        assert order is None
+        assert issues[0].product_id == sharded.id
+        assert issues[0].available == 0
+        assert not Order.objects.exists()
+
+    def test_released_reservation_returns_to_slots(self, cart_with_item, sharded):
+        order, _ = reserve_stock_and_create_pending_order(
+            cart_with_item, email="gone@example.com"
+        )
+        assert order is not None
+
+        assert release_order_reservation(order) is True
+        assert available_stock(sharded.id) == 10
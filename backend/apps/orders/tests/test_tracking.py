@@ -1,7 +1,12 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-from backend.apps.orders.models import Order, OrderTracking
+from backend.apps.orders.models import Order, OrderTracking, OrderTrackingEvent
+from backend.apps.orders.signing import sign_order_track_id
 from backend.apps.orders.tracking_services import (
+    bulk_update_tracking_status,
     get_or_create_tracking,
     update_tracking_status,
 )
@@ -58,3 +63,143 @@ class TestTrackingService:
         tracking, issues = update_tracking_status(order=unpaid, new_status="packed")
         assert tracking is None
         assert issues[0].code == "not_paid"
+
+
+@pytest.mark.django_db
+class TestBulkTrackingUpdate:
+    @pytest.fixture
+    def paid_orders(self):
+        orders = [
+            Order.objects.create(
+                email=f"bulk{i}@test.com",
+                status=Order.Status.PAID,
+                provider_order_id=f"PP-BULK-{i}",
+            )
+            for i in range(4)
+        ]
+        for order in orders:
+            get_or_create_tracking(order)
+        return orders
+
+    def test_moves_orders_and_logs_events(self, paid_orders):
+        ids = [order.pk for order in paid_orders]
+
+        result = bulk_update_tracking_status(
+            order_ids=ids, new_status=OrderTracking.FulfillmentStatus.PACKED, note="x"
+        )
+
+        assert sorted(result.updated) == ids
+        assert not result.skipped
+        trackings = OrderTracking.objects.filter(order_id__in=ids)
+        assert {t.status for t in trackings} == {"packed"}
+        assert all(t.packed_at is not None for t in trackings)
+        events = OrderTrackingEvent.objects.filter(tracking__in=trackings)
+        assert events.count() == 4
+        assert {(e.from_status, e.to_status, e.note) for e in events} == {
+            ("processing", "packed", "x")
+        }
+
+    def test_invalid_orders_are_skipped(self, paid_orders):
+        shipped, fresh, *_ = paid_orders
+        update_tracking_status(order=shipped, new_status="packed")
+        update_tracking_status(order=shipped, new_status="shipped")
+        unpaid = Order.objects.create(status=Order.Status.PENDING)
+
+        result = bulk_update_tracking_status(
+            order_ids=[shipped.pk, fresh.pk, unpaid.pk, 999999], new_status="packed"
+        )
+
+        assert result.updated == [fresh.pk]
+        assert {pk: issue.code for pk, issue in result.skipped.items()} == {
+            shipped.pk: "invalid_transition",
+            unpaid.pk: "not_paid",
+            999999: "not_found",
+        }
+        assert OrderTracking.objects.get(order=shipped).status == "shipped"
+        assert not OrderTracking.objects.filter(order=unpaid).exists()
+
+    def test_paid_order_without_tracking_is_included(self):
+        order = Order.objects.create(status=Order.Status.PAID)
+        OrderTracking.objects.filter(order=order).delete()
+
+        result = bulk_update_tracking_status(order_ids=[order.pk], new_status="packed")
+
+        assert result.updated == [order.pk]
+        tracking = OrderTracking.objects.get(order=order)
+        assert tracking.processing_at is not None
+        assert tracking.packed_at is not None
+
+    def test_queries_per_batch_are_constant(self, paid_orders):
+        ids = [order.pk for order in paid_orders]
+
+        with CaptureQueriesContext(connection) as ctx:
+            bulk_update_tracking_status(order_ids=ids[:2], new_status="packed")
+        with CaptureQueriesContext(connection) as more:
+            bulk_update_tracking_status(order_ids=ids[2:], new_status="packed")
+        with CaptureQueriesContext(connection) as batched:
+            bulk_update_tracking_status(
+                order_ids=ids, new_status="shipped", batch_size=2
+            )
+
+        assert len(ctx) == len(more)
+        assert len(batched) == 2 * len(ctx)
+
+    def test_admin_action(self, client, django_user_model, paid_orders):
+        admin_user = django_user_model.objects.create_superuser(
+            email="staff@test.com", password="pw"
+        )
+        client.force_login(admin_user)
+
+        client.post(
+            reverse("admin:orders_order_changelist"),
+            {
+                "action": "mark_packed",
+                "_selected_action": [order.pk for order in paid_orders[:2]],
+            },
+        )
+
+        packed = OrderTracking.objects.filter(status="packed")
+        assert {t.order_id for t in packed} == {o.pk for o in paid_orders[:2]}
+        assert OrderTrackingEvent.objects.filter(actor=admin_user).count() == 2
+
+
+@pytest.mark.django_db
+class TestTrackingPages:
+    @pytest.fixture
+    def paid_order(self):
+        order = Order.objects.create(email="track@test.com", status=Order.Status.PAID)
+        get_or_create_tracking(order)  # as at payment time
+        return order
+
+    def _get(self, client, order):
+        token = sign_order_track_id(order.id)
+        return client.get(reverse("guest_order_track", kwargs={"token": token}))
+
+    def test_read_is_lock_free(self, client, paid_order):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._get(client, paid_order)
+
+        assert response.status_code == 200
+        sql = [q["sql"].upper() for q in ctx.captured_queries]
+        assert not any(q.startswith(("INSERT", "UPDATE", "SAVEPOINT")) for q in sql)
+        assert not any("FOR UPDATE" in q for q in sql)
+        # Order + tracking joined in one query, then the events.
+        tracking_reads = [q for q in sql if "ORDERTRACKING" in q]
+        assert len(tracking_reads) == 2
+        assert "JOIN" in tracking_reads[0]
+
+    def test_paid_order_without_tracking_gets_one(self, client):
+        order = Order.objects.create(email="old@test.com", status=Order.Status.PAID)
+
+        response = self._get(client, order)
+
+        assert response.status_code == 200
+        assert OrderTracking.objects.filter(order=order).exists()
+
+    def test_unpaid_order_has_no_tracking_page(self, client):
+        order = Order.objects.create(email="new@test.com")
+
+        response = self._get(client, order)
+
+        assert response.status_code == 404
+        assert not OrderTracking.objects.exists()
@@ -27,9 +27,15 @@ class TestOrderViews:
             capture_id="CAP-123",
         )
 
-        with patch(
-            "backend.apps.orders.views.get_payment_provider",
-            return_value=mock_provider,
+        with (
+            patch(
+                "backend.apps.orders.views.get_payment_provider",
+                return_value=mock_provider,
+            ),
+            patch(
+                "backend.apps.orders.services.get_payment_provider",
+                return_value=mock_provider,
+            ),
         ):
             yield mock_provider
 
@@ -107,3 +113,25 @@ class TestOrderViews:
 
             msgs = [str(m) for m in get_messages(response.wsgi_request)]
             assert any("Error connecting" in m for m in msgs)
+
+    def test_payment_return_uses_the_orders_provider(self, client, product):
+        order = Order.objects.create(
+            email="multi@test.com",
+            provider_order_id="DUMMY-1",
+            payment_provider="dummy",
+        )
+        dummy = MagicMock()
+        dummy.slug = "dummy"
+        dummy.capture_payment.return_value = CaptureResult(
+            approved=True, capture_id="CAP-DUMMY"
+        )
+
+        with patch(
+            "backend.apps.orders.services.get_payment_provider", return_value=dummy
+        ) as get_provider:
+            client.get(reverse("payment_return") + "?token=DUMMY-1")
+
+        get_provider.assert_called_once_with("dummy")
+        order.refresh_from_db()
+        assert order.status == Order.Status.PAID
+        assert order.provider_capture_id == "CAP-DUMMY"
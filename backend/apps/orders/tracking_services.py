@@ -1,9 +1,13 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections.abc import Iterable
+from dataclasses import dataclass, field
 from typing import Any
 
 from django.db import transaction
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from .models import Order, OrderTracking, OrderTrackingEvent
 
@@ -14,6 +18,15 @@ class TrackingIssue:
     message: str
 
 
+BULK_BATCH_SIZE = 200
+
+
+@dataclass
+class BulkTrackingResult:
+    updated: list[int] = field(default_factory=list)  # order ids
+    skipped: dict[int, TrackingIssue] = field(default_factory=dict)
+
+
 _ALLOWED_NEXT: dict[str, set[str]] = {
     OrderTracking.FulfillmentStatus.PROCESSING: {
         OrderTracking.FulfillmentStatus.PACKED
@@ -116,3 +129,123 @@ def update_tracking_status(
     tracking.save()
 
     return tracking, []
+
+
+def _bulk_issue(
+    order_status: str | None, current: str, new_status: str
+) -> TrackingIssue | None:
+    if order_status is None:
+        return TrackingIssue(code="not_found", message="Order does not exist.")
+    if order_status == Order.Status.CANCELED:
+        return TrackingIssue(
+            code="canceled",
+            message="Tracking cannot be updated for canceled orders.",
+        )
+    if order_status != Order.Status.PAID:
+        return TrackingIssue(
+            code="not_paid",
+            message="Tracking can only be updated for paid orders.",
+        )
+    if current == new_status:
+        return TrackingIssue(code="unchanged", message=f"Already '{current}'.")
+    if new_status not in _ALLOWED_NEXT.get(current, set()):
+        return TrackingIssue(
+            code="invalid_transition",
+            message=f"Cannot move from '{current}' to '{new_status}'.",
+        )
+    return None
+
+
+@transaction.atomic
+def _bulk_update_batch(
+    order_ids: list[int],
+    *,
+    new_status: str,
+    actor: Any,
+    note: str,
+    result: BulkTrackingResult,
+) -> None:
+    order_status = dict(
+        Order.objects.filter(pk__in=order_ids).values_list("pk", "status")
+    )
+
+    # Paid orders from before tracking existed get their row now, as
+    # get_or_create_tracking would.
+    paid = [pk for pk, status in order_status.items() if status == Order.Status.PAID]
+    now = timezone.now()
+    OrderTracking.objects.bulk_create(
+        [OrderTracking(order_id=pk, processing_at=now) for pk in paid],
+        ignore_conflicts=True,
+    )
+    current = dict(
+        OrderTracking.objects.select_for_update()
+        .filter(order_id__in=order_ids)
+        .order_by("pk")
+        .values_list("order_id", "status")
+    )
+
+    valid: list[int] = []
+    for pk in order_ids:
+        issue = _bulk_issue(order_status.get(pk), current.get(pk, ""), new_status)
+        if issue is None:
+            valid.append(pk)
+        else:
+            result.skipped[pk] = issue
+    if not valid:
+        return
+
+    milestone = OrderTracking.MILESTONE_FIELDS[new_status]
+    OrderTracking.objects.filter(order_id__in=valid).update(
+        status=new_status,
+        updated_at=now,
+        **{milestone: Coalesce(F(milestone), Value(now, DateTimeField()))},
+    )
+    tracking_ids = dict(
+        OrderTracking.objects.filter(order_id__in=valid).values_list("order_id", "pk")
+    )
+    OrderTrackingEvent.objects.bulk_create(
+        OrderTrackingEvent(
+            tracking_id=tracking_ids[pk],
+            from_status=current[pk],
+            to_status=new_status,
+            actor=actor,
+            note=note,
+        )
+        for pk in valid
+    )
+    result.updated.extend(valid)
+
+
+def bulk_update_tracking_status(
+    *,
+    order_ids: Iterable[int],
+    new_status: str,
+    actor: Any = None,
+    note: str = "",
+    batch_size: int = BULK_BATCH_SIZE,
+) -> BulkTrackingResult:
+    """
+    Moves many paid orders to `new_status` (e.g. a day's parcels to shipped).
+    Transitions are checked against _ALLOWED_NEXT in memory; each batch is
+    one transaction with a single UPDATE and one bulk insert of events.
+    Orders that can't move are skipped and reported, not raised.
+    """
+    result = BulkTrackingResult()
+    if new_status not in OrderTracking.MILESTONE_FIELDS:
+        issue = TrackingIssue(
+            code="invalid_status", message=f"Unknown status '{new_status}'."
+        )
+        result.skipped = dict.fromkeys(order_ids, issue)
+        return result
+
+    ids = sorted(set(order_ids))
+    actor = actor if getattr(actor, "is_authenticated", False) else None
+    for start in range(0, len(ids), batch_size):
+        _bulk_update_batch(
+            ids[start : start + batch_size],
+            new_status=new_status,
+            actor=actor,
+            note=note.strip(),
+            result=result,
+        )
+    return result
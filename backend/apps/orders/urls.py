@@ -1,10 +1,27 @@
+from collections.abc import Callable
+from typing import Any
+
+from django.conf import settings
+from django.http import HttpRequest
 from django.urls import path
 
 from . import views
 
+checkout_start: Callable[[HttpRequest], Any]
+payment_return: Callable[[HttpRequest], Any]
+
+# ASGI deployments await the provider round trip instead of holding a worker.
+if getattr(settings, "CHECKOUT_ASYNC_VIEWS", False):
+    checkout_start, payment_return = views.acheckout_start, views.apayment_return
+else:
+    checkout_start, payment_return = views.checkout_start, views.payment_return
+
 urlpatterns = [
-    path("checkout/", views.checkout_start, name="checkout_start"),
-    path("payment/return/", views.payment_return, name="payment_return"),
+    path("checkout/", checkout_start, name="checkout_start"),
+    path("checkout/queue/", views.checkout_queue, name="checkout_queue"),
+    path("checkout/pending/", views.checkout_pending, name="checkout_pending"),
+    path("payment/return/", payment_return, name="payment_return"),
+    path("payment/status/", views.payment_status, name="payment_status"),
     path("payment/cancel/", views.payment_cancel, name="payment_cancel"),
     path("orders/", views.orders_list, name="orders_list"),
     path(
@@ -1,5 +1,7 @@
 from typing import cast
+from urllib.parse import urlencode
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
@@ -8,20 +10,185 @@ from django.http import Http404, HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods
+from django_htmx.http import HttpResponseClientRedirect
 
 from backend.apps.accounts.models import User
-from backend.apps.cart.services import Cart
+from backend.apps.cart.services import get_cart
+from backend.apps.payments import breaker
+from backend.apps.payments.base import PaymentProvider, PaymentResult
 from backend.apps.payments.services import get_payment_provider
-
-from .models import Order
-from .services import reserve_stock_and_create_pending_order
+from backend.apps.payments.webhooks import (
+    async_capture_enabled,
+    capture_failed,
+    request_capture,
+)
+
+from . import admission, idempotency
+from .locking import CheckoutBusyError
+from .models import Order, OrderTracking
+from .reservations import release_order_reservation
+from .selectors import get_order_tracking, get_tracking_events, get_tracking_orders
+from .services import (
+    acapture_order_payment,
+    capture_order_payment,
+    reserve_stock_and_create_pending_order,
+)
 from .signing import sign_order_id, unsign_order_id, unsign_order_track_id
 from .tracking_services import get_or_create_tracking
 
+PAYMENT_STATUS_POLL_SECONDS = 2
+CHECKOUT_PENDING_POLL_SECONDS = 1
+# Orders this session started checkouts for (guests have no other link).
+CHECKOUT_ORDERS_SESSION_KEY = "checkout_orders"
+CHECKOUT_ORDERS_REMEMBERED = 5
+PAYMENTS_UNAVAILABLE = (
+    "Payments are temporarily unavailable. Please try again in a few minutes."
+)
+CAPTURE_FAILED = "Payment capture failed. Please contact support."
+
 
 @require_http_methods(["GET", "POST"])
 def checkout_start(request: HttpRequest) -> HttpResponse:
-    cart = Cart(request)
+    key = idempotency.request_key(request)
+    if key:
+        replay = idempotency.replay(key)
+        if replay is not None:
+            return _replay_checkout(request, replay)
+
+    try:
+        response = _checkout_start(request, key)
+    except idempotency.DuplicateCheckoutError:
+        return _replay_checkout(request, idempotency.replay(key) or "")
+    except Exception:
+        if key:
+            idempotency.release(key)
+        raise
+    finally:
+        admission.finish(request)
+
+    if key:
+        idempotency.store(key, response)
+    return response
+
+
+@require_http_methods(["GET", "POST"])
+async def acheckout_start(request: HttpRequest) -> HttpResponse:
+    """
+    checkout_start for ASGI deployments (CHECKOUT_ASYNC_VIEWS): the provider
+    call is awaited, so a worker isn't held for the round trip. The
+    database work still runs in sync code, via sync_to_async.
+    """
+    key = await sync_to_async(idempotency.request_key)(request)
+    if key:
+        replay = await sync_to_async(idempotency.replay)(key)
+        if replay is not None:
+            return await sync_to_async(_replay_checkout)(request, replay)
+
+    try:
+        response = await _acheckout_start(request, key)
+    except idempotency.DuplicateCheckoutError:
+        replay = await sync_to_async(idempotency.replay)(key)
+        return await sync_to_async(_replay_checkout)(request, replay or "")
+    except Exception:
+        if key:
+            await sync_to_async(idempotency.release)(key)
+        raise
+    finally:
+        await sync_to_async(admission.finish)(request)
+
+    if key:
+        await sync_to_async(idempotency.store)(key, response)
+    return response
+
+
+def _replay_checkout(request: HttpRequest, replay: str) -> HttpResponse:
+    # Duplicate submit (double-click/retry): replay, don't redo the work.
+    if replay:
+        return redirect(replay)
+    # The first submit is still waiting on the provider, and the browser
+    # only shows this response: wait for the first one's redirect.
+    return redirect(_checkout_pending_url(request.POST.get(idempotency.FIELD_NAME)))
+
+
+def _checkout_pending_url(token: str | None) -> str:
+    query = urlencode({idempotency.FIELD_NAME: (token or "").strip()})
+    return f"{reverse('checkout_pending')}?{query}"
+
+
+@require_http_methods(["GET"])
+def checkout_pending(request: HttpRequest) -> HttpResponse:
+    """Polled by a duplicate submit until the first one's redirect is stored."""
+    token = request.GET.get(idempotency.FIELD_NAME) or ""
+    key = idempotency.request_key(request, token)
+    replay = idempotency.replay(key) if key else None
+    is_htmx = bool(getattr(request, "htmx", False))
+
+    if replay == "":
+        template = (
+            "orders/_checkout_pending.html"
+            if is_htmx
+            else "orders/checkout_pending.html"
+        )
+        return render(
+            request,
+            template,
+            {"token": token, "poll_seconds": CHECKOUT_PENDING_POLL_SECONDS},
+        )
+
+    if replay:
+        url = replay
+    else:
+        # The first submit failed; its response, with the reason, went unseen.
+        messages.error(request, "Checkout couldn't be started. Please try again.")
+        url = reverse("cart_detail")
+    return HttpResponseClientRedirect(url) if is_htmx else redirect(url)
+
+
+def _checkout_start(request: HttpRequest, key: str) -> HttpResponse:
+    started = _begin_checkout(request, key)
+    if isinstance(started, HttpResponse):
+        return started
+
+    order, provider = started
+    return_url, cancel_url = _payment_urls(request)
+    try:
+        with breaker.guard(provider.slug, "create_payment"):
+            result = provider.create_payment(
+                order=order,
+                return_url=return_url,
+                cancel_url=cancel_url,
+            )
+    except Exception as exc:
+        return _payment_not_started(request, order, exc)
+
+    return _payment_started(request, order, provider, result)
+
+
+async def _acheckout_start(request: HttpRequest, key: str) -> HttpResponse:
+    started = await sync_to_async(_begin_checkout)(request, key)
+    if isinstance(started, HttpResponse):
+        return started
+
+    order, provider = started
+    return_url, cancel_url = _payment_urls(request)
+    try:
+        async with breaker.aguard(provider.slug, "create_payment"):
+            result = await provider.acreate_payment(
+                order=order,
+                return_url=return_url,
+                cancel_url=cancel_url,
+            )
+    except Exception as exc:
+        return await sync_to_async(_payment_not_started)(request, order, exc)
+
+    return await sync_to_async(_payment_started)(request, order, provider, result)
+
+
+def _begin_checkout(
+    request: HttpRequest, key: str
+) -> HttpResponse | tuple[Order, PaymentProvider]:
+    """Everything before the provider call: a response, or the reserved order."""
+    cart = get_cart(request)
 
     if len(cart) == 0:
         messages.info(request, "Your cart is empty.")
@@ -32,20 +199,42 @@ def checkout_start(request: HttpRequest) -> HttpResponse:
 
     if not user:
         if request.method == "GET":
-            return render(request, "orders/checkout_guest_email.html")
+            # Back from the waiting room: the email was given before queueing.
+            email = admission.admitted_email(request)
+            if not email:
+                return render(
+                    request,
+                    "orders/checkout_guest_email.html",
+                    {"idempotency_key": idempotency.new_key()},
+                )
+        else:
+            email = (request.POST.get("email") or "").strip()
+            if not email:
+                messages.error(request, "Please enter your email to continue.")
+                return redirect("checkout_start")
 
-        email = (request.POST.get("email") or "").strip()
-        if not email:
-            messages.error(request, "Please enter your email to continue.")
-            return redirect("checkout_start")
+    provider = get_payment_provider()
+    if breaker.circuit_state(provider.slug) == breaker.OPEN:
+        # Don't reserve stock for a payment that can't be started.
+        messages.error(request, PAYMENTS_UNAVAILABLE)
+        return redirect("cart_detail")
+
+    if not admission.admit(request, email=email):
+        return redirect("checkout_queue")
 
     try:
         order, issues = reserve_stock_and_create_pending_order(
-            cart, user=user, email=email
+            cart, user=user, email=email, idempotency_key=key
         )
     except ValidationError as e:
         messages.error(request, str(e))
         return redirect("cart_detail")
+    except CheckoutBusyError:
+        messages.warning(
+            request,
+            "We're seeing very high demand right now. Please try again in a moment.",
+        )
+        return redirect("cart_detail")
 
     if issues:
         for issue in issues:
@@ -63,28 +252,40 @@ def checkout_start(request: HttpRequest) -> HttpResponse:
         return redirect("cart_detail")
 
     assert order is not None
+    return order, provider
 
-    return_url = request.build_absolute_uri(reverse("payment_return"))
-    cancel_url = request.build_absolute_uri(reverse("payment_cancel"))
 
-    provider = get_payment_provider()
+def _payment_urls(request: HttpRequest) -> tuple[str, str]:
+    return (
+        request.build_absolute_uri(reverse("payment_return")),
+        request.build_absolute_uri(reverse("payment_cancel")),
+    )
 
-    try:
-        result = provider.create_payment(
-            order=order,
-            return_url=return_url,
-            cancel_url=cancel_url,
-        )
-    except Exception:
+
+def _payment_not_started(
+    request: HttpRequest, order: Order, exc: Exception
+) -> HttpResponse:
+    if isinstance(exc, breaker.PaymentUnavailableError):
+        release_order_reservation(order)
+        messages.error(request, PAYMENTS_UNAVAILABLE)
+    else:
         messages.error(
             request,
             "Error connecting to PayPal. Please try again.",
         )
-        return redirect("cart_detail")
+    return redirect("cart_detail")
+
 
+def _payment_started(
+    request: HttpRequest,
+    order: Order,
+    provider: PaymentProvider,
+    result: PaymentResult,
+) -> HttpResponse:
     order.payment_provider = provider.slug
     order.provider_order_id = result.provider_order_id
     order.save(update_fields=["payment_provider", "provider_order_id"])
+    _remember_checkout_order(request, order)
 
     if not result.redirect_url:
         messages.error(
@@ -96,6 +297,90 @@ def checkout_start(request: HttpRequest) -> HttpResponse:
     return redirect(result.redirect_url)
 
 
+def _remember_checkout_order(request: HttpRequest, order: Order) -> None:
+    recent = [
+        pk
+        for pk in request.session.get(CHECKOUT_ORDERS_SESSION_KEY, [])
+        if pk != order.pk
+    ]
+    request.session[CHECKOUT_ORDERS_SESSION_KEY] = [order.pk, *recent][
+        :CHECKOUT_ORDERS_REMEMBERED
+    ]
+
+
+def _owns_checkout_order(request: HttpRequest, order: Order) -> bool:
+    if order.user_id:
+        return bool(request.user.is_authenticated and order.user_id == request.user.id)
+    return order.pk in request.session.get(CHECKOUT_ORDERS_SESSION_KEY, [])
+
+
+@require_http_methods(["GET"])
+def checkout_queue(request: HttpRequest) -> HttpResponse:
+    """Waiting room; the status fragment polls itself until admitted."""
+    is_htmx = bool(getattr(request, "htmx", False))
+
+    if not admission.in_queue(request):
+        status = admission.QueueStatus(admitted=True)
+    else:
+        status = admission.poll(request)
+
+    if status.admitted:
+        url = reverse("checkout_start")
+        return HttpResponseClientRedirect(url) if is_htmx else redirect(url)
+
+    context = {"status": status, "poll_seconds": admission.POLL_SECONDS}
+    template = "orders/_queue_status.html" if is_htmx else "orders/checkout_queue.html"
+    return render(request, template, context)
+
+
+def _payment_confirmed(request: HttpRequest, order: Order) -> str:
+    """Clears the cart and returns where a paid order's shopper goes next."""
+    get_cart(request).clear()
+
+    messages.success(
+        request,
+        f"Payment confirmed! Order #{order.id} is being processed.",
+    )
+
+    if order.user_id:
+        return reverse("orders_list")
+
+    token = sign_order_id(order.id)
+    return reverse("guest_order_success", kwargs={"token": token})
+
+
+def _reservation_expired(request: HttpRequest, order: Order) -> str:
+    if order.refund_due:
+        messages.error(
+            request,
+            "Your reservation expired before your payment reached us. "
+            "The payment will be refunded; please check out again.",
+        )
+    else:
+        messages.error(
+            request,
+            "Your reservation expired before payment was completed. "
+            "Please check out again.",
+        )
+    return reverse("cart_detail")
+
+
+def _payment_status_url(provider_order_id: str) -> str:
+    return f"{reverse('payment_status')}?{urlencode({'token': provider_order_id})}"
+
+
+def _payment_outcome(request: HttpRequest, order: Order) -> HttpResponse:
+    if order.status == Order.Status.CANCELED:
+        return redirect(_reservation_expired(request, order))
+
+    return redirect(_payment_confirmed(request, order))
+
+
+def _capture_failed(request: HttpRequest) -> HttpResponse:
+    messages.error(request, CAPTURE_FAILED)
+    return redirect("cart_detail")
+
+
 def payment_return(request: HttpRequest) -> HttpResponse:
     provider_order_id = (request.GET.get("token") or "").strip()
 
@@ -109,42 +394,130 @@ def payment_return(request: HttpRequest) -> HttpResponse:
         messages.error(request, "Order not found.")
         return redirect("cart_detail")
 
-    if order.status != Order.Status.PAID:
-        provider = get_payment_provider()
+    # Already captured (refresh / duplicate return / webhook got there
+    # first): straight to the success redirect, no lock, no provider call.
+    if order.status == Order.Status.PENDING:
+        if async_capture_enabled():
+            # The payment worker captures; the shopper watches a status page.
+            request_capture(order)
+            return redirect(_payment_status_url(provider_order_id))
 
         try:
-            capture = provider.capture_payment(
-                provider_order_id=provider_order_id,
-            )
+            order = capture_order_payment(order.id)
+        except breaker.PaymentUnavailableError:
+            # Approved at the provider: the worker captures once it recovers.
+            request_capture(order)
+            return redirect(_payment_status_url(provider_order_id))
         except Exception:
-            messages.error(
-                request,
-                "Payment capture failed. Please contact support.",
-            )
-            return redirect("cart_detail")
+            return _capture_failed(request)
 
-        order.status = Order.Status.PAID
-        order.provider_capture_id = capture.capture_id  # ← CaptureResult
-        order.save(update_fields=["status", "provider_capture_id"])
+    return _payment_outcome(request, order)
 
-        get_or_create_tracking(order)
 
-    Cart(request).clear()
+async def apayment_return(request: HttpRequest) -> HttpResponse:
+    """payment_return for ASGI deployments; the capture call is awaited."""
+    provider_order_id = (request.GET.get("token") or "").strip()
 
-    messages.success(
-        request,
-        f"Payment confirmed! Order #{order.id} is being processed.",
-    )
+    if not provider_order_id:
+        messages.error(request, "Missing payment token.")
+        return redirect("cart_detail")
 
-    if order.user_id:
-        return redirect("orders_list")
+    order = await Order.objects.filter(provider_order_id=provider_order_id).afirst()
+    if order is None:
+        messages.error(request, "Order not found.")
+        return redirect("cart_detail")
 
-    token = sign_order_id(order.id)
-    return redirect("guest_order_success", token=token)
+    if order.status == Order.Status.PENDING:
+        if async_capture_enabled():
+            await sync_to_async(request_capture)(order)
+            return redirect(_payment_status_url(provider_order_id))
+
+        try:
+            order = await acapture_order_payment(order.id)
+        except breaker.PaymentUnavailableError:
+            await sync_to_async(request_capture)(order)
+            return redirect(_payment_status_url(provider_order_id))
+        except Exception:
+            return _capture_failed(request)
+
+    return await sync_to_async(_payment_outcome)(request, order)
+
+
+@require_http_methods(["GET"])
+def payment_status(request: HttpRequest) -> HttpResponse:
+    """Polled while the payment worker captures the order."""
+    provider_order_id = (request.GET.get("token") or "").strip()
+    is_htmx = bool(getattr(request, "htmx", False))
+
+    order = (
+        Order.objects.filter(provider_order_id=provider_order_id)
+        .only(
+            "id",
+            "status",
+            "user_id",
+            "refund_due",
+            "payment_provider",
+            "provider_order_id",
+        )
+        .first()
+        if provider_order_id
+        else None
+    )
+    if order is None:
+        messages.error(request, "Order not found.")
+        url = reverse("cart_detail")
+    elif order.status == Order.Status.PENDING and capture_failed(order):
+        # The worker gave up: stop polling and tell the shopper.
+        messages.error(request, CAPTURE_FAILED)
+        url = reverse("cart_detail")
+    elif order.status == Order.Status.PENDING:
+        template = (
+            "orders/_payment_status.html" if is_htmx else "orders/payment_pending.html"
+        )
+        return render(
+            request,
+            template,
+            {"token": provider_order_id, "poll_seconds": PAYMENT_STATUS_POLL_SECONDS},
+        )
+    elif order.status == Order.Status.CANCELED:
+        url = _reservation_expired(request, order)
+    else:
+        url = _payment_confirmed(request, order)
 
+    return HttpResponseClientRedirect(url) if is_htmx else redirect(url)
 
+
+@require_http_methods(["GET", "POST"])
 def payment_cancel(request: HttpRequest) -> HttpResponse:
-    messages.info(request, "Payment process cancelled.")
+    """
+    The provider sends the shopper here (GET) after they cancel; that only
+    offers to cancel the order. Releasing the reservation takes a POST from
+    the session or user that started the checkout.
+    """
+    params = request.POST if request.method == "POST" else request.GET
+    provider_order_id = (params.get("token") or "").strip()
+    order = (
+        Order.objects.filter(
+            provider_order_id=provider_order_id, status=Order.Status.PENDING
+        ).first()
+        if provider_order_id
+        else None
+    )
+    if order is not None and not _owns_checkout_order(request, order):
+        order = None
+
+    if order is not None and request.method == "GET":
+        return render(
+            request,
+            "orders/payment_cancel.html",
+            {"order": order, "token": provider_order_id},
+        )
+
+    if order is not None:
+        release_order_reservation(order)
+        messages.info(request, "Your order was cancelled.")
+    else:
+        messages.info(request, "Payment process cancelled.")
     return redirect("cart_detail")
 
 
@@ -201,26 +574,42 @@ def orders_list(request: HttpRequest) -> HttpResponse:
     return render(request, template, context)
 
 
+def _tracking_for(order: Order) -> OrderTracking | None:
+    tracking = get_order_tracking(order)
+    if tracking is None and order.status == Order.Status.PAID:
+        # Paid before tracking was created at payment time: create it once.
+        tracking = get_or_create_tracking(order)
+    return tracking
+
+
+def _render_tracking(
+    request: HttpRequest, order: Order, tracking: OrderTracking
+) -> HttpResponse:
+    return render(
+        request,
+        "orders/order_tracking.html",
+        {
+            "order": order,
+            "tracking": tracking,
+            "events": get_tracking_events(tracking),
+        },
+    )
+
+
 @login_required
 def order_track(request: HttpRequest, order_id: int) -> HttpResponse:
     order = get_object_or_404(
-        Order.objects.prefetch_related("items", "items__product"),
+        get_tracking_orders(),
         id=order_id,
         user=request.user,
     )
 
-    tracking = get_or_create_tracking(order)
+    tracking = _tracking_for(order)
     if tracking is None:
         messages.info(request, "Payment not confirmed yet.")
         return redirect("orders_list")
 
-    events = tracking.events.all()
-
-    return render(
-        request,
-        "orders/order_tracking.html",
-        {"order": order, "tracking": tracking, "events": events},
-    )
+    return _render_tracking(request, order, tracking)
 
 
 def guest_order_track(request: HttpRequest, token: str) -> HttpResponse:
@@ -228,24 +617,15 @@ def guest_order_track(request: HttpRequest, token: str) -> HttpResponse:
     if not order_id:
         raise Http404("Invalid or expired tracking link.")
 
-    order = get_object_or_404(
-        Order.objects.prefetch_related("items", "items__product"),
-        id=order_id,
-    )
+    order = get_object_or_404(get_tracking_orders(), id=order_id)
 
     if order.user_id and (
         not request.user.is_authenticated or order.user_id != request.user.id
     ):
         raise Http404()
 
-    tracking = get_or_create_tracking(order)
+    tracking = _tracking_for(order)
     if tracking is None:
         raise Http404("Tracking not available.")
 
-    events = tracking.events.all()
-
-    return render(
-        request,
-        "orders/order_tracking.html",
-        {"order": order, "tracking": tracking, "events": events},
-    )
+    return _render_tracking(request, order, tracking)
@@ -1,2 +1,31 @@
+from django.contrib import admin
+from unfold.admin import ModelAdmin  # type: ignore
 
-# Register your models here.
+from .models import PaymentEvent
+
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(ModelAdmin):
+    list_display = (
+        "id",
+        "provider",
+        "event_type",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "received_at",
+        "processed_at",
+    )
+    list_filter = ("status", "provider", "event_type")
+    search_fields = ("event_id",)
+    ordering = ("-received_at",)
+    readonly_fields = (
+        "provider",
+        "event_id",
+        "event_type",
+        "payload",
+        "attempts",
+        "last_error",
+        "received_at",
+        "processed_at",
+    )
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PaymentsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "backend.apps.payments"
+
+    def ready(self) -> None:
+        from . import services  # noqa: F401  (registry reset on setting_changed)
@@ -3,6 +3,8 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 
+from asgiref.sync import sync_to_async
+
 from backend.apps.orders.models import Order
 
 
@@ -23,10 +25,27 @@ class CaptureResult:
     capture_id: str
 
 
+@dataclass(frozen=True)
+class PaymentStatus:
+    """Returned by get_payment_status()."""
+
+    PENDING = "pending"  # the payer hasn't approved (yet)
+    APPROVED = "approved"  # approved, not captured
+    COMPLETED = "completed"  # captured; capture_id is set
+    VOIDED = "voided"  # will never complete (voided, expired, unknown)
+
+    state: str
+    capture_id: str = ""
+
+
 class PaymentProvider(ABC):
     """
     Every concrete provider must declare a unique `slug`
     and implement create + capture.
+
+    The async variants (used by the ASGI checkout views) default to running
+    the sync methods in a thread; providers with an async HTTP client
+    override them so no thread is held while the provider responds.
     """
 
     slug: str = ""
@@ -46,3 +65,35 @@ class PaymentProvider(ABC):
         *,
         provider_order_id: str,
     ) -> CaptureResult: ...
+
+    def get_payment_status(
+        self,
+        *,
+        provider_order_id: str,
+    ) -> PaymentStatus:
+        """Where the payment stands at the provider (used by reconciliation)."""
+        raise NotImplementedError(f"{type(self).__name__} can't look up payments.")
+
+    def supports_status_lookup(self) -> bool:
+        """False for providers that don't implement get_payment_status()."""
+        return type(self).get_payment_status is not PaymentProvider.get_payment_status
+
+    async def acreate_payment(
+        self,
+        *,
+        order: Order,
+        return_url: str,
+        cancel_url: str,
+    ) -> PaymentResult:
+        return await sync_to_async(self.create_payment)(
+            order=order, return_url=return_url, cancel_url=cancel_url
+        )
+
+    async def acapture_payment(
+        self,
+        *,
+        provider_order_id: str,
+    ) -> CaptureResult:
+        return await sync_to_async(self.capture_payment)(
+            provider_order_id=provider_order_id
+        )
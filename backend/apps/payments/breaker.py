@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker around payment provider calls, one circuit per provider
+# slug, with its state in the default cache. Workers only trip together when
+# that cache is shared (CACHE_URL); with the LocMem fallback each process
+# keeps its own circuit.
+#
+#   closed    -> calls go through; each is counted in a fixed window, and an
+#                outage (timeout, connection error, 5xx) or a call slower than
+#                PAYMENT_BREAKER_SLOW_CALL_MS counts as bad. Errors about the
+#                request itself (4xx, declined, bad data) count as good calls.
+#                Enough bad calls open the circuit.
+#   open      -> calls fail at once with PaymentUnavailableError for
+#                PAYMENT_BREAKER_OPEN_SECONDS; no request waits on the provider.
+#   half-open -> after that, a single probe call is let through. Success
+#                closes the circuit, failure opens it again.
+#
+# Every call's latency also lands in a per-provider, per-operation histogram.
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+OPEN_KEY = "payments:breaker:{slug}:open"
+TRIPPED_KEY = "payments:breaker:{slug}:tripped"
+PROBE_KEY = "payments:breaker:{slug}:probe"
+WINDOW_KEY = "payments:breaker:{slug}:{window}:{counter}"
+
+LATENCY_KEY = "payments:latency:{slug}:{operation}:{bucket}"
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PaymentUnavailableError(Exception):
+    """The provider's circuit is open; the call was not attempted."""
+
+    def __init__(self, slug: str) -> None:
+        super().__init__(f"Payment provider {slug!r} is temporarily unavailable.")
+        self.slug = slug
+
+
+def _enabled() -> bool:
+    return bool(getattr(settings, "PAYMENT_BREAKER_ENABLED", True))
+
+
+def _failure_rate() -> float:
+    return float(getattr(settings, "PAYMENT_BREAKER_FAILURE_RATE", 0.5))
+
+
+def _min_calls() -> int:
+    return int(getattr(settings, "PAYMENT_BREAKER_MIN_CALLS", 10))
+
+
+def _slow_call_ms() -> float:
+    return float(getattr(settings, "PAYMENT_BREAKER_SLOW_CALL_MS", 5000))
+
+
+def _open_seconds() -> int:
+    return int(getattr(settings, "PAYMENT_BREAKER_OPEN_SECONDS", 30))
+
+
+def _window_seconds() -> int:
+    return int(getattr(settings, "PAYMENT_BREAKER_WINDOW_SECONDS", 60))
+
+
+def _incr(key: str, delta: int = 1, *, timeout: int | None = None) -> int:
+    try:
+        return int(cache.incr(key, delta))
+    except ValueError:
+        if cache.add(key, delta, timeout=timeout):
+            return delta
+        return int(cache.incr(key, delta))
+
+
+def _window_keys(slug: str) -> tuple[str, str]:
+    window = int(time.time()) // _window_seconds()
+    return (
+        WINDOW_KEY.format(slug=slug, window=window, counter="calls"),
+        WINDOW_KEY.format(slug=slug, window=window, counter="bad"),
+    )
+
+
+def circuit_state(slug: str) -> str:
+    if cache.get(OPEN_KEY.format(slug=slug)):
+        return OPEN
+    if cache.get(TRIPPED_KEY.format(slug=slug)):
+        return HALF_OPEN
+    return CLOSED
+
+
+def _trip(slug: str) -> None:
+    cache.set(OPEN_KEY.format(slug=slug), 1, timeout=_open_seconds())
+    cache.set(TRIPPED_KEY.format(slug=slug), 1, timeout=None)
+    cache.delete(PROBE_KEY.format(slug=slug))
+    logger.warning("Payment provider %s circuit opened", slug)
+
+
+def reset_circuit(slug: str) -> None:
+    """Closes the circuit and forgets the current window's counts."""
+    cache.delete_many(
+        [
+            OPEN_KEY.format(slug=slug),
+            TRIPPED_KEY.format(slug=slug),
+            PROBE_KEY.format(slug=slug),
+            *_window_keys(slug),
+        ]
+    )
+
+
+def _admit(slug: str) -> bool:
+    """Raises if the call must not go out; True if it is the half-open probe."""
+    state = circuit_state(slug)
+    if state == CLOSED:
+        return False
+    # A probe that never reports back (worker killed mid-call) frees the
+    # slot after one more open period.
+    if state == HALF_OPEN and cache.add(
+        PROBE_KEY.format(slug=slug), 1, timeout=_open_seconds()
+    ):
+        return True
+    raise PaymentUnavailableError(slug)
+
+
+def _record(slug: str, *, bad: bool, probe: bool) -> None:
+    if probe:
+        if bad:
+            _trip(slug)
+        else:
+            reset_circuit(slug)
+            logger.info("Payment provider %s circuit closed", slug)
+        return
+
+    timeout = _window_seconds() * 2
+    calls_key, bad_key = _window_keys(slug)
+    calls = _incr(calls_key, timeout=timeout)
+    if not bad:
+        return
+    bad_calls = _incr(bad_key, timeout=timeout)
+    if calls >= _min_calls() and bad_calls / calls >= _failure_rate():
+        _trip(slug)
+
+
+def observe_latency(slug: str, operation: str, elapsed_ms: float) -> None:
+    bucket = next((f"le_{b}" for b in LATENCY_BUCKETS_MS if elapsed_ms <= b), "le_inf")
+    for name, delta in ((bucket, 1), ("count", 1), ("sum_ms", round(elapsed_ms))):
+        _incr(LATENCY_KEY.format(slug=slug, operation=operation, bucket=name), delta)
+
+
+def get_latency_histogram(slug: str, operation: str) -> dict[str, int]:
+    """Call counts per latency bucket (`le_<ms>`, not cumulative), plus totals."""
+    names = [f"le_{b}" for b in LATENCY_BUCKETS_MS] + ["le_inf", "count", "sum_ms"]
+    keys = {
+        LATENCY_KEY.format(slug=slug, operation=operation, bucket=name): name
+        for name in names
+    }
+    values = cache.get_many(list(keys))
+    return {name: int(values.get(key) or 0) for key, name in keys.items()}
+
+
+_OUTAGE_ERRORS = (
+    requests.Timeout,
+    requests.ConnectionError,
+    httpx.TimeoutException,
+    httpx.TransportError,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+def is_outage(exc: BaseException) -> bool:
+    """True if `exc` says the provider is down, rather than the call was refused."""
+    if isinstance(exc, _OUTAGE_ERRORS):
+        return True
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+def _finish(
+    slug: str, operation: str, *, started: float, bad: bool, probe: bool
+) -> None:
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    observe_latency(slug, operation, elapsed_ms)
+    if _enabled():
+        _record(slug, bad=bad or elapsed_ms >= _slow_call_ms(), probe=probe)
+
+
+@contextmanager
+def guard(slug: str, operation: str) -> Iterator[None]:
+    """
+    Wraps one provider call:
+
+        with guard(provider.slug, "create_payment"):
+            result = provider.create_payment(...)
+
+    Raises PaymentUnavailableError (before the call) while the circuit is open.
+    Only outages (see is_outage) count against the circuit.
+    """
+    probe = _admit(slug) if _enabled() else False
+    started = time.perf_counter()
+    bad = True
+    try:
+        yield
+        bad = False
+    except Exception as exc:
+        bad = is_outage(exc)
+        raise
+    finally:
+        _finish(slug, operation, started=started, bad=bad, probe=probe)
+
+
+@asynccontextmanager
+async def aguard(slug: str, operation: str) -> AsyncIterator[None]:
+    """guard() for awaited provider calls; the cache round trips run in a thread."""
+    probe = (
+        await sync_to_async(_admit, thread_sensitive=False)(slug)
+        if _enabled()
+        else False
+    )
+    started = time.perf_counter()
+    bad = True
+    try:
+        yield
+        bad = False
+    except Exception as exc:
+        bad = is_outage(exc)
+        raise
+    finally:
+        await sync_to_async(_finish, thread_sensitive=False)(
+            slug, operation, started=started, bad=bad, probe=probe
+        )
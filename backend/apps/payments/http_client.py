@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from typing import Any
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# One pooled session shared by every payment provider: keep-alive
+# connections (no TLS handshake per call), connect/read timeouts that are
+# tight by default, and retries only where a retry can't double-charge:
+# connection failures (the request never left) for any method, and
+# 502/503/504 for idempotent methods. Providers make POSTs safe to replay
+# with their own idempotency headers (e.g. PayPal-Request-Id).
+#
+# The async client (for ASGI views) follows the same rules with httpx: one
+# pooled AsyncClient per event loop, transport retries on connection failures
+# only. It carries only POSTs today, so there is no status retry.
+
+RETRY_STATUSES = (502, 503, 504)
+
+_lock = threading.Lock()
+_session: requests.Session | None = None
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, httpx.AsyncClient
+] = weakref.WeakKeyDictionary()
+
+
+def _timeout() -> tuple[float, float]:
+    return (
+        float(getattr(settings, "PAYMENT_HTTP_CONNECT_TIMEOUT", 3.05)),
+        float(getattr(settings, "PAYMENT_HTTP_READ_TIMEOUT", 10)),
+    )
+
+
+def _build_session() -> requests.Session:
+    retries = int(getattr(settings, "PAYMENT_HTTP_RETRIES", 2))
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        backoff_factor=0.2,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    pool_size = int(getattr(settings, "PAYMENT_HTTP_POOL_SIZE", 20))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def _build_async_client() -> httpx.AsyncClient:
+    connect, read = _timeout()
+    max_connections = int(getattr(settings, "PAYMENT_HTTP_ASYNC_MAX_CONNECTIONS", 200))
+    transport = httpx.AsyncHTTPTransport(
+        retries=int(getattr(settings, "PAYMENT_HTTP_RETRIES", 2)),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=int(
+                getattr(settings, "PAYMENT_HTTP_POOL_SIZE", 20)
+            ),
+        ),
+    )
+    return httpx.AsyncClient(
+        transport=transport, timeout=httpx.Timeout(read, connect=connect)
+    )
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """The running event loop's pooled client (clients can't cross loops)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = _build_async_client()
+    return client
+
+
+def reset_session() -> None:
+    """Drops the pooled clients (tests, or after settings change)."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _async_clients.clear()
+
+
+def request(method: str, url: str, **kwargs: Any) -> requests.Response:
+    kwargs.setdefault("timeout", _timeout())
+    return get_session().request(method, url, **kwargs)
+
+
+def post(url: str, **kwargs: Any) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+async def arequest(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    return await get_async_client().request(method, url, **kwargs)
+
+
+async def apost(url: str, **kwargs: Any) -> httpx.Response:
+    return await arequest("POST", url, **kwargs)
@@ -0,0 +1,40 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from backend.apps.payments.webhooks import PROCESS_BATCH_SIZE, process_pending_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued payment events (PayPal webhooks and capture requests "
+        "from the payment return page). Safe to run from several workers."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=PROCESS_BATCH_SIZE)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for new events instead of exiting when idle.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep between polls when idle (with --loop).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        total = 0
+        while True:
+            handled = process_pending_events(batch_size=options["batch_size"])
+            total += handled
+            if handled:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} event(s)."))
@@ -0,0 +1,60 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from backend.apps.payments.paypal_stub import StubConfig, make_server
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local PayPal API stand-in for offline load tests. Point the "
+        "shop at it with PAYPAL_API_BASE_URL=http://<host>:<port>."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8089)
+        parser.add_argument(
+            "--latency-ms",
+            type=float,
+            default=0,
+            help="Added to every API call.",
+        )
+        parser.add_argument(
+            "--jitter-ms",
+            type=float,
+            default=0,
+            help="Random extra latency, up to this much.",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Share of API calls answered with a 503 (0-1).",
+        )
+        parser.add_argument(
+            "--auto-approve",
+            action="store_true",
+            help="Allow capturing orders without the buyer approval step.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        server = make_server(
+            options["host"],
+            options["port"],
+            StubConfig(
+                latency_ms=options["latency_ms"],
+                jitter_ms=options["jitter_ms"],
+                error_rate=options["error_rate"],
+                auto_approve=options["auto_approve"],
+            ),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"PayPal stub listening on {server.base_url}")
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
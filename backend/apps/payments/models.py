@@ -1,2 +1,51 @@
+from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class PaymentEvent(models.Model):
+    """
+    Durable queue of provider events (verified webhooks, plus capture
+    requests from the payment return page), drained by
+    `manage.py process_payment_events`.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSED = "processed", "Processed"
+        FAILED = "failed", "Failed"
+
+    provider = models.CharField(max_length=50)
+    event_id = models.CharField(max_length=255)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Failed attempts back off exponentially; the worker skips the event
+    # until then.
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("received_at",)
+        constraints = [
+            # Providers redeliver webhooks; a repeat is a no-op insert.
+            models.UniqueConstraint(
+                fields=["provider", "event_id"], name="paymentevent_provider_event_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=models.Q(status="pending"),
+                name="paymentevent_pending_due_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.provider}:{self.event_type} ({self.status})"
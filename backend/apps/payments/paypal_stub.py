@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+# Local, in-memory stand-in for the slice of the PayPal REST API the shop
+# uses: OAuth token, create / get / capture order, and the buyer approval
+# page (which approves at once and redirects to the order's return_url).
+# It lets checkout be load-tested end to end without the network: run
+# `manage.py run_paypal_stub` and set PAYPAL_API_BASE_URL to its address.
+#
+# Like PayPal, writes are deduped by PayPal-Request-Id and v2 calls need a
+# bearer token. Latency and a random 503 rate are configurable, to exercise
+# timeouts, retries and the circuit breaker.
+
+_ORDER_PATH = re.compile(r"^/v2/checkout/orders/(?P<order_id>[\w-]+)$")
+_CAPTURE_PATH = re.compile(r"^/v2/checkout/orders/(?P<order_id>[\w-]+)/capture$")
+
+_Reply = tuple[int, dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class StubConfig:
+    latency_ms: float = 0
+    jitter_ms: float = 0
+    error_rate: float = 0.0
+    # Capture orders nobody approved (load tests that skip the buyer page).
+    auto_approve: bool = False
+
+
+def _error(status: int, name: str) -> _Reply:
+    return status, {"name": name, "message": name.replace("_", " ").capitalize()}
+
+
+class PayPalStub:
+    """The stand-in's state, shared by the server's handler threads."""
+
+    def __init__(self, config: StubConfig) -> None:
+        self.config = config
+        self.orders: dict[str, dict[str, Any]] = {}
+        self._return_urls: dict[str, str] = {}
+        self._replies: dict[str, _Reply] = {}
+        self._tokens: set[str] = set()
+        self._lock = threading.RLock()
+
+    def issue_token(self) -> _Reply:
+        token = f"STUB-TOKEN-{secrets.token_hex(8)}"
+        with self._lock:
+            self._tokens.add(token)
+        return 200, {"access_token": token, "token_type": "Bearer", "expires_in": 32400}
+
+    def authorized(self, header: str) -> bool:
+        token = header.removeprefix("Bearer ")
+        with self._lock:
+            return token in self._tokens
+
+    def idempotent(self, request_id: str, handler: Callable[[], _Reply]) -> _Reply:
+        """Replays the first reply to a PayPal-Request-Id."""
+        if not request_id:
+            return handler()
+        with self._lock:
+            reply = self._replies.get(request_id)
+            if reply is None:
+                reply = self._replies[request_id] = handler()
+            return reply
+
+    def create_order(self, body: dict[str, Any], *, approve_base: str) -> _Reply:
+        units = body.get("purchase_units") or []
+        if body.get("intent") != "CAPTURE" or not units:
+            return _error(400, "INVALID_REQUEST")
+
+        order_id = f"STUB{secrets.token_hex(8).upper()}"
+        order = {
+            "id": order_id,
+            "intent": "CAPTURE",
+            "status": "CREATED",
+            "purchase_units": units,
+            "links": [
+                {
+                    "rel": "approve",
+                    "href": f"{approve_base}/checkoutnow?"
+                    + urlencode({"token": order_id}),
+                    "method": "GET",
+                }
+            ],
+        }
+        return_url = (body.get("application_context") or {}).get("return_url", "")
+        with self._lock:
+            self.orders[order_id] = order
+            self._return_urls[order_id] = return_url
+        return 201, order
+
+    def get_order(self, order_id: str) -> _Reply:
+        with self._lock:
+            order = self.orders.get(order_id)
+        return (200, order) if order else _error(404, "RESOURCE_NOT_FOUND")
+
+    def approve(self, order_id: str) -> str | None:
+        """Approves the order as its buyer; returns where to send them."""
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                return None
+            if order["status"] == "CREATED":
+                order["status"] = "APPROVED"
+            return_url = self._return_urls[order_id]
+        separator = "&" if "?" in return_url else "?"
+        return f"{return_url}{separator}" + urlencode(
+            {"token": order_id, "PayerID": "STUBPAYER"}
+        )
+
+    def capture(self, order_id: str) -> _Reply:
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                return _error(404, "RESOURCE_NOT_FOUND")
+            if order["status"] == "COMPLETED":
+                return _error(422, "ORDER_ALREADY_CAPTURED")
+            if order["status"] != "APPROVED" and not self.config.auto_approve:
+                return _error(422, "ORDER_NOT_APPROVED")
+
+            unit = order["purchase_units"][0]
+            unit["payments"] = {
+                "captures": [
+                    {
+                        "id": f"STUBCAP{secrets.token_hex(6).upper()}",
+                        "status": "COMPLETED",
+                        "amount": unit.get("amount", {}),
+                    }
+                ]
+            }
+            order["status"] = "COMPLETED"
+            return 201, order
+
+
+class PayPalStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], stub: PayPalStub) -> None:
+        super().__init__(address, _Handler)
+        self.host = address[0]
+        self.stub = stub
+
+    @property
+    def base_url(self) -> str:
+        # The bound port, which differs from the requested one for port 0.
+        return f"http://{self.host}:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: PayPalStubServer
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # a load test would drown the console
+
+    def _send(self, reply: _Reply) -> None:
+        status, data = reply
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _simulate_network(self) -> bool:
+        """Sleeps the configured latency; False if this call should fail."""
+        config = self.server.stub.config
+        delay_ms = config.latency_ms + random.uniform(0, config.jitter_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+        if random.random() < config.error_rate:
+            self._send(_error(503, "SERVICE_UNAVAILABLE"))
+            return False
+        return True
+
+    def _authorized(self) -> bool:
+        if self.server.stub.authorized(self.headers.get("Authorization", "")):
+            return True
+        self._send(_error(401, "AUTHENTICATION_FAILURE"))
+        return False
+
+    def do_POST(self) -> None:
+        stub = self.server.stub
+        path = urlsplit(self.path).path
+        raw = self._read_body()
+        if not self._simulate_network():
+            return
+
+        if path == "/v1/oauth2/token":
+            self._send(stub.issue_token())
+            return
+        if not self._authorized():
+            return
+
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            self._send(_error(400, "MALFORMED_REQUEST_JSON"))
+            return
+
+        request_id = self.headers.get("PayPal-Request-Id", "")
+        host = self.headers.get("Host") or "{}:{}".format(*self.server.server_address)
+        if path == "/v2/checkout/orders":
+            reply = stub.idempotent(
+                request_id,
+                lambda: stub.create_order(body, approve_base=f"http://{host}"),
+            )
+        elif match := _CAPTURE_PATH.match(path):
+            order_id = match["order_id"]
+            reply = stub.idempotent(request_id, lambda: stub.capture(order_id))
+        else:
+            reply = _error(404, "NOT_FOUND")
+        self._send(reply)
+
+    def do_GET(self) -> None:
+        stub = self.server.stub
+        url = urlsplit(self.path)
+
+        if url.path == "/checkoutnow":
+            # The buyer's approval page: no latency or errors, it's not the API.
+            order_id = (parse_qs(url.query).get("token") or [""])[0]
+            location = stub.approve(order_id)
+            if location is None:
+                self._send(_error(404, "RESOURCE_NOT_FOUND"))
+                return
+            self.send_response(302)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if not self._simulate_network() or not self._authorized():
+            return
+        if match := _ORDER_PATH.match(url.path):
+            self._send(stub.get_order(match["order_id"]))
+        else:
+            self._send(_error(404, "NOT_FOUND"))
+
+
+def make_server(
+    host: str = "127.0.0.1", port: int = 8089, config: StubConfig | None = None
+) -> PayPalStubServer:
+    """A ready-to-serve stand-in; port 0 picks a free one (see .base_url)."""
+    return PayPalStubServer((host, port), PayPalStub(config or StubConfig()))
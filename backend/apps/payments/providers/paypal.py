@@ -1,13 +1,33 @@
 from __future__ import annotations
 
+import base64
+import hashlib
+import threading
+import time
+import zlib
+from collections.abc import Callable, Mapping
 from dataclasses import dataclass
 from typing import Any
+from urllib.parse import urlsplit
 
+import httpx
 import requests
+from asgiref.sync import sync_to_async
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
 from django.conf import settings
+from django.core.cache import cache
 
 from backend.apps.orders.models import Order
-from backend.apps.payments.base import CaptureResult, PaymentProvider, PaymentResult
+from backend.apps.payments import http_client
+from backend.apps.payments.base import (
+    CaptureResult,
+    PaymentProvider,
+    PaymentResult,
+    PaymentStatus,
+)
 
 
 @dataclass(frozen=True)
@@ -19,7 +39,7 @@ class _PayPalConfig:
 
 def _paypal_config() -> _PayPalConfig:
     env = (getattr(settings, "PAYPAL_ENV", "sandbox") or "sandbox").lower()
-    base_url = (
+    base_url = getattr(settings, "PAYPAL_API_BASE_URL", "") or (
         "https://api-m.sandbox.paypal.com"
         if env == "sandbox"
         else "https://api-m.paypal.com"
@@ -31,29 +51,175 @@ def _paypal_config() -> _PayPalConfig:
     )
 
 
-def _get_access_token() -> str:
-    cfg = _paypal_config()
-    r = requests.post(
+# OAuth tokens are reused until shortly before they expire: per process
+# (no I/O) and across workers via the cache. Refreshes are single-flight:
+# one thread per process, and one process at a time via a cache lock. The
+# cross-worker part needs a shared cache (CACHE_URL); with the LocMem
+# default each worker process refreshes its own token.
+TOKEN_CACHE_PREFIX = "payments:paypal:token"
+TOKEN_EXPIRY_MARGIN = 60  # seconds
+TOKEN_LOCK_TIMEOUT = 10
+TOKEN_LOCK_WAIT = 5.0
+
+_token_lock = threading.Lock()
+_tokens: dict[str, tuple[str, float]] = {}  # cache key -> (token, expires_at)
+
+
+def _token_cache_key(cfg: _PayPalConfig) -> str:
+    digest = hashlib.sha1(f"{cfg.base_url}|{cfg.client_id}".encode()).hexdigest()
+    return f"{TOKEN_CACHE_PREFIX}:{digest}"
+
+
+def _fetch_access_token(cfg: _PayPalConfig) -> tuple[str, float]:
+    r = http_client.post(
         f"{cfg.base_url}/v1/oauth2/token",
         auth=(cfg.client_id, cfg.client_secret),
         data={"grant_type": "client_credentials"},
-        timeout=20,
     )
     r.raise_for_status()
-    return str(r.json()["access_token"])
+    data = r.json()
+    expires_in = int(data.get("expires_in", 0) or 0)
+    return str(data["access_token"]), time.time() + expires_in
 
 
-def _create_paypal_order(
+def _usable(token: tuple[str, float] | None) -> bool:
+    return token is not None and token[1] - TOKEN_EXPIRY_MARGIN > time.time()
+
+
+def _refresh_shared_token(cfg: _PayPalConfig) -> tuple[str, float]:
+    key = _token_cache_key(cfg)
+    lock_key = f"{key}:lock"
+
+    shared: tuple[str, float] | None
+    deadline = time.monotonic() + TOKEN_LOCK_WAIT
+    while not cache.add(lock_key, 1, timeout=TOKEN_LOCK_TIMEOUT):
+        # Another worker is refreshing: use its token once it lands.
+        shared = cache.get(key)
+        if shared is not None and _usable(shared):
+            return shared
+        if time.monotonic() >= deadline:
+            return _fetch_access_token(cfg)
+        time.sleep(0.05)
+
+    try:
+        shared = cache.get(key)
+        if shared is not None and _usable(shared):
+            return shared
+        token = _fetch_access_token(cfg)
+        ttl = int(token[1] - time.time() - TOKEN_EXPIRY_MARGIN)
+        if ttl > 0:
+            cache.set(key, token, ttl)
+        return token
+    finally:
+        cache.delete(lock_key)
+
+
+def _get_access_token() -> str:
+    cfg = _paypal_config()
+    key = _token_cache_key(cfg)
+
+    token = _tokens.get(key)
+    if _usable(token):
+        return token[0]  # type: ignore[index]
+
+    with _token_lock:
+        token = _tokens.get(key)
+        if not _usable(token):
+            shared = cache.get(key)
+            token = shared if _usable(shared) else _refresh_shared_token(cfg)
+            _tokens[key] = token
+        return token[0]  # type: ignore[index]
+
+
+def clear_access_token() -> None:
+    """Forgets the cached token (e.g. after PayPal rejected it)."""
+    key = _token_cache_key(_paypal_config())
+    with _token_lock:
+        _tokens.pop(key, None)
+    cache.delete(key)
+
+
+def _authorized_call(
+    send: Callable[..., requests.Response],
+    path: str,
+    *,
+    request_id: str = "",
+    **kwargs: Any,
+) -> requests.Response:
+    """
+    Calls PayPal with the cached bearer token; refreshes it once on a 401.
+    `request_id` (PayPal-Request-Id) makes PayPal dedupe replays, so
+    transport-level retries can't create or capture twice.
+    """
+    cfg = _paypal_config()
+    headers = {"Content-Type": "application/json"}
+    if request_id:
+        headers["PayPal-Request-Id"] = request_id
+
+    for attempt in range(2):
+        r = send(
+            f"{cfg.base_url}{path}",
+            headers={**headers, "Authorization": f"Bearer {_get_access_token()}"},
+            **kwargs,
+        )
+        if r.status_code == 401 and attempt == 0:
+            clear_access_token()
+            continue
+        break
+    r.raise_for_status()
+    return r
+
+
+def _authorized_post(
+    path: str, *, request_id: str = "", **kwargs: Any
+) -> requests.Response:
+    return _authorized_call(http_client.post, path, request_id=request_id, **kwargs)
+
+
+def _authorized_get(path: str, **kwargs: Any) -> requests.Response:
+    return _authorized_call(http_client.get, path, **kwargs)
+
+
+async def _aget_access_token() -> str:
+    token = _tokens.get(_token_cache_key(_paypal_config()))
+    if _usable(token):
+        return token[0]  # type: ignore[index]
+    # About once per token lifetime: the sync single-flight refresh, in a thread.
+    return await sync_to_async(_get_access_token, thread_sensitive=False)()
+
+
+async def _aauthorized_post(
+    path: str, *, request_id: str = "", **kwargs: Any
+) -> httpx.Response:
+    """_authorized_post on the async client."""
+    cfg = _paypal_config()
+    headers = {"Content-Type": "application/json"}
+    if request_id:
+        headers["PayPal-Request-Id"] = request_id
+
+    for attempt in range(2):
+        token = await _aget_access_token()
+        r = await http_client.apost(
+            f"{cfg.base_url}{path}",
+            headers={**headers, "Authorization": f"Bearer {token}"},
+            **kwargs,
+        )
+        if r.status_code == 401 and attempt == 0:
+            await sync_to_async(clear_access_token, thread_sensitive=False)()
+            continue
+        break
+    r.raise_for_status()
+    return r
+
+
+def _order_payload(
     *,
     total_eur: str,
     reference_id: str,
     return_url: str,
     cancel_url: str,
 ) -> dict[str, Any]:
-    cfg = _paypal_config()
-    token = _get_access_token()
-
-    payload = {
+    return {
         "intent": "CAPTURE",
         "purchase_units": [
             {
@@ -70,37 +236,69 @@ def _create_paypal_order(
         },
     }
 
-    r = requests.post(
-        f"{cfg.base_url}/v2/checkout/orders",
-        headers={
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        },
-        json=payload,
-        timeout=20,
+
+def _create_paypal_order(
+    *,
+    total_eur: str,
+    reference_id: str,
+    return_url: str,
+    cancel_url: str,
+) -> dict[str, Any]:
+    r = _authorized_post(
+        "/v2/checkout/orders",
+        request_id=f"create-{reference_id}",
+        json=_order_payload(
+            total_eur=total_eur,
+            reference_id=reference_id,
+            return_url=return_url,
+            cancel_url=cancel_url,
+        ),
     )
-    r.raise_for_status()
     data: dict[str, Any] = r.json()
     return data
 
 
 def _capture_paypal_order(paypal_order_id: str) -> dict[str, Any]:
-    cfg = _paypal_config()
-    token = _get_access_token()
-
-    r = requests.post(
-        f"{cfg.base_url}/v2/checkout/orders/{paypal_order_id}/capture",
-        headers={
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        },
-        timeout=20,
+    r = _authorized_post(
+        f"/v2/checkout/orders/{paypal_order_id}/capture",
+        request_id=f"capture-{paypal_order_id}",
     )
-    r.raise_for_status()
     data: dict[str, Any] = r.json()
     return data
 
 
+def _payment_result(data: dict[str, Any]) -> PaymentResult:
+    redirect_url: str | None = None
+    for link in data.get("links", []):
+        if link.get("rel") == "approve":
+            redirect_url = link["href"]
+            break
+
+    return PaymentResult(
+        approved=True,
+        provider_order_id=data["id"],
+        redirect_url=redirect_url,
+    )
+
+
+# PayPal order status -> ours; CREATED, SAVED and PAYER_ACTION_REQUIRED
+# still wait on the payer.
+_PAYPAL_STATES = {
+    "APPROVED": PaymentStatus.APPROVED,
+    "COMPLETED": PaymentStatus.COMPLETED,
+    "VOIDED": PaymentStatus.VOIDED,
+}
+
+
+def _capture_result(data: dict[str, Any]) -> CaptureResult:
+    capture_id = data["purchase_units"][0]["payments"]["captures"][0]["id"]
+
+    return CaptureResult(
+        approved=True,
+        capture_id=capture_id,
+    )
+
+
 class PayPalProvider(PaymentProvider):
     slug = "paypal"
 
@@ -117,31 +315,128 @@ class PayPalProvider(PaymentProvider):
             return_url=return_url,
             cancel_url=cancel_url,
         )
+        return _payment_result(data)
+
+    def capture_payment(
+        self,
+        *,
+        provider_order_id: str,
+    ) -> CaptureResult:
+        data = _capture_paypal_order(provider_order_id)
+        return _capture_result(data)
 
-        paypal_id = data["id"]
+    def get_payment_status(
+        self,
+        *,
+        provider_order_id: str,
+    ) -> PaymentStatus:
+        try:
+            r = _authorized_get(f"/v2/checkout/orders/{provider_order_id}")
+        except requests.HTTPError as exc:
+            # PayPal forgets orders that expired without being approved.
+            if exc.response is not None and exc.response.status_code == 404:
+                return PaymentStatus(PaymentStatus.VOIDED)
+            raise
 
-        redirect_url: str | None = None
-        for link in data.get("links", []):
-            if link.get("rel") == "approve":
-                redirect_url = link["href"]
-                break
+        data = r.json()
+        state = _PAYPAL_STATES.get(str(data.get("status")), PaymentStatus.PENDING)
+        if state == PaymentStatus.COMPLETED:
+            return PaymentStatus(state, capture_id=_capture_result(data).capture_id)
+        return PaymentStatus(state)
 
-        return PaymentResult(
-            approved=True,
-            provider_order_id=paypal_id,
-            redirect_url=redirect_url,
+    async def acreate_payment(
+        self,
+        *,
+        order: Order,
+        return_url: str,
+        cancel_url: str,
+    ) -> PaymentResult:
+        reference_id = str(order.id)
+        r = await _aauthorized_post(
+            "/v2/checkout/orders",
+            request_id=f"create-{reference_id}",
+            json=_order_payload(
+                total_eur=str(order.subtotal),
+                reference_id=reference_id,
+                return_url=return_url,
+                cancel_url=cancel_url,
+            ),
         )
+        return _payment_result(r.json())
 
-    def capture_payment(
+    async def acapture_payment(
         self,
         *,
         provider_order_id: str,
     ) -> CaptureResult:
-        data = _capture_paypal_order(provider_order_id)
+        r = await _aauthorized_post(
+            f"/v2/checkout/orders/{provider_order_id}/capture",
+            request_id=f"capture-{provider_order_id}",
+        )
+        return _capture_result(r.json())
+
+
+# ── Webhook signature verification ──
+# PayPal signs `<transmission id>|<time>|<webhook id>|<crc32(body)>` with the
+# key in the cert at PAYPAL-CERT-URL. Certs rarely rotate: they are cached
+# per process and in the cache, so verification is normally local.
+CERT_CACHE_PREFIX = "payments:paypal:cert"
+CERT_CACHE_TIMEOUT = 60 * 60 * 24
+
+_certs: dict[str, bytes] = {}
+
+
+def _trusted_cert_url(url: str) -> bool:
+    parsed = urlsplit(url)
+    host = (parsed.hostname or "").lower()
+    return parsed.scheme == "https" and (
+        host == "paypal.com" or host.endswith(".paypal.com")
+    )
+
+
+def _get_cert(url: str) -> bytes:
+    pem = _certs.get(url)
+    if pem is not None:
+        return pem
+
+    key = f"{CERT_CACHE_PREFIX}:{hashlib.sha1(url.encode()).hexdigest()}"
+    pem = cache.get(key)
+    if pem is None:
+        r = http_client.get(url)
+        r.raise_for_status()
+        pem = r.content
+        cache.set(key, pem, CERT_CACHE_TIMEOUT)
+
+    _certs[url] = pem
+    return pem
+
+
+def verify_webhook_signature(headers: Mapping[str, str], body: bytes) -> bool:
+    """True if `body` was signed by PayPal for our PAYPAL_WEBHOOK_ID."""
+    webhook_id = getattr(settings, "PAYPAL_WEBHOOK_ID", "")
+    transmission_id = headers.get("PAYPAL-TRANSMISSION-ID", "")
+    transmission_time = headers.get("PAYPAL-TRANSMISSION-TIME", "")
+    signature = headers.get("PAYPAL-TRANSMISSION-SIG", "")
+    cert_url = headers.get("PAYPAL-CERT-URL", "")
+    algo = headers.get("PAYPAL-AUTH-ALGO", "SHA256withRSA")
+
+    if not all((webhook_id, transmission_id, transmission_time, signature)):
+        return False
+    if algo != "SHA256withRSA" or not _trusted_cert_url(cert_url):
+        return False
 
-        capture_id = data["purchase_units"][0]["payments"]["captures"][0]["id"]
+    message = (
+        f"{transmission_id}|{transmission_time}|{webhook_id}|{zlib.crc32(body)}"
+    ).encode()
 
-        return CaptureResult(
-            approved=True,
-            capture_id=capture_id,
+    try:
+        cert = x509.load_pem_x509_certificate(_get_cert(cert_url))
+        public_key = cert.public_key()
+        if not isinstance(public_key, rsa.RSAPublicKey):
+            return False
+        public_key.verify(
+            base64.b64decode(signature), message, padding.PKCS1v15(), hashes.SHA256()
         )
+    except (InvalidSignature, ValueError, requests.RequestException):
+        return False
+    return True
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from urllib.parse import urlencode
+
+from backend.apps.orders.models import Order
+from backend.apps.payments.base import (
+    CaptureResult,
+    PaymentProvider,
+    PaymentResult,
+    PaymentStatus,
+)
+
+
+class StubProvider(PaymentProvider):
+    """
+    Offline provider for local development and tests: no network, every
+    payment is approved and the "approval page" is our own return URL.
+
+    `statuses` decides what get_payment_status() reports per provider order
+    id (default: approved, not captured); captures are recorded in it.
+    """
+
+    slug = "stub"
+
+    def __init__(self) -> None:
+        self.statuses: dict[str, PaymentStatus] = {}
+
+    def create_payment(
+        self,
+        *,
+        order: Order,
+        return_url: str,
+        cancel_url: str,
+    ) -> PaymentResult:
+        provider_order_id = f"STUB-{order.id}"
+        return PaymentResult(
+            approved=True,
+            provider_order_id=provider_order_id,
+            redirect_url=f"{return_url}?{urlencode({'token': provider_order_id})}",
+        )
+
+    def capture_payment(
+        self,
+        *,
+        provider_order_id: str,
+    ) -> CaptureResult:
+        capture_id = f"STUB-CAP-{provider_order_id}"
+        self.statuses[provider_order_id] = PaymentStatus(
+            PaymentStatus.COMPLETED, capture_id=capture_id
+        )
+        return CaptureResult(approved=True, capture_id=capture_id)
+
+    def get_payment_status(
+        self,
+        *,
+        provider_order_id: str,
+    ) -> PaymentStatus:
+        return self.statuses.get(
+            provider_order_id, PaymentStatus(PaymentStatus.APPROVED)
+        )
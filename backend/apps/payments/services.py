@@ -1,11 +1,66 @@
-from typing import cast
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any
 
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.utils.module_loading import import_string
 
 from .base import PaymentProvider
 
 
-def get_payment_provider() -> PaymentProvider:
-    provider = import_string(settings.PAYMENT_PROVIDER)()
-    return cast(PaymentProvider, provider)
+class UnknownPaymentProviderError(LookupError):
+    """No configured provider has the requested slug."""
+
+
+def _provider_paths() -> list[str]:
+    default = settings.PAYMENT_PROVIDER
+    extra = list(getattr(settings, "PAYMENT_PROVIDERS", []) or [])
+    return [default, *(path for path in extra if path != default)]
+
+
+@lru_cache(maxsize=1)
+def _registry() -> tuple[dict[str, PaymentProvider], str]:
+    """Provider instances by slug (built once per process) + default slug."""
+    providers: dict[str, PaymentProvider] = {}
+    for path in _provider_paths():
+        provider = import_string(path)()
+        if not isinstance(provider, PaymentProvider) or not provider.slug:
+            raise ImproperlyConfigured(f"{path} is not a PaymentProvider with a slug.")
+        if provider.slug in providers:
+            raise ImproperlyConfigured(
+                f"Duplicate payment provider slug {provider.slug!r} ({path})."
+            )
+        providers[provider.slug] = provider
+
+    default_slug = next(iter(providers))
+    return providers, default_slug
+
+
+def get_payment_provider(slug: str = "") -> PaymentProvider:
+    """
+    The provider registered under `slug` (e.g. `order.payment_provider`),
+    or the default one (settings.PAYMENT_PROVIDER) when no slug is given.
+    """
+    providers, default_slug = _registry()
+    try:
+        return providers[slug or default_slug]
+    except KeyError:
+        raise UnknownPaymentProviderError(slug) from None
+
+
+def get_payment_providers() -> list[PaymentProvider]:
+    return list(_registry()[0].values())
+
+
+def clear_provider_registry() -> None:
+    _registry.cache_clear()
+
+
+@receiver(setting_changed)
+def _reset_registry(*, setting: str, **kwargs: Any) -> None:
+    if setting in ("PAYMENT_PROVIDER", "PAYMENT_PROVIDERS"):
+        clear_provider_registry()
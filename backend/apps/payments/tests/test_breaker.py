@@ -0,0 +1,189 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.urls import reverse
+
+from backend.apps.orders.models import Order
+from backend.apps.payments import breaker
+from backend.apps.payments.base import PaymentResult
+from backend.apps.products.models import Category, Product
+
+
+@pytest.fixture(autouse=True)
+def _clean_cache(settings):
+    settings.PAYMENT_BREAKER_MIN_CALLS = 4
+    settings.PAYMENT_BREAKER_FAILURE_RATE = 0.5
+    settings.PAYMENT_BREAKER_SLOW_CALL_MS = 1000
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _call(slug="test", *, fail=False, error=None):
+    with breaker.guard(slug, "create_payment"):
+        if fail:
+            raise error or requests.ConnectionError("provider down")
+
+
+def _fail(times, slug="test", error=None):
+    for _ in range(times):
+        with pytest.raises(type(error) if error else requests.ConnectionError):
+            _call(slug, fail=True, error=error)
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+class TestCircuitBreaker:
+    def test_stays_closed_below_min_calls(self):
+        _fail(3)
+
+        assert breaker.circuit_state("test") == breaker.CLOSED
+
+    def test_opens_on_failure_rate(self):
+        _call()
+        _call()
+        _fail(2)
+
+        assert breaker.circuit_state("test") == breaker.OPEN
+        with pytest.raises(breaker.PaymentUnavailableError):
+            _call()
+
+    def test_server_errors_and_timeouts_count(self):
+        _fail(2, error=_http_error(503))
+        _fail(2, error=requests.Timeout("slow"))
+
+        assert breaker.circuit_state("test") == breaker.OPEN
+
+    @pytest.mark.parametrize(
+        "error",
+        [_http_error(422), _http_error(404), ValueError("bad data")],
+    )
+    def test_rejected_calls_do_not_count(self, error):
+        _fail(10, error=error)
+
+        assert breaker.circuit_state("test") == breaker.CLOSED
+        assert breaker.get_latency_histogram("test", "create_payment")["count"] == 10
+
+    def test_slow_calls_count_as_failures(self, settings):
+        settings.PAYMENT_BREAKER_SLOW_CALL_MS = 0
+
+        for _ in range(4):
+            _call()
+
+        assert breaker.circuit_state("test") == breaker.OPEN
+
+    def test_circuits_are_per_provider(self):
+        _fail(4)
+
+        _call("other")
+        assert breaker.circuit_state("other") == breaker.CLOSED
+
+    def test_half_open_lets_one_probe_through(self):
+        _fail(4)
+        cache.delete(breaker.OPEN_KEY.format(slug="test"))  # open period over
+        assert breaker.circuit_state("test") == breaker.HALF_OPEN
+
+        with (
+            breaker.guard("test", "create_payment"),
+            pytest.raises(breaker.PaymentUnavailableError),
+        ):
+            _call()  # only the probe may go out
+
+        assert breaker.circuit_state("test") == breaker.CLOSED
+
+    def test_failed_probe_reopens(self):
+        _fail(4)
+        cache.delete(breaker.OPEN_KEY.format(slug="test"))
+
+        _fail(1)
+
+        assert breaker.circuit_state("test") == breaker.OPEN
+
+    def test_disabled_breaker_never_opens(self, settings):
+        settings.PAYMENT_BREAKER_ENABLED = False
+
+        _fail(10)
+
+        assert breaker.circuit_state("test") == breaker.CLOSED
+
+
+class TestLatencyHistogram:
+    def test_calls_land_in_buckets(self):
+        breaker.observe_latency("test", "capture_payment", 30)
+        breaker.observe_latency("test", "capture_payment", 700)
+        breaker.observe_latency("test", "capture_payment", 60000)
+
+        histogram = breaker.get_latency_histogram("test", "capture_payment")
+
+        assert histogram["le_50"] == 1
+        assert histogram["le_1000"] == 1
+        assert histogram["le_inf"] == 1
+        assert histogram["count"] == 3
+        assert histogram["sum_ms"] == 60730
+
+    def test_guarded_calls_are_observed(self):
+        _call()
+        _fail(1)
+
+        assert breaker.get_latency_histogram("test", "create_payment")["count"] == 2
+
+
+@pytest.mark.django_db
+class TestCheckoutWithOpenCircuit:
+    @pytest.fixture
+    def product(self):
+        category = Category.objects.create(name="Prints", slug="prints")
+        return Product.objects.create(
+            category=category, name="Print", slug="print", price=100, stock=10
+        )
+
+    @pytest.fixture
+    def provider(self):
+        mock_provider = MagicMock()
+        mock_provider.slug = "paypal"
+        mock_provider.create_payment.return_value = PaymentResult(
+            approved=True,
+            provider_order_id="PP-BRK",
+            redirect_url="http://provider.com/approve",
+        )
+        with patch(
+            "backend.apps.orders.views.get_payment_provider",
+            return_value=mock_provider,
+        ):
+            yield mock_provider
+
+    def test_open_circuit_fails_fast_without_reserving(self, client, product, provider):
+        _fail(4, slug="paypal")
+        client.post(reverse("cart_add", args=[product.id]), {"qty": 1})
+
+        response = client.post(reverse("checkout_start"), {"email": "a@test.com"})
+
+        assert response.url == reverse("cart_detail")
+        msgs = [str(m) for m in get_messages(response.wsgi_request)]
+        assert any("temporarily unavailable" in m for m in msgs)
+        provider.create_payment.assert_not_called()
+        assert not Order.objects.exists()
+        product.refresh_from_db()
+        assert product.stock == 10
+
+    def test_return_defers_capture_while_open(self, client, provider):
+        Order.objects.create(
+            email="b@test.com", provider_order_id="PP-BRK", payment_provider="paypal"
+        )
+        _fail(4, slug="paypal")
+
+        with patch(
+            "backend.apps.orders.services.get_payment_provider", return_value=provider
+        ):
+            response = client.get(reverse("payment_return") + "?token=PP-BRK")
+
+        assert response.url == reverse("payment_status") + "?token=PP-BRK"
+        provider.capture_payment.assert_not_called()
+        assert Order.objects.get().status == Order.Status.PENDING
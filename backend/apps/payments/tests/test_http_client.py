@@ -0,0 +1,42 @@
+from unittest.mock import patch
+
+import pytest
+
+from backend.apps.payments import http_client
+
+
+@pytest.fixture(autouse=True)
+def _fresh_session():
+    http_client.reset_session()
+    yield
+    http_client.reset_session()
+
+
+class TestHttpClient:
+    def test_session_is_shared_and_pooled(self, settings):
+        settings.PAYMENT_HTTP_POOL_SIZE = 7
+        session = http_client.get_session()
+
+        assert http_client.get_session() is session
+        adapter = session.get_adapter("https://api-m.paypal.com")
+        assert adapter._pool_maxsize == 7
+
+    def test_retries_never_replay_a_post_on_read_errors(self):
+        retry = http_client.get_session().get_adapter("https://x").max_retries
+
+        assert retry.read == 0
+        assert retry.connect == 2
+        assert "POST" not in retry.allowed_methods
+        assert 503 in retry.status_forcelist
+
+    def test_default_timeouts(self, settings):
+        settings.PAYMENT_HTTP_CONNECT_TIMEOUT = 1.5
+        settings.PAYMENT_HTTP_READ_TIMEOUT = 4
+        session = http_client.get_session()
+
+        with patch.object(session, "request") as request:
+            http_client.post("https://x/api", json={})
+            http_client.post("https://x/api", timeout=30)
+
+        assert request.call_args_list[0].kwargs["timeout"] == (1.5, 4.0)
+        assert request.call_args_list[1].kwargs["timeout"] == 30
@@ -0,0 +1,210 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+
+from backend.apps.payments.base import PaymentStatus
+from backend.apps.payments.providers import paypal
+
+
+def _response(status_code, json_data):
+    r = MagicMock()
+    r.status_code = status_code
+    r.json.return_value = json_data
+    return r
+
+
+@pytest.fixture(autouse=True)
+def _clean_tokens():
+    cache.clear()
+    paypal._tokens.clear()
+    yield
+    cache.clear()
+    paypal._tokens.clear()
+
+
+@pytest.fixture
+def http():
+    calls = {"token": 0}
+
+    def post(url, *args, **kwargs):
+        if url.endswith("/v1/oauth2/token"):
+            calls["token"] += 1
+            return _response(
+                200, {"access_token": f"TOKEN-{calls['token']}", "expires_in": 32400}
+            )
+        if url.endswith("/capture"):
+            return _response(
+                201,
+                {"purchase_units": [{"payments": {"captures": [{"id": "CAP-1"}]}}]},
+            )
+        return _response(
+            201, {"id": "PP-1", "links": [{"rel": "approve", "href": "/approve"}]}
+        )
+
+    with patch.object(paypal.http_client, "post", side_effect=post) as mock_post:
+        mock_post.calls = calls
+        yield mock_post
+
+
+class TestAccessTokenCache:
+    def test_token_reused_across_calls(self, http):
+        provider = paypal.PayPalProvider()
+
+        provider.capture_payment(provider_order_id="PP-1")
+        provider.capture_payment(provider_order_id="PP-1")
+
+        assert http.calls["token"] == 1
+        headers = http.call_args.kwargs["headers"]
+        assert headers["Authorization"] == "Bearer TOKEN-1"
+
+    def test_shared_cache_serves_other_workers(self, http):
+        assert paypal._get_access_token() == "TOKEN-1"
+
+        paypal._tokens.clear()  # a fresh process
+        assert paypal._get_access_token() == "TOKEN-1"
+        assert http.calls["token"] == 1
+
+    def test_expiring_token_is_refreshed(self, http):
+        key = paypal._token_cache_key(paypal._paypal_config())
+        paypal._tokens[key] = ("OLD", paypal.time.time() + 10)
+
+        assert paypal._get_access_token() == "TOKEN-1"
+
+    def test_concurrent_refresh_is_single_flight(self, http):
+        results = []
+
+        def worker():
+            results.append(paypal._get_access_token())
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert results == ["TOKEN-1"] * 8
+        assert http.calls["token"] == 1
+
+    def test_rejected_token_is_replaced_once(self, http):
+        original = http.side_effect
+        rejected = []
+
+        def post(url, *args, **kwargs):
+            auth = kwargs.get("headers", {}).get("Authorization")
+            if auth == "Bearer TOKEN-1":
+                rejected.append(url)
+                return _response(401, {})
+            return original(url, *args, **kwargs)
+
+        http.side_effect = post
+
+        result = paypal.PayPalProvider().capture_payment(provider_order_id="PP-1")
+
+        assert result.capture_id == "CAP-1"
+        assert len(rejected) == 1
+        assert http.calls["token"] == 2
+
+
+class TestPayPalRequests:
+    def test_writes_carry_paypal_request_id(self, http):
+        provider = paypal.PayPalProvider()
+
+        provider.capture_payment(provider_order_id="PP-9")
+
+        headers = http.call_args.kwargs["headers"]
+        assert headers["PayPal-Request-Id"] == "capture-PP-9"
+        assert "timeout" not in http.call_args.kwargs  # the client's default
+
+
+class TestAsyncPayPal:
+    @pytest.fixture
+    def ahttp(self, http):
+        async def apost(url, *args, **kwargs):
+            return http(url, *args, **kwargs)
+
+        with patch.object(paypal.http_client, "apost", side_effect=apost) as mock:
+            yield mock
+
+    def test_async_create_and_capture(self, ahttp, http):
+        provider = paypal.PayPalProvider()
+        order = MagicMock(id=7, subtotal="12.50")
+
+        created = async_to_sync(provider.acreate_payment)(
+            order=order, return_url="/return", cancel_url="/cancel"
+        )
+        captured = async_to_sync(provider.acapture_payment)(provider_order_id="PP-1")
+
+        assert created.provider_order_id == "PP-1"
+        assert created.redirect_url == "/approve"
+        assert captured.capture_id == "CAP-1"
+        headers = ahttp.call_args.kwargs["headers"]
+        assert headers["PayPal-Request-Id"] == "capture-PP-1"
+        assert headers["Authorization"] == "Bearer TOKEN-1"
+        assert http.calls["token"] == 1  # shared with the sync path
+
+    def test_async_rejected_token_is_replaced_once(self, ahttp, http):
+        original = http.side_effect
+
+        def post(url, *args, **kwargs):
+            auth = kwargs.get("headers", {}).get("Authorization")
+            if auth == "Bearer TOKEN-1":
+                return _response(401, {})
+            return original(url, *args, **kwargs)
+
+        http.side_effect = post
+
+        captured = async_to_sync(paypal.PayPalProvider().acapture_payment)(
+            provider_order_id="PP-1"
+        )
+
+        assert captured.capture_id == "CAP-1"
+        assert http.calls["token"] == 2
+
+
+class TestPaymentStatus:
+    @pytest.fixture
+    def get(self, http):
+        with patch.object(paypal.http_client, "get") as mock_get:
+            yield mock_get
+
+    @pytest.mark.parametrize(
+        ("paypal_status", "state"),
+        [
+            ("CREATED", PaymentStatus.PENDING),
+            ("APPROVED", PaymentStatus.APPROVED),
+            ("VOIDED", PaymentStatus.VOIDED),
+        ],
+    )
+    def test_states(self, get, paypal_status, state):
+        get.return_value = _response(200, {"status": paypal_status})
+
+        status = paypal.PayPalProvider().get_payment_status(provider_order_id="PP-1")
+
+        assert status == PaymentStatus(state)
+        assert get.call_args.args[0].endswith("/v2/checkout/orders/PP-1")
+
+    def test_completed_carries_capture_id(self, get):
+        get.return_value = _response(
+            200,
+            {
+                "status": "COMPLETED",
+                "purchase_units": [{"payments": {"captures": [{"id": "CAP-9"}]}}],
+            },
+        )
+
+        status = paypal.PayPalProvider().get_payment_status(provider_order_id="PP-1")
+
+        assert status == PaymentStatus(PaymentStatus.COMPLETED, capture_id="CAP-9")
+
+    def test_expired_order_is_voided(self, get):
+        response = _response(404, {})
+        response.raise_for_status.side_effect = requests.HTTPError(response=response)
+        get.return_value = response
+
+        status = paypal.PayPalProvider().get_payment_status(provider_order_id="PP-1")
+
+        assert status.state == PaymentStatus.VOIDED
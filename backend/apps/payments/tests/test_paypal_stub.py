@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+import requests
+from django.core.cache import cache
+
+from backend.apps.payments import http_client
+from backend.apps.payments.base import PaymentStatus
+from backend.apps.payments.paypal_stub import StubConfig, make_server
+from backend.apps.payments.providers import paypal
+
+# The project conftest fakes http_client.post; these tests talk HTTP for real.
+_real_post = http_client.post
+
+
+@pytest.fixture
+def stub_server(request, settings, monkeypatch):
+    marker = request.node.get_closest_marker("stub_config")
+    server = make_server(port=0, config=marker.args[0] if marker else StubConfig())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    settings.PAYPAL_API_BASE_URL = server.base_url
+    settings.PAYMENT_HTTP_RETRIES = 0
+    monkeypatch.setattr(http_client, "post", _real_post)
+    http_client.reset_session()
+    cache.clear()
+    paypal._tokens.clear()
+    yield server
+    server.shutdown()
+    server.server_close()
+    http_client.reset_session()
+    cache.clear()
+    paypal._tokens.clear()
+
+
+class _Order:
+    id = 42
+    subtotal = "19.90"
+
+
+def _create(provider):
+    return provider.create_payment(
+        order=_Order(), return_url="http://shop.test/return/", cancel_url="/cancel"
+    )
+
+
+class TestPayPalStub:
+    def test_full_payment_flow(self, stub_server):
+        provider = paypal.PayPalProvider()
+
+        created = _create(provider)
+        approval = requests.get(created.redirect_url, allow_redirects=False)
+        captured = provider.capture_payment(provider_order_id=created.provider_order_id)
+
+        assert approval.status_code == 302
+        assert approval.headers["Location"] == (
+            f"http://shop.test/return/?token={created.provider_order_id}"
+            "&PayerID=STUBPAYER"
+        )
+        assert captured.capture_id.startswith("STUBCAP")
+        status = provider.get_payment_status(
+            provider_order_id=created.provider_order_id
+        )
+        assert status == PaymentStatus(
+            PaymentStatus.COMPLETED, capture_id=captured.capture_id
+        )
+
+    def test_unapproved_order_cannot_be_captured(self, stub_server):
+        provider = paypal.PayPalProvider()
+        created = _create(provider)
+
+        with pytest.raises(requests.HTTPError) as exc_info:
+            provider.capture_payment(provider_order_id=created.provider_order_id)
+
+        assert exc_info.value.response.status_code == 422
+
+    def test_request_id_replays_create(self, stub_server):
+        provider = paypal.PayPalProvider()
+
+        first = _create(provider)
+        second = _create(provider)  # same order -> same PayPal-Request-Id
+
+        assert first.provider_order_id == second.provider_order_id
+        assert len(stub_server.stub.orders) == 1
+
+    def test_api_needs_a_token(self, stub_server):
+        response = requests.post(
+            f"{stub_server.base_url}/v2/checkout/orders", json={}, timeout=5
+        )
+
+        assert response.status_code == 401
+
+    @pytest.mark.stub_config(StubConfig(auto_approve=True))
+    def test_auto_approve(self, stub_server):
+        provider = paypal.PayPalProvider()
+        created = _create(provider)
+
+        captured = provider.capture_payment(provider_order_id=created.provider_order_id)
+
+        assert captured.approved
+
+    @pytest.mark.stub_config(StubConfig(error_rate=1.0))
+    def test_error_rate(self, stub_server):
+        with pytest.raises(requests.HTTPError) as exc_info:
+            _create(paypal.PayPalProvider())
+
+        assert exc_info.value.response.status_code == 503
@@ -0,0 +1,60 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from backend.apps.payments.base import CaptureResult, PaymentProvider, PaymentResult
+from backend.apps.payments.providers.paypal import PayPalProvider
+from backend.apps.payments.services import (
+    UnknownPaymentProviderError,
+    get_payment_provider,
+    get_payment_providers,
+)
+
+PAYPAL = "backend.apps.payments.providers.paypal.PayPalProvider"
+DUMMY = "backend.apps.payments.tests.test_registry.DummyProvider"
+
+
+class DummyProvider(PaymentProvider):
+    slug = "dummy"
+
+    def create_payment(self, *, order, return_url, cancel_url):
+        return PaymentResult(approved=True, provider_order_id=f"D-{order.id}")
+
+    def capture_payment(self, *, provider_order_id):
+        return CaptureResult(approved=True, capture_id=f"C-{provider_order_id}")
+
+
+class TestProviderRegistry:
+    def test_default_provider_is_built_once(self):
+        provider = get_payment_provider()
+
+        assert isinstance(provider, PayPalProvider)
+        assert get_payment_provider() is provider
+        assert get_payment_provider("paypal") is provider
+
+    def test_multiple_providers_by_slug(self, settings):
+        settings.PAYMENT_PROVIDERS = [DUMMY]
+
+        assert get_payment_provider().slug == "paypal"
+        assert type(get_payment_provider("dummy")).__name__ == "DummyProvider"
+        assert [p.slug for p in get_payment_providers()] == ["paypal", "dummy"]
+
+    def test_default_follows_settings(self, settings):
+        settings.PAYMENT_PROVIDER = DUMMY
+        settings.PAYMENT_PROVIDERS = [PAYPAL]
+
+        assert get_payment_provider().slug == "dummy"
+        assert get_payment_provider("paypal").slug == "paypal"
+
+    def test_unknown_slug(self):
+        with pytest.raises(UnknownPaymentProviderError):
+            get_payment_provider("stripe")
+
+    def test_duplicate_slug_is_a_config_error(self, settings):
+        settings.PAYMENT_PROVIDERS = [f"{DUMMY}Twin", DUMMY]
+
+        with pytest.raises(ImproperlyConfigured):
+            get_payment_provider()
+
+
+class DummyProviderTwin(DummyProvider):
+    pass
@@ -0,0 +1,344 @@
+import base64
+import datetime
+import json
+import zlib
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.x509.oid import NameOID
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from backend.apps.orders.models import Order
+from backend.apps.payments import webhooks
+from backend.apps.payments.base import CaptureResult
+from backend.apps.payments.breaker import PaymentUnavailableError
+from backend.apps.payments.models import PaymentEvent
+from backend.apps.payments.providers import paypal
+
+CERT_URL = "https://api.paypal.com/v1/notifications/certs/CERT-1"
+WEBHOOK_ID = "WH-TEST"
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(scope="module")
+def cert_pem(signing_key):
+    name = x509.Name(
+        [x509.NameAttribute(NameOID.COMMON_NAME, "messageverificationcerts")]
+    )
+    now = datetime.datetime.now(datetime.UTC)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(signing_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(signing_key, hashes.SHA256())
+    )
+    return cert.public_bytes(serialization.Encoding.PEM)
+
+
+@pytest.fixture(autouse=True)
+def _webhook_setup(settings, cert_pem):
+    settings.PAYPAL_WEBHOOK_ID = WEBHOOK_ID
+    cache.clear()
+    paypal._certs.clear()
+    paypal._certs[CERT_URL] = cert_pem
+    yield
+    cache.clear()
+    paypal._certs.clear()
+
+
+@pytest.fixture
+def sign(signing_key):
+    def _sign(body, transmission_id="T-1", webhook_id=WEBHOOK_ID):
+        transmission_time = "2026-10-17T10:00:00Z"
+        message = (
+            f"{transmission_id}|{transmission_time}|{webhook_id}|{zlib.crc32(body)}"
+        ).encode()
+        signature = signing_key.sign(message, padding.PKCS1v15(), hashes.SHA256())
+        return {
+            "HTTP_PAYPAL_TRANSMISSION_ID": transmission_id,
+            "HTTP_PAYPAL_TRANSMISSION_TIME": transmission_time,
+            "HTTP_PAYPAL_TRANSMISSION_SIG": base64.b64encode(signature).decode(),
+            "HTTP_PAYPAL_CERT_URL": CERT_URL,
+            "HTTP_PAYPAL_AUTH_ALGO": "SHA256withRSA",
+        }
+
+    return _sign
+
+
+@pytest.fixture
+def order(db):
+    return Order.objects.create(
+        email="hook@test.com",
+        provider_order_id="PP-HOOK",
+        payment_provider="paypal",
+    )
+
+
+@pytest.fixture
+def capture():
+    provider = MagicMock()
+    provider.slug = "paypal"
+    provider.capture_payment.return_value = CaptureResult(
+        approved=True, capture_id="CAP-HOOK"
+    )
+    with patch(
+        "backend.apps.orders.services.get_payment_provider", return_value=provider
+    ):
+        yield provider
+
+
+def _event(event_id, event_type, resource):
+    return json.dumps(
+        {"id": event_id, "event_type": event_type, "resource": resource}
+    ).encode()
+
+
+def _post(client, body, headers):
+    return client.post(
+        reverse("paypal_webhook"), body, content_type="application/json", **headers
+    )
+
+
+class TestSignature:
+    def test_valid_signature(self, sign):
+        body = b'{"id": "WH-1"}'
+        headers = {
+            key.removeprefix("HTTP_").replace("_", "-"): value
+            for key, value in sign(body).items()
+        }
+
+        assert paypal.verify_webhook_signature(headers, body)
+
+    def test_tampered_body_is_rejected(self, sign):
+        headers = {
+            key.removeprefix("HTTP_").replace("_", "-"): value
+            for key, value in sign(b'{"id": "WH-1"}').items()
+        }
+
+        assert not paypal.verify_webhook_signature(headers, b'{"id": "WH-2"}')
+
+    def test_untrusted_cert_url_is_not_fetched(self, sign):
+        body = b"{}"
+        headers = {
+            key.removeprefix("HTTP_").replace("_", "-"): value
+            for key, value in sign(body).items()
+        }
+        headers["PAYPAL-CERT-URL"] = "https://evil.example.com/cert.pem"
+
+        with patch.object(paypal.http_client, "get") as get:
+            assert not paypal.verify_webhook_signature(headers, body)
+
+        get.assert_not_called()
+
+    def test_cert_is_fetched_once(self, sign, cert_pem):
+        paypal._certs.clear()
+        response = MagicMock(content=cert_pem)
+        body = b"{}"
+        headers = {
+            key.removeprefix("HTTP_").replace("_", "-"): value
+            for key, value in sign(body).items()
+        }
+
+        with patch.object(paypal.http_client, "get", return_value=response) as get:
+            assert paypal.verify_webhook_signature(headers, body)
+            paypal._certs.clear()  # another process: served from the cache
+            assert paypal.verify_webhook_signature(headers, body)
+
+        assert get.call_count == 1
+
+
+@pytest.mark.django_db
+class TestWebhookEndpoint:
+    def test_bad_signature_is_rejected(self, client, sign):
+        body = _event("WH-1", webhooks.PAYPAL_ORDER_APPROVED, {"id": "PP-HOOK"})
+        headers = sign(body, webhook_id="WH-OTHER")
+
+        response = _post(client, body, headers)
+
+        assert response.status_code == 400
+        assert not PaymentEvent.objects.exists()
+
+    def test_verified_event_is_queued_once(self, client, sign):
+        body = _event("WH-1", webhooks.PAYPAL_ORDER_APPROVED, {"id": "PP-HOOK"})
+
+        first = _post(client, body, sign(body))
+        second = _post(client, body, sign(body, transmission_id="T-2"))
+
+        assert first.status_code == second.status_code == 200
+        event = PaymentEvent.objects.get()
+        assert event.provider == "paypal"
+        assert event.event_type == webhooks.PAYPAL_ORDER_APPROVED
+        assert event.status == PaymentEvent.Status.PENDING
+
+    def test_acknowledged_without_processing(self, client, sign, order, capture):
+        body = _event("WH-1", webhooks.PAYPAL_ORDER_APPROVED, {"id": "PP-HOOK"})
+
+        _post(client, body, sign(body))
+
+        capture.capture_payment.assert_not_called()
+        order.refresh_from_db()
+        assert order.status == Order.Status.PENDING
+
+
+@pytest.mark.django_db
+class TestProcessPendingEvents:
+    def test_approved_order_is_captured(self, order, capture):
+        webhooks.enqueue_event(
+            provider="paypal",
+            event_id="WH-1",
+            event_type=webhooks.PAYPAL_ORDER_APPROVED,
+            payload={"resource": {"id": "PP-HOOK"}},
+        )
+
+        assert webhooks.process_pending_events() == 1
+
+        order.refresh_from_db()
+        assert order.status == Order.Status.PAID
+        assert order.provider_capture_id == "CAP-HOOK"
+        event = PaymentEvent.objects.get()
+        assert event.status == PaymentEvent.Status.PROCESSED
+        assert event.processed_at is not None
+
+    def test_completed_capture_marks_order_paid(self, order, capture):
+        webhooks.enqueue_event(
+            provider="paypal",
+            event_id="WH-2",
+            event_type=webhooks.PAYPAL_CAPTURE_COMPLETED,
+            payload={
+                "resource": {
+                    "id": "CAP-REMOTE",
+                    "supplementary_data": {"related_ids": {"order_id": "PP-HOOK"}},
+                }
+            },
+        )
+
+        webhooks.process_pending_events()
+
+        capture.capture_payment.assert_not_called()
+        order.refresh_from_db()
+        assert order.status == Order.Status.PAID
+        assert order.provider_capture_id == "CAP-REMOTE"
+
+    def test_failure_is_retried_then_given_up(self, order, capture):
+        capture.capture_payment.side_effect = RuntimeError("provider down")
+        webhooks.request_capture(order)
+
+        assert webhooks.process_pending_events() == 0
+        event = PaymentEvent.objects.get()
+        assert event.status == PaymentEvent.Status.PENDING
+        assert event.attempts == 1
+        assert "provider down" in event.last_error
+        assert event.next_attempt_at > timezone.now()
+
+        # Not due yet: the same run doesn't retry it.
+        assert webhooks.process_pending_events() == 0
+        assert capture.capture_payment.call_count == 1
+
+        for _ in range(webhooks.MAX_ATTEMPTS - 1):
+            PaymentEvent.objects.update(next_attempt_at=timezone.now())
+            webhooks.process_pending_events()
+
+        event.refresh_from_db()
+        assert event.status == PaymentEvent.Status.FAILED
+        assert event.attempts == webhooks.MAX_ATTEMPTS
+        order.refresh_from_db()
+        assert order.status == Order.Status.PENDING
+
+    def test_retry_delay_backs_off(self):
+        delays = [webhooks._retry_delay(n) for n in (1, 2, 3, 10)]
+
+        assert delays[:3] == [
+            webhooks.RETRY_BASE,
+            webhooks.RETRY_BASE * 2,
+            webhooks.RETRY_BASE * 4,
+        ]
+        assert delays[3] == webhooks.RETRY_MAX
+
+    def test_open_circuit_defers_without_using_an_attempt(self, order, capture):
+        capture.capture_payment.side_effect = PaymentUnavailableError("open")
+        webhooks.request_capture(order)
+
+        assert webhooks.process_pending_events() == 0
+
+        event = PaymentEvent.objects.get()
+        assert event.attempts == 0
+        assert event.next_attempt_at > timezone.now()
+
+    def test_command_exits_while_events_back_off(self, order, capture):
+        capture.capture_payment.side_effect = RuntimeError("provider down")
+        webhooks.request_capture(order)
+        out = StringIO()
+
+        call_command("process_payment_events", stdout=out)
+
+        assert "Processed 0 event(s)." in out.getvalue()
+        assert capture.capture_payment.call_count == 1
+
+    def test_command_reports_processed_events(self, order, capture):
+        webhooks.request_capture(order)
+        out = StringIO()
+
+        call_command("process_payment_events", stdout=out)
+
+        assert "Processed 1 event(s)." in out.getvalue()
+        order.refresh_from_db()
+        assert order.status == Order.Status.PAID
+
+
+@pytest.mark.django_db
+class TestAsyncPaymentReturn:
+    def test_return_queues_capture_and_polls(self, client, settings, order, capture):
+        settings.PAYMENT_ASYNC_CAPTURE = True
+        status_url = reverse("payment_status") + "?token=PP-HOOK"
+
+        response = client.get(reverse("payment_return") + "?token=PP-HOOK")
+        client.get(reverse("payment_return") + "?token=PP-HOOK")
+
+        assert response.url == status_url
+        capture.capture_payment.assert_not_called()
+        assert PaymentEvent.objects.count() == 1
+
+        pending = client.get(status_url, HTTP_HX_REQUEST="true")
+        assert pending.status_code == 200
+        assert b'id="payment-status"' in pending.content
+
+        webhooks.process_pending_events()
+
+        done = client.get(status_url, HTTP_HX_REQUEST="true")
+        token = done.headers["HX-Redirect"].rsplit("/", 2)[-2]
+        assert done.headers["HX-Redirect"] == reverse(
+            "guest_order_success", kwargs={"token": token}
+        )
+        order.refresh_from_db()
+        assert order.status == Order.Status.PAID
+
+    def test_status_page_stops_polling_when_capture_fails(
+        self, client, settings, order, capture
+    ):
+        settings.PAYMENT_ASYNC_CAPTURE = True
+        client.get(reverse("payment_return") + "?token=PP-HOOK")
+        PaymentEvent.objects.update(status=PaymentEvent.Status.FAILED)
+
+        response = client.get(
+            reverse("payment_status") + "?token=PP-HOOK", HTTP_HX_REQUEST="true"
+        )
+
+        assert response.headers["HX-Redirect"] == reverse("cart_detail")
+        msgs = [str(m) for m in get_messages(response.wsgi_request)]
+        assert any("capture failed" in m for m in msgs)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path("webhooks/paypal/", views.paypal_webhook, name="paypal_webhook"),
+]
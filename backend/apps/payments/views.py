@@ -1,2 +1,32 @@
+import json
 
-# Create your views here.
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .providers.paypal import PayPalProvider, verify_webhook_signature
+from .webhooks import enqueue_event
+
+
+@csrf_exempt
+@require_POST
+def paypal_webhook(request: HttpRequest) -> HttpResponse:
+    """Verify, store, ack. The worker does the actual processing."""
+    body = request.body
+    if not verify_webhook_signature(request.headers, body):
+        return HttpResponse(status=400)
+
+    try:
+        payload = json.loads(body)
+        event_id = str(payload["id"])
+        event_type = str(payload["event_type"])
+    except (ValueError, KeyError, TypeError):
+        return HttpResponse(status=400)
+
+    enqueue_event(
+        provider=PayPalProvider.slug,
+        event_id=event_id,
+        event_type=event_type,
+        payload=payload,
+    )
+    return HttpResponse(status=200)
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from backend.apps.orders.models import Order
+from backend.apps.orders.services import capture_order_payment, confirm_order_paid
+
+from .breaker import PaymentUnavailableError
+from .models import PaymentEvent
+
+logger = logging.getLogger(__name__)
+
+# Queued by the return page so capture happens in the worker, not while the
+# shopper waits; shares the queue (and dedupe) with provider webhooks.
+CAPTURE_REQUESTED = "order.capture_requested"
+# PayPal webhook event types we act on.
+PAYPAL_ORDER_APPROVED = "CHECKOUT.ORDER.APPROVED"
+PAYPAL_CAPTURE_COMPLETED = "PAYMENT.CAPTURE.COMPLETED"
+
+MAX_ATTEMPTS = 5
+PROCESS_BATCH_SIZE = 50
+# Delay after the n-th failed attempt: RETRY_BASE * 2**(n-1), capped.
+RETRY_BASE = timedelta(seconds=10)
+RETRY_MAX = timedelta(minutes=10)
+
+
+def async_capture_enabled() -> bool:
+    return bool(getattr(settings, "PAYMENT_ASYNC_CAPTURE", False))
+
+
+def enqueue_event(
+    *, provider: str, event_id: str, event_type: str, payload: dict[str, Any]
+) -> PaymentEvent | None:
+    """Stores an event for the worker; None if it was already queued."""
+    try:
+        with transaction.atomic():
+            return PaymentEvent.objects.create(
+                provider=provider,
+                event_id=event_id,
+                event_type=event_type,
+                payload=payload,
+            )
+    except IntegrityError:
+        return None
+
+
+def request_capture(order: Order) -> None:
+    enqueue_event(
+        provider=order.payment_provider,
+        event_id=f"capture:{order.provider_order_id}",
+        event_type=CAPTURE_REQUESTED,
+        payload={"order_id": order.id},
+    )
+
+
+def _order_for(provider: str, provider_order_id: str) -> Order | None:
+    if not provider_order_id:
+        return None
+    return Order.objects.filter(
+        payment_provider=provider, provider_order_id=provider_order_id
+    ).first()
+
+
+def _handle_capture_requested(event: PaymentEvent) -> None:
+    capture_order_payment(int(event.payload["order_id"]))
+
+
+def _handle_paypal_order_approved(event: PaymentEvent) -> None:
+    resource = event.payload.get("resource") or {}
+    order = _order_for(event.provider, str(resource.get("id") or ""))
+    if order is not None:
+        capture_order_payment(order.id)
+
+
+def _handle_paypal_capture_completed(event: PaymentEvent) -> None:
+    resource = event.payload.get("resource") or {}
+    related = (resource.get("supplementary_data") or {}).get("related_ids") or {}
+    order = _order_for(event.provider, str(related.get("order_id") or ""))
+    if order is not None:
+        confirm_order_paid(order.id, capture_id=str(resource.get("id") or ""))
+
+
+_HANDLERS: dict[str, Callable[[PaymentEvent], None]] = {
+    CAPTURE_REQUESTED: _handle_capture_requested,
+    PAYPAL_ORDER_APPROVED: _handle_paypal_order_approved,
+    PAYPAL_CAPTURE_COMPLETED: _handle_paypal_capture_completed,
+}
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    delay: timedelta = RETRY_BASE * 2 ** max(attempts - 1, 0)
+    return min(delay, RETRY_MAX)
+
+
+def _process(event: PaymentEvent) -> bool:
+    """Runs the event's handler; True if the event reached a final state."""
+    handler = _HANDLERS.get(event.event_type)
+    now = timezone.now()
+    try:
+        if handler is not None:
+            handler(event)
+    except PaymentUnavailableError as exc:
+        # Circuit open: not the event's fault, so no attempt is used up; try
+        # again once the circuit may have closed.
+        open_seconds = int(getattr(settings, "PAYMENT_BREAKER_OPEN_SECONDS", 30))
+        event.next_attempt_at = now + timedelta(seconds=open_seconds)
+        event.last_error = str(exc)
+    except Exception as exc:
+        logger.exception("Payment event %s failed", event.pk)
+        event.attempts += 1
+        event.last_error = repr(exc)
+        if event.attempts >= MAX_ATTEMPTS:
+            event.status = PaymentEvent.Status.FAILED
+        else:
+            event.next_attempt_at = now + _retry_delay(event.attempts)
+    else:
+        event.attempts += 1
+        event.status = PaymentEvent.Status.PROCESSED
+        event.processed_at = now
+        event.last_error = ""
+    event.save(
+        update_fields=[
+            "status",
+            "attempts",
+            "last_error",
+            "processed_at",
+            "next_attempt_at",
+        ]
+    )
+    return event.status != PaymentEvent.Status.PENDING
+
+
+def process_pending_events(*, batch_size: int = PROCESS_BATCH_SIZE) -> int:
+    """
+    Processes up to `batch_size` due events, each in its own transaction
+    (so a slow provider call holds one order lock, not a batch's). Events
+    are claimed with SKIP LOCKED, so several workers can run at once.
+    Returns how many were processed or given up on; events put off for a
+    retry don't count, so an idle or backing-off queue reads as 0.
+    """
+    seen: list[int] = []
+    finished = 0
+    for _ in range(batch_size):
+        with transaction.atomic():
+            event = (
+                PaymentEvent.objects.select_for_update(skip_locked=True)
+                .filter(
+                    status=PaymentEvent.Status.PENDING,
+                    next_attempt_at__lte=timezone.now(),
+                )
+                .exclude(pk__in=seen)
+                .order_by("next_attempt_at")
+                .first()
+            )
+            if event is None:
+                break
+            seen.append(event.pk)
+            if _process(event):
+                finished += 1
+    return finished
+
+
+def capture_failed(order: Order) -> bool:
+    """True if the worker gave up capturing `order` (see request_capture)."""
+    return PaymentEvent.objects.filter(
+        provider=order.payment_provider,
+        event_id=f"capture:{order.provider_order_id}",
+        status=PaymentEvent.Status.FAILED,
+    ).exists()
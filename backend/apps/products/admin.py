@@ -75,7 +75,7 @@ class ProductAdmin(ModelAdmin):
         (
             "Pricing & Inventory",
             {
-                "fields": (("price", "stock"), "is_active"),
+                "fields": (("price", "stock"), "stock_slot_count", "is_active"),
                 "classes": ("tab-panel",),
             },
         ),
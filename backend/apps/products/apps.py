@@ -5,3 +5,6 @@ class ProductsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "backend.apps.products"
     verbose_name = "Shop Inventory"
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
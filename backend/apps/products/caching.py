@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import hashlib
+
+from django.core.cache import cache
+
+# Bumped by Product/Category signals; every catalog cache key embeds it, so a
+# bump orphans all cached listings/facets at once (they then expire by TTL).
+CATALOG_VERSION_KEY = "products:catalog_version"
+
+LISTING_CACHE_TIMEOUT = 60 * 15
+LISTING_HITS_KEY = "products:listing:hits"
+LISTING_MISSES_KEY = "products:listing:misses"
+
+
+def get_catalog_version() -> int:
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return int(version)
+
+
+def bump_catalog_version() -> None:
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Key missing (cold or evicted cache): anything cached under an
+        # older version is unreachable once we start from a fresh value.
+        cache.set(CATALOG_VERSION_KEY, get_catalog_version() + 1, timeout=None)
+
+
+def catalog_cache_key(prefix: str, *parts: str) -> str:
+    """`<prefix>:v<version>:<digest of parts>`"""
+    digest = hashlib.sha1("\x1f".join(parts).encode()).hexdigest()
+    return f"{prefix}:v{get_catalog_version()}:{digest}"
+
+
+def normalize_listing_filters(*, category_slug: str, query: str) -> tuple[str, str]:
+    return category_slug.strip().lower(), " ".join(query.lower().split())
+
+
+def listing_cache_key(
+    *,
+    category_slug: str = "",
+    query: str = "",
+    page: str = "",
+    cursor: str = "",
+    variant: str = "",
+) -> str:
+    category_slug, query = normalize_listing_filters(
+        category_slug=category_slug, query=query
+    )
+    return catalog_cache_key(
+        "products:listing",
+        category_slug,
+        query,
+        page.strip(),
+        cursor.strip(),
+        variant,
+    )
+
+
+def _count(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_cached_listing(key: str) -> str | None:
+    html: str | None = cache.get(key)
+    _count(LISTING_HITS_KEY if html is not None else LISTING_MISSES_KEY)
+    return html
+
+
+def set_cached_listing(key: str, html: str) -> None:
+    cache.set(key, html, LISTING_CACHE_TIMEOUT)
+
+
+def get_listing_cache_stats() -> dict[str, int]:
+    """
+    Hit/miss counters for monitoring. They are totals for all workers only
+    when CACHE_URL configures a shared cache; with the LocMem default each
+    worker process counts its own.
+    """
+    hits = int(cache.get(LISTING_HITS_KEY) or 0)
+    misses = int(cache.get(LISTING_MISSES_KEY) or 0)
+    return {"hits": hits, "misses": misses}
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .caching import catalog_cache_key, normalize_listing_filters
+from .models import Category
+from .selectors import get_filtered_products
+
+FACETS_CACHE_TIMEOUT = 60 * 5
+
+# (key, min inclusive, max exclusive); None = open-ended.
+PRICE_BUCKETS: tuple[tuple[str, Decimal | None, Decimal | None], ...] = (
+    ("under-25", None, Decimal("25")),
+    ("25-50", Decimal("25"), Decimal("50")),
+    ("50-100", Decimal("50"), Decimal("100")),
+    ("100-plus", Decimal("100"), None),
+)
+
+
+@dataclass(frozen=True)
+class CategoryFacet:
+    slug: str
+    name: str
+    count: int
+
+
+@dataclass(frozen=True)
+class PriceBucketFacet:
+    key: str
+    min_price: Decimal | None
+    max_price: Decimal | None
+    count: int
+
+
+@dataclass(frozen=True)
+class Facets:
+    """
+    `categories` counts ignore the active category (so the sidebar can show
+    what switching category would yield); every other count is for the
+    current category + query (`matching` is the size of that result set).
+    """
+
+    total: int
+    matching: int
+    categories: list[CategoryFacet]
+    in_stock: int
+    new: int
+    featured: int
+    price_buckets: list[PriceBucketFacet]
+
+
+def normalize_filter_key(*, category_slug: str = "", query: str = "") -> str:
+    category_slug, query = normalize_listing_filters(
+        category_slug=category_slug, query=query
+    )
+    return catalog_cache_key("products:facets", category_slug, query)
+
+
+def _price_q(low: Decimal | None, high: Decimal | None) -> Q:
+    q = Q()
+    if low is not None:
+        q &= Q(products__price__gte=low)
+    if high is not None:
+        q &= Q(products__price__lt=high)
+    return q
+
+
+def _compute_facets(*, category_slug: str, query: str) -> Facets:
+    match = Q(products__is_active=True)
+    if query:
+        matching_ids = get_filtered_products(query=query).order_by().values("id")
+        match &= Q(products__id__in=matching_ids)
+
+    aggregates: dict[str, Any] = {
+        "count": Count("products", filter=match),
+        "in_stock": Count("products", filter=match & Q(products__stock__gt=0)),
+        "new": Count("products", filter=match & Q(products__is_new=True)),
+        "featured": Count("products", filter=match & Q(products__is_featured=True)),
+    }
+    for key, low, high in PRICE_BUCKETS:
+        aggregates[f"price_{key}"] = Count(
+            "products", filter=match & _price_q(low, high)
+        )
+
+    # One grouped query: a row per category with every facet count on it.
+    rows = list(
+        Category.objects.order_by("name").values("slug", "name").annotate(**aggregates)
+    )
+
+    scoped = [r for r in rows if r["slug"] == category_slug] if category_slug else rows
+
+    def _sum(field: str) -> int:
+        return sum(int(r[field]) for r in scoped)
+
+    return Facets(
+        total=sum(int(r["count"]) for r in rows),
+        matching=_sum("count"),
+        categories=[
+            CategoryFacet(slug=r["slug"], name=r["name"], count=int(r["count"]))
+            for r in rows
+        ],
+        in_stock=_sum("in_stock"),
+        new=_sum("new"),
+        featured=_sum("featured"),
+        price_buckets=[
+            PriceBucketFacet(
+                key=key,
+                min_price=low,
+                max_price=high,
+                count=_sum(f"price_{key}"),
+            )
+            for key, low, high in PRICE_BUCKETS
+        ],
+    )
+
+
+def get_facets(*, category_slug: str = "", query: str = "") -> Facets:
+    """Facet counts for the current filter, cached per normalized filter."""
+    category_slug = category_slug.strip().lower()
+    query = " ".join(query.split())
+    key = normalize_filter_key(category_slug=category_slug, query=query)
+
+    facets: Facets | None = cache.get(key)
+    if facets is None:
+        facets = _compute_facets(category_slug=category_slug, query=query)
+        cache.set(key, facets, FACETS_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,25 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from backend.apps.products.models import Product
+from backend.apps.products.stock import rebalance_stock, sync_product_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Even out the stock slots of high-demand products (checkouts drain "
+        "random slots unevenly) and refresh their summed stock."
+    )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        product_ids = list(
+            Product.objects.filter(stock_slot_count__gt=0).values_list("id", flat=True)
+        )
+        for product_id in product_ids:
+            rebalance_stock(product_id)
+        sync_product_stock(product_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebalanced {len(product_ids)} product(s).")
+        )
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from django.db import models
+
+if TYPE_CHECKING:
+    from .models import Product  # noqa: F401 (string base-class argument)
+
+# Everything a product card / cart line renders. `description` (unbounded
+# text) and `search_vector` stay in the table.
+LISTING_FIELDS: tuple[str, ...] = (
+    "id",
+    "category",
+    "category__name",
+    "category__slug",
+    "name",
+    "slug",
+    "image",
+    "image_alt",
+    "price",
+    "stock",
+    "is_active",
+    "is_featured",
+    "is_new",
+    "created_at",
+)
+
+
+class ProductQuerySet(models.QuerySet["Product"]):
+    def active(self) -> ProductQuerySet:
+        return self.filter(is_active=True)
+
+    def featured(self) -> ProductQuerySet:
+        return self.filter(is_featured=True)
+
+    def for_listing(self) -> ProductQuerySet:
+        """Narrow projection for grids, carousels and cart hydration."""
+        return self.select_related("category").only(*LISTING_FIELDS)
+
+    def for_detail(self) -> ProductQuerySet:
+        return self.select_related("category").defer("search_vector")
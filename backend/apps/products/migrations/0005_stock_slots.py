@@ -0,0 +1,52 @@
+# Generated by Django 6.0.2 on 2026-10-17 23:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0004_product_storefront_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="stock_slot_count",
+            field=models.PositiveSmallIntegerField(
+                default=0,
+                help_text="Split stock across this many counters so concurrent checkouts don't queue on one row (flash sales). 0 = off.",
+            ),
+        ),
+        migrations.CreateModel(
+            name="StockSlot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("slot", models.PositiveSmallIntegerField()),
+                ("quantity", models.PositiveIntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_slots",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "slot"), name="stockslot_product_slot_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
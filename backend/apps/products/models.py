@@ -1,10 +1,22 @@
+from collections.abc import Collection
 from decimal import Decimal
+from functools import cached_property
+from typing import Any
 
 from cloudinary.models import CloudinaryField  # type: ignore
-from cloudinary.utils import cloudinary_url
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.urls import reverse
 
+from backend.apps.core.images import (
+    ImageSet,
+    build_image_set,
+    build_image_url,
+    fill_transformation,
+)
+
+from .managers import ProductQuerySet
+
 
 class Category(models.Model):
     name: models.CharField = models.CharField(max_length=100)
@@ -44,6 +56,15 @@ class Product(models.Model):
 
     is_active: models.BooleanField = models.BooleanField(default=True)
     stock: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+    # High-demand mode: checkout takes from StockSlot rows instead of locking
+    # this row; `stock` is then kept as their sum (for display/filters).
+    stock_slot_count = models.PositiveSmallIntegerField(
+        default=0,
+        help_text=(
+            "Split stock across this many counters so concurrent checkouts "
+            "don't queue on one row (flash sales). 0 = off."
+        ),
+    )
 
     is_featured: models.BooleanField = models.BooleanField(default=False)
     is_new: models.BooleanField = models.BooleanField(default=False)
@@ -51,12 +72,51 @@ class Product(models.Model):
     created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True)
     updated_at: models.DateTimeField = models.DateTimeField(auto_now=True)
 
+    # Full-text index (Postgres only; GIN-indexed, maintained by signals).
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
+    # `stock` as loaded from the database (see stock_edited).
+    _loaded_stock: int | None = None
+
     class Meta:
         ordering = ["-created_at"]
+        # Partial indexes matching the storefront's hot query shapes:
+        # active listing (+ keyset tiebreak), per-category, featured.
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(is_active=True),
+                name="product_active_created_idx",
+            ),
+            models.Index(
+                fields=["category", "-created_at"],
+                condition=models.Q(is_active=True),
+                name="product_active_cat_created_idx",
+            ),
+            models.Index(
+                fields=["-created_at"],
+                condition=models.Q(is_active=True, is_featured=True),
+                name="product_featured_created_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return str(self.name)
 
+    @classmethod
+    def from_db(
+        cls, db: str | None, field_names: Collection[str], values: Collection[Any]
+    ) -> "Product":
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_stock = instance.__dict__.get("stock")
+        return instance
+
+    def stock_edited(self) -> bool:
+        """True if `stock` was set to a new value since this row was loaded."""
+        return self.__dict__.get("stock") != self._loaded_stock
+
     def get_absolute_url(self) -> str:
         return reverse("products:product_detail", kwargs={"slug": self.slug})
 
@@ -68,22 +128,17 @@ class Product(models.Model):
         if not self.image:
             return ""
 
-        t: dict[str, object] = {
-            "fetch_format": "auto",
-            "quality": "auto",
-        }
+        return build_image_url(
+            self.image.public_id,
+            transformation=fill_transformation(width=width, height=height),
+        )
 
-        if width and height:
-            t.update(
-                {"width": width, "height": height, "crop": "fill", "gravity": "auto"}
-            )
-        elif width:
-            t.update({"width": width, "crop": "fill", "gravity": "auto"})
-        elif height:
-            t.update({"height": height, "crop": "fill", "gravity": "auto"})
-
-        url, _ = cloudinary_url(self.image.public_id, transformation=t)
-        return str(url)
+    @cached_property
+    def image_set(self) -> ImageSet:
+        """All srcset URLs at once; computed once per instance."""
+        if not self.image:
+            return build_image_set("")
+        return build_image_set(self.image.public_id)
 
     @property
     def image_url_auto(self) -> str:
@@ -104,3 +159,23 @@ class Product(models.Model):
     @property
     def image_url_1200(self) -> str:
         return self.image_url(width=1200)
+
+
+class StockSlot(models.Model):
+    """One counter of a high-demand product's stock (see stock.py)."""
+
+    product = models.ForeignKey(
+        Product, related_name="stock_slots", on_delete=models.CASCADE
+    )
+    slot = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "slot"], name="stockslot_product_slot_uniq"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.product_id}#{self.slot}: {self.quantity}"
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db.models import Q, QuerySet
+
+from .models import Product
+
+
+@dataclass(frozen=True)
+class CursorPage:
+    """One keyset page. `next_cursor` is None on the last page."""
+
+    object_list: list[Product]
+    next_cursor: str | None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(product: Product) -> str:
+    raw = f"{product.created_at.isoformat()}|{product.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[datetime, int] | None:
+    """Returns (created_at, id) or None for a missing/garbled cursor."""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def paginate_by_cursor(
+    qs: QuerySet[Product],
+    *,
+    cursor: str = "",
+    per_page: int = 24,
+) -> CursorPage:
+    """
+    Keyset pagination on (created_at, id), newest first.
+
+    Each page is a single indexed range scan: no COUNT(*) and no OFFSET,
+    so page 500 costs the same as page 1.
+    """
+    qs = qs.order_by("-created_at", "-id")
+
+    position = decode_cursor(cursor)
+    if position is not None:
+        created_at, pk = position
+        qs = qs.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+
+    # Fetch one extra row to learn whether another page exists.
+    rows = list(qs[: per_page + 1])
+    items = rows[:per_page]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > per_page else None
+
+    return CursorPage(object_list=items, next_cursor=next_cursor)
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import DatabaseError, connections
+from django.db.models import Case, F, IntegerField, Q, QuerySet, Value, When
+from django.db.models.expressions import CombinedExpression
+
+from .models import Product
+
+# Postgres text search configuration used for both indexing and querying.
+SEARCH_CONFIG = "english"
+
+# SQLite FTS5 shadow table (dev only). Kept in sync by signals.
+FTS_TABLE = "products_product_fts"
+
+# The SQLite fallback orders by rank with a CASE expression, so cap the
+# number of matches it hands back to the ORM.
+FTS_MAX_RESULTS = 500
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _vendor(using: str) -> str:
+    return str(connections[using].vendor)
+
+
+def _search_vector() -> CombinedExpression:
+    return SearchVector("name", weight="A", config=SEARCH_CONFIG) + SearchVector(
+        "description", weight="B", config=SEARCH_CONFIG
+    )
+
+
+def _fts_match_expression(query: str) -> str:
+    """
+    Turn free user input into a safe FTS5 MATCH expression:
+    every word becomes a quoted prefix term, implicitly AND-ed.
+    """
+    tokens = _TOKEN_RE.findall(query)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _tsquery_expression(query: str) -> str:
+    """
+    The Postgres counterpart of _fts_match_expression: every word becomes a
+    quoted prefix lexeme (`'blu':*`), AND-ed, so search-as-you-type matches
+    the same products as the SQLite FTS5 path.
+    """
+    tokens = _TOKEN_RE.findall(query)
+    return " & ".join(f"'{token}':*" for token in tokens)
+
+
+def _fts_ranked_ids(query: str, *, using: str) -> list[int] | None:
+    """
+    Returns product ids best-first, or None if the FTS table is missing
+    (e.g. test DB built without migrations) so callers can fall back.
+    """
+    match = _fts_match_expression(query)
+    if not match:
+        return []
+
+    sql = (
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+        f"ORDER BY bm25({FTS_TABLE}, 10.0, 1.0) LIMIT %s"
+    )
+    try:
+        with connections[using].cursor() as cursor:
+            cursor.execute(sql, [match, FTS_MAX_RESULTS])
+            return [int(row[0]) for row in cursor.fetchall()]
+    except DatabaseError:
+        return None
+
+
+def _icontains(qs: QuerySet[Product], query: str) -> QuerySet[Product]:
+    return qs.filter(Q(name__icontains=query) | Q(description__icontains=query))
+
+
+def search_products(qs: QuerySet[Product], query: str) -> QuerySet[Product]:
+    """
+    Filters `qs` to products matching `query`, best match first.
+
+    - PostgreSQL: GIN-indexed `search_vector` + ts_rank.
+    - SQLite: FTS5 shadow table + bm25.
+    Both match every word as a prefix ("blu" finds "Blue Vase").
+    - Anything else (or no FTS table): icontains scan.
+    """
+    query = query.strip()
+    if not query:
+        return qs
+
+    vendor = _vendor(qs.db)
+
+    if vendor == "postgresql":
+        expression = _tsquery_expression(query)
+        if not expression:
+            return qs.none()
+        search_query = SearchQuery(expression, config=SEARCH_CONFIG, search_type="raw")
+        return (
+            qs.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "-created_at")
+        )
+
+    if vendor == "sqlite":
+        ids = _fts_ranked_ids(query, using=qs.db)
+        if ids is not None:
+            if not ids:
+                return qs.none()
+            ordering = Case(
+                *[When(id=pk, then=Value(pos)) for pos, pk in enumerate(ids)],
+                output_field=IntegerField(),
+            )
+            return qs.filter(id__in=ids).order_by(ordering)
+
+    return _icontains(qs, query)
+
+
+def index_product(product: Product, *, using: str = "default") -> None:
+    """Refresh the search index row for a single product."""
+    vendor = _vendor(using)
+
+    if vendor == "postgresql":
+        Product.objects.using(using).filter(pk=product.pk).update(
+            search_vector=_search_vector()
+        )
+        return
+
+    if vendor == "sqlite":
+        try:
+            with connections[using].cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product.pk]
+                )
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+                    "VALUES (%s, %s, %s)",
+                    [product.pk, product.name, product.description],
+                )
+        except DatabaseError:
+            pass
+
+
+def unindex_product(product_id: int, *, using: str = "default") -> None:
+    if _vendor(using) != "sqlite":
+        # Postgres keeps the vector on the row itself.
+        return
+
+    try:
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product_id])
+    except DatabaseError:
+        pass
+
+
+def rebuild_index(*, using: str = "default") -> None:
+    """
+    (Re)builds the whole index. Safe to run repeatedly; also creates the
+    SQLite FTS table when the DB was built without migrations.
+    """
+    vendor = _vendor(using)
+
+    if vendor == "postgresql":
+        Product.objects.using(using).update(search_vector=_search_vector())
+        return
+
+    if vendor == "sqlite":
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                "USING fts5(name, description)"
+            )
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+                "SELECT id, name, description FROM products_product"
+            )
@@ -1,14 +1,15 @@
 from __future__ import annotations
 
-from django.db.models import Q, QuerySet
+from django.db.models import QuerySet
 
 from .models import Category, Product
+from .search import search_products
 
 
 def get_featured_products(*, limit: int = 4) -> QuerySet[Product]:
-    return Product.objects.filter(is_active=True, is_featured=True).order_by(
-        "-created_at"
-    )[:limit]
+    return (Product.objects.active().featured().for_listing().order_by("-created_at"))[
+        :limit
+    ]
 
 
 def get_active_categories() -> QuerySet[Category]:
@@ -16,7 +17,7 @@ def get_active_categories() -> QuerySet[Category]:
 
 
 def get_active_products() -> QuerySet[Product]:
-    return Product.objects.filter(is_active=True).select_related("category")
+    return Product.objects.active().for_listing()
 
 
 def get_filtered_products(
@@ -30,11 +31,11 @@ def get_filtered_products(
         qs = qs.filter(category__slug=category_slug)
 
     if query:
-        qs = qs.filter(Q(name__icontains=query) | Q(description__icontains=query))
+        qs = search_products(qs, query)
 
     return qs
 
 
 def get_active_product_by_slug(*, slug: str) -> Product:
     # Raises DoesNotExist; view will translate to 404 via get_object_or_404 wrapper
-    return Product.objects.get(slug=slug, is_active=True)
+    return Product.objects.active().for_detail().get(slug=slug)
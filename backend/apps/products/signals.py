@@ -0,0 +1,43 @@
+from typing import Any
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import bump_catalog_version
+from .models import Category, Product
+from .search import index_product, unindex_product
+from .stock import STOCK_LAYOUT_FIELDS, sync_stock_slots
+
+_SEARCH_FIELDS = frozenset({"name", "description"})
+
+
+@receiver(post_save, sender=Product)
+def reindex_product(sender: Any, instance: Product, **kwargs: Any) -> None:
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and not _SEARCH_FIELDS & set(update_fields):
+        return
+    index_product(instance, using=kwargs.get("using") or "default")
+
+
+@receiver(post_save, sender=Product)
+def update_stock_slots(sender: Any, instance: Product, **kwargs: Any) -> None:
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and not STOCK_LAYOUT_FIELDS & set(update_fields):
+        return
+    if kwargs.get("created") and not instance.stock_slot_count:
+        return
+    sync_stock_slots(instance)
+    instance._loaded_stock = instance.stock
+
+
+@receiver(post_delete, sender=Product)
+def drop_product_from_index(sender: Any, instance: Product, **kwargs: Any) -> None:
+    unindex_product(instance.pk, using=kwargs.get("using") or "default")
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender: Any, **kwargs: Any) -> None:
+    bump_catalog_version()
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import random
+from collections.abc import Iterable
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Product, StockSlot
+
+# High-demand ("sharded") products keep sellable stock in
+# `stock_slot_count` StockSlot rows. Checkout takes from a random slot no
+# other transaction holds, so concurrent buyers mostly touch different rows;
+# `Product.stock` is refreshed to the slots' sum just after each commit.
+
+# Saving either of these on a Product may change its slot layout.
+STOCK_LAYOUT_FIELDS = frozenset({"stock", "stock_slot_count"})
+
+
+def split_evenly(total: int, parts: int) -> list[int]:
+    """`total` spread over `parts` counters, the remainder on the first ones."""
+    base, extra = divmod(max(total, 0), parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def sharded_product_ids(product_ids: Iterable[int]) -> set[int]:
+    return set(
+        Product.objects.filter(pk__in=list(product_ids), stock_slot_count__gt=0)
+        .order_by()
+        .values_list("id", flat=True)
+    )
+
+
+def available_stock(product_id: int) -> int:
+    total = StockSlot.objects.filter(product_id=product_id).aggregate(
+        total=Sum("quantity")
+    )["total"]
+    return int(total or 0)
+
+
+def sync_product_stock(product_ids: Iterable[int]) -> None:
+    """Sets `Product.stock` to the sum of its slots (one short UPDATE)."""
+    ids = list(product_ids)
+    if not ids:
+        return
+    slot_total = (
+        StockSlot.objects.filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    Product.objects.filter(pk__in=ids, stock_slot_count__gt=0).update(
+        stock=Coalesce(Subquery(slot_total), 0)
+    )
+
+
+def _sync_on_commit(product_id: int) -> None:
+    # After commit, so the product row is only locked for this single UPDATE
+    # and never for the duration of a checkout.
+    transaction.on_commit(lambda: sync_product_stock([product_id]))
+
+
+def _take_from_any_slot(product_id: int, qty: int) -> bool:
+    slot = (
+        StockSlot.objects.select_for_update(skip_locked=True)
+        .filter(product_id=product_id, quantity__gte=qty)
+        .order_by("?")
+        .only("id")
+        .first()
+    )
+    if slot is None:
+        return False
+    StockSlot.objects.filter(pk=slot.pk).update(quantity=F("quantity") - qty)
+    return True
+
+
+def _take_across_slots(product_id: int, qty: int) -> bool:
+    """
+    Slow path: lock every slot (in slot order), take `qty` from their
+    combined total and spread what is left evenly again.
+    """
+    slots = list(
+        StockSlot.objects.select_for_update()
+        .filter(product_id=product_id)
+        .order_by("slot")
+    )
+    total = sum(s.quantity for s in slots)
+    if not slots or total < qty:
+        return False
+
+    for slot, quantity in zip(
+        slots, split_evenly(total - qty, len(slots)), strict=True
+    ):
+        slot.quantity = quantity
+    StockSlot.objects.bulk_update(slots, ["quantity"])
+    return True
+
+
+def take_stock(product_id: int, qty: int) -> bool:
+    """
+    Removes `qty` from a sharded product's slots. Returns False (changing
+    nothing) if there is not enough stock. Must run inside a transaction.
+    """
+    if qty < 1:
+        return False
+    taken = _take_from_any_slot(product_id, qty) or _take_across_slots(product_id, qty)
+    if taken:
+        _sync_on_commit(product_id)
+    return taken
+
+
+def return_stock(product_id: int, qty: int) -> None:
+    """Adds `qty` back to one random slot of a sharded product."""
+    slot_ids = list(
+        StockSlot.objects.filter(product_id=product_id).values_list("id", flat=True)
+    )
+    if not slot_ids or qty < 1:
+        return
+    StockSlot.objects.filter(pk=random.choice(slot_ids)).update(
+        quantity=F("quantity") + qty
+    )
+    _sync_on_commit(product_id)
+
+
+@transaction.atomic
+def distribute_stock(product: Product) -> None:
+    """
+    (Re)builds the slots of `product` from `product.stock` and
+    `product.stock_slot_count`; with a count of 0 the slots are removed.
+    Normally reached through sync_stock_slots.
+    """
+    list(StockSlot.objects.select_for_update().filter(product=product))
+    StockSlot.objects.filter(product=product).delete()
+
+    if product.stock_slot_count < 1:
+        return
+
+    StockSlot.objects.bulk_create(
+        [
+            StockSlot(product=product, slot=i, quantity=quantity)
+            for i, quantity in enumerate(
+                split_evenly(int(product.stock), product.stock_slot_count)
+            )
+        ]
+    )
+
+
+def sync_stock_slots(product: Product) -> bool:
+    """
+    Rebuilds `product`'s slots when its `stock_slot_count` no longer matches
+    them or its `stock` was edited. Runs on every Product save (signals.py),
+    so the admin, fixtures and plain ORM code all get the same slots.
+    Returns True if the slots were rebuilt.
+    """
+    slots = StockSlot.objects.filter(product=product).count()
+    if slots == product.stock_slot_count and not (slots and product.stock_edited()):
+        return False
+    distribute_stock(product)
+    return True
+
+
+@transaction.atomic
+def rebalance_stock(product_id: int) -> None:
+    """Evens out a sharded product's slots without changing its total."""
+    slots = list(
+        StockSlot.objects.select_for_update()
+        .filter(product_id=product_id)
+        .order_by("slot")
+    )
+    if not slots:
+        return
+    total = sum(s.quantity for s in slots)
+    for slot, quantity in zip(slots, split_evenly(total, len(slots)), strict=True):
+        slot.quantity = quantity
+    StockSlot.objects.bulk_update(slots, ["quantity"])
@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_catalog_cache():
+    """Listing/facet caches outlive the per-test DB rollback; start clean."""
+    cache.clear()
+    yield
+    cache.clear()
@@ -0,0 +1,67 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from backend.apps.products.caching import (
+    get_catalog_version,
+    get_listing_cache_stats,
+    listing_cache_key,
+)
+from backend.apps.products.models import Category, Product
+
+
+@pytest.mark.django_db
+class TestListingCache:
+    @pytest.fixture
+    def product(self):
+        cat = Category.objects.create(name="Prints", slug="prints")
+        return Product.objects.create(category=cat, name="Poster", slug="poster")
+
+    def test_second_fragment_request_is_served_from_cache(self, client, product):
+        url = reverse("products:product_list")
+        client.get(url, HTTP_HX_REQUEST="true")
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url, HTTP_HX_REQUEST="true")
+
+        assert b"Poster" in response.content
+        assert not any("products_product" in q["sql"] for q in ctx.captured_queries)
+        assert get_listing_cache_stats() == {"hits": 1, "misses": 1}
+
+    def test_full_page_reuses_fragment(self, client, product):
+        url = reverse("products:product_list")
+        client.get(url, HTTP_HX_REQUEST="true")
+
+        response = client.get(url)
+
+        assert b"Poster" in response.content
+        assert get_listing_cache_stats()["hits"] == 1
+
+    @pytest.mark.parametrize("action", ["save", "delete"])
+    def test_product_changes_invalidate(self, client, product, action):
+        url = reverse("products:product_list")
+        client.get(url, HTTP_HX_REQUEST="true")
+        version = get_catalog_version()
+
+        if action == "save":
+            product.name = "Etching"
+            product.save()
+        else:
+            product.delete()
+
+        assert get_catalog_version() == version + 1
+        response = client.get(url, HTTP_HX_REQUEST="true")
+        assert b"Poster" not in response.content
+
+    def test_category_save_invalidates(self, product):
+        version = get_catalog_version()
+        product.category.name = "Posters"
+        product.category.save()
+        assert get_catalog_version() == version + 1
+
+    def test_key_normalizes_filters(self):
+        assert listing_cache_key(category_slug="Prints ", query="Blue  Vase") == (
+            listing_cache_key(category_slug="prints", query="blue vase")
+        )
+        assert listing_cache_key(page="2") != listing_cache_key(page="3")
@@ -0,0 +1,94 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from backend.apps.products.facets import get_facets, normalize_filter_key
+from backend.apps.products.models import Category, Product
+
+
+@pytest.mark.django_db
+class TestFacets:
+    @pytest.fixture
+    def catalog(self):
+        prints = Category.objects.create(name="Prints", slug="prints")
+        vases = Category.objects.create(name="Vases", slug="vases")
+        Category.objects.create(name="Empty", slug="empty")
+
+        Product.objects.create(
+            category=prints,
+            name="Poster",
+            slug="poster",
+            price=Decimal("20"),
+            stock=3,
+            is_new=True,
+        )
+        Product.objects.create(
+            category=prints,
+            name="Etching",
+            slug="etching",
+            price=Decimal("60"),
+            stock=0,
+            is_featured=True,
+        )
+        Product.objects.create(
+            category=vases,
+            name="Blue Vase",
+            slug="blue-vase",
+            price=Decimal("120"),
+            stock=1,
+        )
+        Product.objects.create(
+            category=vases,
+            name="Hidden",
+            slug="hidden",
+            price=Decimal("10"),
+            stock=9,
+            is_active=False,
+        )
+
+    def test_counts_for_whole_catalog(self, catalog):
+        facets = get_facets()
+
+        assert facets.total == 3
+        assert {c.slug: c.count for c in facets.categories} == {
+            "empty": 0,
+            "prints": 2,
+            "vases": 1,
+        }
+        assert facets.in_stock == 2
+        assert facets.new == 1
+        assert facets.featured == 1
+        assert {b.key: b.count for b in facets.price_buckets} == {
+            "under-25": 1,
+            "25-50": 0,
+            "50-100": 1,
+            "100-plus": 1,
+        }
+
+    def test_category_scopes_counts_but_not_category_facet(self, catalog):
+        facets = get_facets(category_slug="prints")
+
+        assert facets.in_stock == 1
+        assert facets.featured == 1
+        assert {c.slug: c.count for c in facets.categories}["vases"] == 1
+
+    def test_query_filters_counts(self, catalog):
+        facets = get_facets(query="vase")
+        assert facets.total == 1
+        assert {c.slug: c.count for c in facets.categories}["vases"] == 1
+
+    def test_single_query_then_cached(self, catalog):
+        with CaptureQueriesContext(connection) as ctx:
+            get_facets(category_slug="prints")
+        assert len(ctx.captured_queries) == 1
+
+        with CaptureQueriesContext(connection) as ctx:
+            get_facets(category_slug=" Prints ")
+        assert len(ctx.captured_queries) == 0
+
+    def test_filter_key_normalization(self):
+        assert normalize_filter_key(query="Blue  Vase") == normalize_filter_key(
+            query=" blue vase"
+        )
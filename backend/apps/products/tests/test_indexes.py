@@ -0,0 +1,38 @@
+import pytest
+from django.db import connection
+
+from backend.apps.products.models import Category, Product
+from backend.apps.products.selectors import (
+    get_featured_products,
+    get_filtered_products,
+)
+
+
+def _plan(qs) -> str:
+    if connection.vendor == "postgresql":
+        # Tiny test tables always favour a seq scan; ask what it *can* use.
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+    return qs.explain()
+
+
+@pytest.mark.django_db
+class TestStorefrontIndexes:
+    @pytest.fixture(autouse=True)
+    def catalog(self):
+        cat = Category.objects.create(name="Prints", slug="prints")
+        Product.objects.create(category=cat, name="P", slug="p", is_featured=True)
+
+    def test_listing_uses_active_created_index(self):
+        assert "product_active_created_idx" in _plan(get_filtered_products())
+
+    def test_category_listing_uses_category_index(self):
+        qs = get_filtered_products(category_slug="prints")
+        assert "product_active_cat_created_idx" in _plan(qs)
+
+    def test_featured_uses_featured_index(self):
+        assert "product_featured_created_idx" in _plan(get_featured_products())
+
+    def test_keyset_order_uses_active_created_index(self):
+        qs = get_filtered_products().order_by("-created_at", "-id")
+        assert "product_active_created_idx" in _plan(qs)
@@ -0,0 +1,44 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from backend.apps.products.models import Category, Product
+
+
+@pytest.mark.django_db
+class TestProductQuerySet:
+    @pytest.fixture
+    def catalog(self):
+        cat = Category.objects.create(name="Prints", slug="prints")
+        live = Product.objects.create(
+            category=cat, name="Live", slug="live", is_featured=True
+        )
+        Product.objects.create(category=cat, name="Plain", slug="plain")
+        Product.objects.create(
+            category=cat, name="Off", slug="off", is_active=False, is_featured=True
+        )
+        return live
+
+    def test_active_featured(self, catalog):
+        assert list(Product.objects.active().featured()) == [catalog]
+
+    def test_for_listing_defers_description(self, catalog):
+        product = Product.objects.for_listing().get(pk=catalog.pk)
+        deferred = product.get_deferred_fields()
+
+        assert "description" in deferred
+        assert "search_vector" in deferred
+        assert "price" not in deferred
+
+    def test_for_listing_joins_category(self, catalog):
+        products = list(Product.objects.active().for_listing())
+
+        with CaptureQueriesContext(connection) as ctx:
+            names = [p.category.name for p in products]
+
+        assert names == ["Prints", "Prints"]
+        assert len(ctx.captured_queries) == 0
+
+    def test_for_detail_keeps_description(self, catalog):
+        product = Product.objects.for_detail().get(pk=catalog.pk)
+        assert product.get_deferred_fields() == {"search_vector"}
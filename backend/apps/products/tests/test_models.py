@@ -2,11 +2,18 @@ from unittest.mock import Mock, patch
 
 import pytest
 
+from backend.apps.core.images import clear_image_url_cache
 from backend.apps.products.models import Category, Product
 
 
 @pytest.mark.django_db
 class TestProductModels:
+    @pytest.fixture(autouse=True)
+    def _fresh_url_cache(self):
+        clear_image_url_cache()
+        yield
+        clear_image_url_cache()
+
     def test_category_str(self):
         cat = Category.objects.create(name="Tools", slug="tools")
         assert str(cat) == "Tools"
@@ -35,7 +42,7 @@ class TestProductModels:
         assert p1.is_in_stock is True
         assert p2.is_in_stock is False
 
-    @patch("backend.apps.products.models.cloudinary_url")
+    @patch("backend.apps.core.images.cloudinary_url")
     def test_image_url_generation(self, mock_cloudinary_url):
         """
         Test that image helpers call the underlying library with correct params.
@@ -77,3 +84,36 @@ class TestProductModels:
         # product.image is None/Empty by default here
 
         assert product.image_url() == ""
+
+    @patch("backend.apps.core.images.cloudinary_url")
+    def test_image_urls_are_memoized(self, mock_cloudinary_url):
+        mock_cloudinary_url.return_value = ("https://res.cloudinary.com/x.jpg", {})
+
+        cat = Category.objects.create(name="Test", slug="test")
+        product = Product.objects.create(category=cat, name="P1", slug="p1")
+        product.image = Mock()
+        product.image.public_id = "sample_id"
+
+        for _ in range(3):
+            assert product.image_url_400 == "https://res.cloudinary.com/x.jpg"
+
+        assert mock_cloudinary_url.call_count == 1
+
+    @patch("backend.apps.core.images.cloudinary_url")
+    def test_image_set_builds_srcset_once(self, mock_cloudinary_url):
+        mock_cloudinary_url.side_effect = lambda pid, transformation: (
+            f"https://cdn/{pid}/{transformation.get('width', 'auto')}",
+            {},
+        )
+
+        cat = Category.objects.create(name="Test", slug="test")
+        product = Product.objects.create(category=cat, name="P1", slug="p1")
+        product.image = Mock()
+        product.image.public_id = "sample_id"
+
+        images = product.image_set
+
+        assert images.auto == "https://cdn/sample_id/auto"
+        assert images.srcset.startswith("https://cdn/sample_id/200 200w, ")
+        assert images.srcset.endswith("https://cdn/sample_id/1200 1200w")
+        assert product.image_set is images
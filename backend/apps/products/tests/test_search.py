@@ -0,0 +1,89 @@
+import pytest
+
+from backend.apps.products.models import Category, Product
+from backend.apps.products.search import (
+    _fts_match_expression,
+    _tsquery_expression,
+    rebuild_index,
+    search_products,
+)
+from backend.apps.products.selectors import get_filtered_products
+
+
+@pytest.mark.django_db
+class TestProductSearch:
+    @pytest.fixture
+    def catalog(self):
+        cat = Category.objects.create(name="Ceramics", slug="ceramics")
+        vase = Product.objects.create(
+            category=cat,
+            name="Blue Vase",
+            slug="blue-vase",
+            description="Hand thrown stoneware.",
+        )
+        bowl = Product.objects.create(
+            category=cat,
+            name="Serving Bowl",
+            slug="serving-bowl",
+            description="Pairs well with our blue vase.",
+        )
+        hidden = Product.objects.create(
+            category=cat,
+            name="Blue Mug",
+            slug="blue-mug",
+            description="Retired.",
+            is_active=False,
+        )
+        return {"vase": vase, "bowl": bowl, "hidden": hidden}
+
+    def test_icontains_fallback_without_index(self, catalog):
+        results = list(get_filtered_products(query="stoneware"))
+        assert results == [catalog["vase"]]
+
+    def test_name_match_ranks_above_description_match(self, catalog):
+        rebuild_index()
+
+        results = list(get_filtered_products(query="vase"))
+
+        assert results == [catalog["vase"], catalog["bowl"]]
+
+    def test_prefix_match_and_inactive_excluded(self, catalog):
+        rebuild_index()
+
+        results = list(get_filtered_products(query="blu"))
+
+        assert catalog["vase"] in results
+        assert catalog["hidden"] not in results
+
+    def test_index_follows_saves_and_deletes(self, catalog):
+        rebuild_index()
+        vase = catalog["vase"]
+
+        vase.name = "Green Jug"
+        vase.save()
+        assert list(get_filtered_products(query="jug")) == [vase]
+
+        vase.delete()
+        assert list(get_filtered_products(query="jug")) == []
+
+    def test_punctuation_only_query_matches_nothing(self, catalog):
+        rebuild_index()
+        assert list(search_products(Product.objects.all(), '"*(')) == []
+
+
+@pytest.mark.parametrize(
+    ("query", "fts5", "tsquery"),
+    [
+        ("blu", '"blu"*', "'blu':*"),
+        ("blue va", '"blue"* "va"*', "'blue':* & 'va':*"),
+        (
+            "o'neil's mug!",
+            '"o"* "neil"* "s"* "mug"*',
+            "'o':* & 'neil':* & 's':* & 'mug':*",
+        ),
+        ('"*(', "", ""),
+    ],
+)
+def test_backends_match_word_prefixes_alike(query, fts5, tsquery):
+    assert _fts_match_expression(query) == fts5
+    assert _tsquery_expression(query) == tsquery
@@ -0,0 +1,122 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+
+from backend.apps.products.models import Category, Product, StockSlot
+from backend.apps.products.stock import (
+    available_stock,
+    distribute_stock,
+    return_stock,
+    split_evenly,
+    take_stock,
+)
+
+
+def _slots(product):
+    return list(
+        StockSlot.objects.filter(product=product)
+        .order_by("slot")
+        .values_list("quantity", flat=True)
+    )
+
+
+@pytest.fixture
+def sharded_product():
+    cat = Category.objects.create(name="Drops", slug="drops")
+    product = Product.objects.create(
+        category=cat, name="Drop", slug="drop", stock=10, stock_slot_count=4
+    )
+    distribute_stock(product)
+    return product
+
+
+def test_split_evenly():
+    assert split_evenly(10, 4) == [3, 3, 2, 2]
+    assert split_evenly(0, 2) == [0, 0]
+    assert sum(split_evenly(7, 3)) == 7
+
+
+@pytest.mark.django_db
+class TestStockSlots:
+    def test_distribute_builds_and_removes_slots(self, sharded_product):
+        assert _slots(sharded_product) == [3, 3, 2, 2]
+
+        sharded_product.stock_slot_count = 0
+        distribute_stock(sharded_product)
+        assert _slots(sharded_product) == []
+
+    def test_saves_keep_slots_in_line(self):
+        cat = Category.objects.create(name="Drops", slug="drops")
+        product = Product.objects.create(
+            category=cat, name="Drop", slug="drop", stock=6, stock_slot_count=3
+        )
+        assert _slots(product) == [2, 2, 2]
+
+        product.stock = 9
+        product.save()
+        assert _slots(product) == [3, 3, 3]
+
+        product.stock_slot_count = 0
+        product.save(update_fields=["stock_slot_count"])
+        assert _slots(product) == []
+
+    def test_unrelated_save_keeps_slots(self, sharded_product):
+        product = Product.objects.get(pk=sharded_product.pk)
+        with transaction.atomic():
+            take_stock(product.pk, 3)
+
+        product.name = "Drop (restocked soon)"
+        product.save()
+
+        assert sum(_slots(product)) == 7
+
+    def test_take_from_one_slot(self, sharded_product):
+        with transaction.atomic():
+            assert take_stock(sharded_product.id, 2) is True
+
+        assert available_stock(sharded_product.id) == 8
+        assert sorted(_slots(sharded_product)) in ([0, 2, 3, 3], [1, 2, 2, 3])
+
+    def test_take_across_slots_rebalances(self, sharded_product):
+        # No single slot holds 5, so every slot is locked and re-split.
+        with transaction.atomic():
+            assert take_stock(sharded_product.id, 5) is True
+
+        assert _slots(sharded_product) == [2, 1, 1, 1]
+
+    def test_shortfall_changes_nothing(self, sharded_product):
+        with transaction.atomic():
+            assert take_stock(sharded_product.id, 11) is False
+
+        assert _slots(sharded_product) == [3, 3, 2, 2]
+
+    def test_summed_stock_synced_after_commit(
+        self, sharded_product, django_capture_on_commit_callbacks
+    ):
+        with (
+            django_capture_on_commit_callbacks(execute=True),
+            transaction.atomic(),
+        ):
+            take_stock(sharded_product.id, 3)
+
+        sharded_product.refresh_from_db()
+        assert sharded_product.stock == 7
+
+        with django_capture_on_commit_callbacks(execute=True):
+            return_stock(sharded_product.id, 3)
+
+        sharded_product.refresh_from_db()
+        assert sharded_product.stock == 10
+
+    def test_rebalance_command(self, sharded_product):
+        StockSlot.objects.filter(product=sharded_product, slot=0).update(quantity=9)
+        out = StringIO()
+
+        call_command("rebalance_stock_slots", stdout=out)
+
+        assert "Rebalanced 1 product(s)." in out.getvalue()
+        assert _slots(sharded_product) == [4, 4, 4, 4]
+        sharded_product.refresh_from_db()
+        assert sharded_product.stock == 16
@@ -93,3 +93,58 @@ class TestProductViews:
         url = reverse("products:product_detail", args=["ghost-product"])
         response = client.get(url)
         assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestProductListCursorPagination:
+    @pytest.fixture
+    def many_products(self):
+        cat = Category.objects.create(name="Prints", slug="prints")
+        return [
+            Product.objects.create(category=cat, name=f"Print {i}", slug=f"print-{i}")
+            for i in range(30)
+        ]
+
+    def test_cursor_pages_do_not_overlap(self, client, settings, many_products):
+        settings.PRODUCT_LIST_PAGINATION = "cursor"
+        url = reverse("products:product_list")
+
+        first = client.get(url)
+        assert first.context["page_obj"] is None
+        page = first.context["cursor_page"]
+        assert len(page.object_list) == 24
+        assert page.has_next
+
+        second = client.get(url, {"cursor": page.next_cursor})
+        rest = second.context["cursor_page"]
+        assert len(rest.object_list) == 6
+        assert not rest.has_next
+
+        seen = {p.pk for p in page.object_list} | {p.pk for p in rest.object_list}
+        assert seen == {p.pk for p in many_products}
+
+    def test_cursor_param_switches_mode(self, client, many_products):
+        response = client.get(reverse("products:product_list"), {"cursor": ""})
+        assert response.context["cursor_page"].has_next
+
+    def test_garbled_cursor_starts_from_first_page(self, client, many_products):
+        response = client.get(reverse("products:product_list"), {"cursor": "%%%"})
+        assert len(response.context["cursor_page"].object_list) == 24
+
+    def test_htmx_append_renders_append_fragment(self, client, many_products):
+        url = reverse("products:product_list")
+        token = client.get(url, {"cursor": ""}).context["cursor_page"].next_cursor
+
+        response = client.get(
+            url, {"cursor": token, "append": "1"}, HTTP_HX_REQUEST="true"
+        )
+
+        assert [t.name for t in response.templates][0] == (
+            "products/_append_fragment.html"
+        )
+        assert b'hx-swap-oob="true"' in response.content
+
+    def test_search_keeps_numbered_pages(self, client, settings, many_products):
+        settings.PRODUCT_LIST_PAGINATION = "cursor"
+        response = client.get(reverse("products:product_list"), {"q": "Print"})
+        assert response.context["page_obj"].paginator.count == 30
@@ -1,46 +1,117 @@
+from typing import Any
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.core.paginator import Paginator
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 
+from .caching import get_cached_listing, listing_cache_key, set_cached_listing
+from .facets import get_facets
 from .models import Product
+from .pagination import paginate_by_cursor
 from .selectors import get_active_categories, get_filtered_products
 
+PER_PAGE = 24
+
+
+def _use_cursor_pagination(request: HttpRequest, *, query: str) -> bool:
+    # Search results are ordered by relevance, not (created_at, id),
+    # so they always use numbered pages.
+    if query:
+        return False
+    if "cursor" in request.GET:
+        return True
+    return bool(getattr(settings, "PRODUCT_LIST_PAGINATION", "page") == "cursor")
+
+
+def _listing_context(
+    request: HttpRequest, *, category_slug: str, query: str, qs: str
+) -> dict[str, Any]:
+    products_qs = get_filtered_products(category_slug=category_slug, query=query)
+
+    context: dict[str, Any] = {
+        "qs": qs,
+        "hx_target_id": "products-fragment",
+    }
+
+    if _use_cursor_pagination(request, query=query):
+        cursor_page = paginate_by_cursor(
+            products_qs,
+            cursor=(request.GET.get("cursor") or "").strip(),
+            per_page=PER_PAGE,
+        )
+        context.update(
+            {
+                "page_obj": None,
+                "cursor_page": cursor_page,
+                "products": cursor_page.object_list,
+            }
+        )
+    else:
+        paginator = Paginator(products_qs, PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get("page"))
+        context.update(
+            {
+                "page_obj": page_obj,
+                "products": page_obj.object_list,
+            }
+        )
+    return context
+
 
 def product_list(request: HttpRequest) -> HttpResponse:
     category_slug = (request.GET.get("category") or "").strip()
     q = (request.GET.get("q") or "").strip()
+    page = (request.GET.get("page") or "").strip()
+    cursor = (request.GET.get("cursor") or "").strip()
 
-    products_qs = get_filtered_products(category_slug=category_slug, query=q)
-    categories = get_active_categories()
-
-    paginator = Paginator(products_qs, 24)
-    page_obj = paginator.get_page(request.GET.get("page"))
-
-    # Build querystring WITHOUT page, for clean pagination links
-    params = request.GET.copy()
-    params.pop("page", None)
-    qs = params.urlencode()
+    # Querystring for pagination links: only the normalized filters, so the
+    # cached fragment is identical for every visitor with the same key.
+    params = {k: v for k, v in (("category", category_slug), ("q", q)) if v}
+    qs = urlencode(params)
     if qs:
         qs += "&"
 
+    is_htmx = bool(getattr(request, "htmx", False))
+    cursor_mode = _use_cursor_pagination(request, query=q)
+    fragment_template = (
+        "products/_append_fragment.html"
+        if is_htmx and cursor_mode and request.GET.get("append")
+        else "products/_list_fragment.html"
+    )
+
+    cache_key = listing_cache_key(
+        category_slug=category_slug,
+        query=q,
+        page="" if cursor_mode else (page if page.isdigit() else ""),
+        cursor=cursor if cursor_mode else "",
+        variant=f"{fragment_template}:{'cursor' if cursor_mode else 'page'}",
+    )
+    listing_html = get_cached_listing(cache_key)
+    if listing_html is None:
+        listing_html = render_to_string(
+            fragment_template,
+            _listing_context(request, category_slug=category_slug, query=q, qs=qs),
+        )
+        set_cached_listing(cache_key, listing_html)
+
+    if is_htmx:
+        return HttpResponse(listing_html)
+
     context = {
-        "page_obj": page_obj,
-        "products": page_obj.object_list,
-        "categories": categories,
+        "categories": get_active_categories(),
+        # Facet counts only feed the filter bar, which fragments don't render.
+        "facets": get_facets(category_slug=category_slug, query=q),
         "active_category": category_slug,
         "query": q,
-        "qs": qs,
-        "hx_target_id": "products-fragment",
+        "listing_html": mark_safe(listing_html),  # rendered by our own template
     }
-
-    template = (
-        "products/_list_fragment.html"
-        if getattr(request, "htmx", False)
-        else "products/product_list.html"
-    )
-    return render(request, template, context)
+    return render(request, "products/product_list.html", context)
 
 
 def product_detail(request: HttpRequest, slug: str) -> HttpResponse:
-    product = get_object_or_404(Product, slug=slug, is_active=True)
+    product = get_object_or_404(Product.objects.active().for_detail(), slug=slug)
     return render(request, "products/product_detail.html", {"product": product})
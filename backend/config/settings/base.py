@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.sites",
+    "django.contrib.postgres",
     "django_htmx",
     "rest_framework",
     "django_filters",
@@ -100,6 +101,24 @@ DATABASES = {
     )
 }
 
+# Cache
+# Several features coordinate workers through the default cache: listing
+# cache hit/miss counters, the payment circuit breaker and latency
+# histograms, and the PayPal token refresh lock. Point CACHE_URL at Redis
+# (redis://host:6379/0) wherever more than one worker process runs; the
+# LocMem fallback is per-process and only suits a single dev server
+# (`manage.py check --deploy` warns about it).
+CACHE_URL = config("CACHE_URL", default="")
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
 # Authentication & Allauth
 SITE_ID = 1
 
@@ -219,6 +238,11 @@ cloudinary.config(
     secure=True,
 )
 
+# Also share memoized transformation URLs between workers via CACHES.
+CLOUDINARY_URL_SHARED_CACHE = config(
+    "CLOUDINARY_URL_SHARED_CACHE", default=False, cast=bool
+)
+
 CLOUDINARY_STORAGE = {
     "CLOUD_NAME": CLOUDINARY_CLOUD_NAME,
     "API_KEY": CLOUDINARY_API_KEY,
@@ -227,13 +251,78 @@ CLOUDINARY_STORAGE = {
     "PREFIX": "arti_corner/",
 }
 
+# Catalog
+# "page" = numbered pages (COUNT + OFFSET), "cursor" = keyset / load more.
+PRODUCT_LIST_PAGINATION = config("PRODUCT_LIST_PAGINATION", default="page")
+
+# Checkout row locking: "wait" (bounded by lock_timeout), "nowait" (retry
+# with jitter) or "fail_fast" (immediate "high demand" message).
+CHECKOUT_LOCK_STRATEGY = config("CHECKOUT_LOCK_STRATEGY", default="wait")
+CHECKOUT_LOCK_TIMEOUT_MS = config("CHECKOUT_LOCK_TIMEOUT_MS", default=3000, cast=int)
+CHECKOUT_LOCK_RETRIES = config("CHECKOUT_LOCK_RETRIES", default=3, cast=int)
+
+# Checkouts allowed in flight at once, across all workers (0 = unlimited);
+# the overflow waits in a queue page so the stock locks and the payment
+# provider see bounded load.
+CHECKOUT_MAX_CONCURRENT = config("CHECKOUT_MAX_CONCURRENT", default=0, cast=int)
+
+# Stock held by a pending (unpaid) order is returned by
+# `manage.py release_expired_reservations` once this has passed.
+ORDER_RESERVATION_TTL_MINUTES = config(
+    "ORDER_RESERVATION_TTL_MINUTES", default=30, cast=int
+)
+
 # Payments
+# PAYMENT_PROVIDER starts new checkouts; PAYMENT_PROVIDERS lists any other
+# providers that existing orders may still need (returns, reconciliation).
 PAYMENT_PROVIDER = "backend.apps.payments.providers.paypal.PayPalProvider"
+PAYMENT_PROVIDERS: list[str] = []
+
+# Shared HTTP client for payment providers (payments/http_client.py).
+PAYMENT_HTTP_CONNECT_TIMEOUT = config(
+    "PAYMENT_HTTP_CONNECT_TIMEOUT", default=3.05, cast=float
+)
+PAYMENT_HTTP_READ_TIMEOUT = config("PAYMENT_HTTP_READ_TIMEOUT", default=10, cast=float)
+PAYMENT_HTTP_RETRIES = config("PAYMENT_HTTP_RETRIES", default=2, cast=int)
+PAYMENT_HTTP_POOL_SIZE = config("PAYMENT_HTTP_POOL_SIZE", default=20, cast=int)
+# In-flight provider calls per worker for the async views (ASGI only).
+PAYMENT_HTTP_ASYNC_MAX_CONNECTIONS = config(
+    "PAYMENT_HTTP_ASYNC_MAX_CONNECTIONS", default=200, cast=int
+)
+
+# Circuit breaker around provider calls (payments/breaker.py): open after
+# FAILURE_RATE of at least MIN_CALLS calls in a WINDOW_SECONDS window failed
+# or took over SLOW_CALL_MS, then fail fast for OPEN_SECONDS before probing.
+PAYMENT_BREAKER_ENABLED = config("PAYMENT_BREAKER_ENABLED", default=True, cast=bool)
+PAYMENT_BREAKER_FAILURE_RATE = config(
+    "PAYMENT_BREAKER_FAILURE_RATE", default=0.5, cast=float
+)
+PAYMENT_BREAKER_MIN_CALLS = config("PAYMENT_BREAKER_MIN_CALLS", default=10, cast=int)
+PAYMENT_BREAKER_SLOW_CALL_MS = config(
+    "PAYMENT_BREAKER_SLOW_CALL_MS", default=5000, cast=int
+)
+PAYMENT_BREAKER_WINDOW_SECONDS = config(
+    "PAYMENT_BREAKER_WINDOW_SECONDS", default=60, cast=int
+)
+PAYMENT_BREAKER_OPEN_SECONDS = config(
+    "PAYMENT_BREAKER_OPEN_SECONDS", default=30, cast=int
+)
 
 PAYPAL_ENV = config("PAYPAL_ENV", default="sandbox")
 PAYPAL_CLIENT_ID = config("PAYPAL_CLIENT_ID", default="")
 PAYPAL_CLIENT_SECRET = config("PAYPAL_CLIENT_SECRET", default="")
 PAYPAL_WEBHOOK_ID = config("PAYPAL_WEBHOOK_ID", default="")
+# Overrides the PAYPAL_ENV API host, e.g. http://127.0.0.1:8089 for the
+# local stand-in (`manage.py run_paypal_stub`) during load tests.
+PAYPAL_API_BASE_URL = config("PAYPAL_API_BASE_URL", default="")
+
+# Capture in the background (`manage.py process_payment_events --loop`)
+# instead of inside the payment return request; the return page then polls.
+PAYMENT_ASYNC_CAPTURE = config("PAYMENT_ASYNC_CAPTURE", default=False, cast=bool)
+
+# Serve checkout_start/payment_return as async views (ASGI deployments), so
+# in-flight provider calls don't each hold a worker.
+CHECKOUT_ASYNC_VIEWS = config("CHECKOUT_ASYNC_VIEWS", default=False, cast=bool)
 
 # Static files
 STATIC_URL = "static/"
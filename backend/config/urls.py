@@ -11,6 +11,7 @@ urlpatterns = [
     path("shop/", include("backend.apps.products.urls")),
     path("cart/", include("backend.apps.cart.urls")),
     path("orders/", include("backend.apps.orders.urls")),
+    path("payments/", include("backend.apps.payments.urls")),
     path("", include("backend.apps.core.urls")),
     path("mock-paypal-approve", core_views.mock_paypal_approve),
 ]
@@ -74,4 +74,4 @@ def mock_paypal(monkeypatch: pytest.MonkeyPatch) -> None:
         return _mock_response(200, {})
 
     mock_post.side_effect = side_effect
-    monkeypatch.setattr("requests.post", mock_post)
+    monkeypatch.setattr("backend.apps.payments.http_client.post", mock_post)